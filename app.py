@@ -1,19 +1,42 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from flask.wrappers import Request
 from flask_cors import CORS
 import os
 import json
-from werkzeug.utils import secure_filename
-from PIL import Image
+import time
+import atexit
+from datetime import datetime, timezone
 
 from config import Config
 from models.ocr_processor import OCRProcessor
 from models.factor_extractor import FactorExtractor
 from models.risk_classifier import RiskClassifier
 from models.recommender import Recommender
+from models.pipeline import AnalysisPipeline
+from models.population_stats import PopulationStats
+from models.records import factor_codes, factor_mask
 from utils.validators import validate_input, validate_image
-from utils.helpers import cleanup_uploads
+from utils.admission import OCR, AdmissionController, AdmissionRejected
+from utils.helpers import open_upload
+from utils.job_queue import JobQueue, QueueFullError
+from utils.json_provider import FastJSONProvider
+from utils.metrics import metrics
+from utils.result_store import ResultStore
+
+class TimedRequest(Request):
+    """Request whose JSON body decode is recorded as the json_decode stage"""
+    def get_json(self, *args, **kwargs):
+        if not metrics.enabled:
+            return super().get_json(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().get_json(*args, **kwargs)
+        finally:
+            metrics.observe_stage('json_decode', time.perf_counter() - start)
 
 app = Flask(__name__)
+app.request_class = TimedRequest
+app.json = FastJSONProvider(app)
 app.config.from_object(Config)
 CORS(app)
 
@@ -22,26 +45,105 @@ ocr_processor = OCRProcessor()
 factor_extractor = FactorExtractor()
 risk_classifier = RiskClassifier()
 recommender = Recommender()
+population_stats = PopulationStats.from_config() if Config.POPULATION_STATS_ENABLED else None
+pipeline = AnalysisPipeline(
+    ocr_processor, factor_extractor, risk_classifier, recommender, population_stats=population_stats
+)
+admission = AdmissionController.from_config()
+job_queue = JobQueue(
+    workers=Config.JOB_WORKERS,
+    max_queued=Config.JOB_QUEUE_SIZE,
+    result_ttl=Config.JOB_RESULT_TTL,
+    path=Config.JOB_STORE_FILE,
+    budget=admission.budgets[OCR] if admission.enabled else None  # Background OCR shares the upload budget
+)
+if population_stats is not None:
+    atexit.register(population_stats.flush)
+result_store = ResultStore.from_config()
+if result_store is not None:
+    atexit.register(result_store.flush, Config.RESULT_STORE_BUSY_TIMEOUT)
+
+def warm_start():
+    """Load the OCR stack now rather than on the first image request (gunicorn --preload hook)"""
+    ocr_processor.load_ocr_stack()
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+@app.before_request
+def start_request_timer():
+    if not metrics.enabled:
+        return
+    g.request_start = time.perf_counter()
+    if request.args.get('timings', '').lower() in ('1', 'true', 'yes'):
+        g.timings = metrics.start_request_timings()
+
+@app.before_request
+def admit_request():
+    """Turn requests away before they read their body when their budget is exhausted"""
+    if not admission.enabled:
+        return
+    route_class = admission.route_class(request.method, request.mimetype)
+    if route_class is None:
+        return
+    try:
+        g.admission_ticket = admission.admit(route_class, request.remote_addr, request.content_length)
+        g.admission_ticket.wait()
+    except AdmissionRejected as e:
+        return _rejected_response(e)
+
+@app.teardown_request
+def release_admission(error=None):
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        ticket.release()
+
+@app.after_request
+def record_request_timings(response):
+    if 'request_start' not in g:
+        return response
+    metrics.observe_request(request.endpoint or 'unknown', time.perf_counter() - g.request_start)
+    
+    timings = g.pop('timings', None)
+    if timings is not None:
+        metrics.stop_request_timings()
+        body = response.get_json(silent=True) if response.is_json and not response.is_streamed else None
+        if isinstance(body, dict):
+            # Stage durations in milliseconds
+            body['timings'] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            response.set_data(app.json.dumps_bytes(body) + b'\n')
+    return response
+
+# Health check payload, shared with the ASGI app
+SERVICE_INFO = {
+    "status": "ok",
+    "service": "AI-Powered Health Risk Profiler",
+    "version": "1.0.0",
+    "endpoints": [
+        "/parse-text",
+        "/parse-image", 
+        "/parse-document",
+        "/parse-image-batch",
+        "/extract-factors",
+        "/classify-risk",
+        "/get-recommendations",
+        "/analyze-complete",
+        "/analyze-batch",
+        "/jobs/<job_id>",
+        "/cache-stats",
+        "/admission-stats",
+        "/scoring-model",
+        "/stats",
+        "/results",
+        "/results/<result_id>",
+        "/metrics"
+    ]
+}
+
 @app.route('/', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        "status": "ok",
-        "service": "AI-Powered Health Risk Profiler",
-        "version": "1.0.0",
-        "endpoints": [
-            "/parse-text",
-            "/parse-image", 
-            "/extract-factors",
-            "/classify-risk",
-            "/get-recommendations",
-            "/analyze-complete"
-        ]
-    })
+    return jsonify(SERVICE_INFO)
 
 @app.route('/parse-text', methods=['POST'])
 def parse_text():
@@ -82,27 +184,62 @@ def parse_image():
         if not validate_image(file):
             return jsonify({"error": "Invalid image format"}), 400
         
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        if _wants_async():
+            return _submit_job(_parse_image_job, file.read())
         
-        try:
-            # Process image
-            result = ocr_processor.parse_image(filepath)
-            
-            # Cleanup uploaded file
-            cleanup_uploads(filepath)
-            
-            return jsonify(result)
-            
-        except Exception as e:
-            cleanup_uploads(filepath)
-            raise e
+        # Process image from memory (spooled to disk only when large)
+        with _open_upload(file) as image:
+            result, status_code = _parse_image_job(image)
+        
+        if status_code == 503:
+            return _busy_response(result)
+        
+        return jsonify(result)
             
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/parse-document', methods=['POST'])
+def parse_document():
+    """Step 1 for multi-page / multi-form scans: one parsed survey per detected form"""
+    try:
+        if 'image' not in request.files:
+            return jsonify({"error": "No image file provided"}), 400
+        
+        file = request.files['image']
+        if file.filename == '':
+            return jsonify({"error": "No file selected"}), 400
+        
+        if not validate_image(file):
+            return jsonify({"error": "Invalid image format"}), 400
+        
+        with _open_upload(file) as image:
+            result = ocr_processor.parse_document(image)
+        
+        if 'error' in result:
+            return jsonify(result), 500
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/parse-image-batch', methods=['POST'])
+def parse_image_batch():
+    """Step 1 for many scans at once: duplicates parsed once, the rest OCR'd in parallel"""
+    try:
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({"error": "No image files provided"}), 400
+        
+        # Invalid files get a per-image error instead of failing the batch
+        uploads = [(file.filename, file.read() if validate_image(file) else None) for file in files]
+        body, status_code = _parse_image_batch(uploads)
+        return jsonify(body), status_code
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/extract-factors', methods=['POST'])
 def extract_factors():
     """Step 2: Extract risk factors from parsed answers"""
@@ -166,18 +303,12 @@ def analyze_complete():
             if not validate_image(file):
                 return jsonify({"error": "Invalid image format"}), 400
             
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            if _wants_async():
+                return _submit_job(_analyze_image_job, file.read(), _subject())
             
-            try:
-                # Step 1: Parse image
-                parse_result = ocr_processor.parse_image(filepath)
-                cleanup_uploads(filepath)
-                
-            except Exception as e:
-                cleanup_uploads(filepath)
-                raise e
+            # Step 1: Parse image
+            with _open_upload(file) as image:
+                parse_result = ocr_processor.parse_image(image)
                 
         else:
             # Text input
@@ -195,36 +326,285 @@ def analyze_complete():
             # Step 1: Parse text
             parse_result = ocr_processor.parse_text(data)
         
-        # Check if parsing was successful
-        if 'status' in parse_result and parse_result['status'] == 'incomplete_profile':
-            return jsonify(parse_result), 400
-        
-        # Step 2: Extract factors
-        factor_result = factor_extractor.extract_factors(parse_result['answers'])
+        # Steps 2-4: Extract factors, classify risk, generate recommendations
+        complete_result, status_code = _complete_from_parse(parse_result, _subject())
+        if status_code == 503:
+            return _busy_response(complete_result)
         
-        # Step 3: Classify risk
-        risk_result = risk_classifier.classify_risk(factor_result['factors'])
+        return jsonify(complete_result), status_code
         
-        # Step 4: Generate recommendations
-        recommendation_result = recommender.generate_recommendations(
-            risk_result['risk_level'], 
-            factor_result['factors']
-        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analyze-batch', methods=['POST'])
+def analyze_batch():
+    """Complete text pipeline over a batch of surveys (JSON list or NDJSON)"""
+    try:
+        if request.mimetype in NDJSON_MIMETYPES:
+            surveys = list(_read_ndjson(request.stream))
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('surveys')
+            if not isinstance(data, list):
+                return jsonify({"error": "Expected a JSON list of surveys, {\"surveys\": [...]} or NDJSON"}), 400
+            surveys = data
         
-        # Combine all results
-        complete_result = {
-            "parsing": parse_result,
-            "factors": factor_result,
-            "risk_classification": risk_result,
-            "recommendations": recommendation_result,
-            "status": "ok"
-        }
+        if not surveys:
+            return jsonify({"error": "No surveys provided"}), 400
+        if len(surveys) > app.config['MAX_BATCH_SIZE']:
+            return jsonify({
+                "error": f"Batch too large: {len(surveys)} surveys (max {app.config['MAX_BATCH_SIZE']})"
+            }), 413
         
-        return jsonify(complete_result)
+        return _batch_response(pipeline.analyze_batch(surveys))
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _batch_response(result):
+    """Large batch results are encoded and sent in chunks instead of as one string"""
+    if len(result['results']) + len(result['errors']) < app.config['STREAM_BATCH_THRESHOLD'] or 'timings' in g:
+        return jsonify(result)
+    return Response(app.json.iter_encode(result), mimetype='application/json')
+
+NDJSON_MIMETYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+
+def _read_ndjson(stream):
+    """Yield one survey per non-blank NDJSON line; undecodable lines yield the error"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield app.json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"Invalid JSON on line {line_number}: {str(e)}")
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and, once finished, result of a background image job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    
+    if 'result' in job:
+        job['result'], job['result_status'] = job['result']
+    
+    return jsonify(job)
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for sizing the caches"""
+    ocr_cache = ocr_processor.ocr_cache
+    return jsonify({
+        "ocr": ocr_cache.stats() if ocr_cache is not None else None,
+        "pipeline": pipeline.cache_stats()
+    })
+
+@app.route('/admission-stats', methods=['GET'])
+def admission_stats():
+    """Concurrency budgets, upload bytes in flight and rejection counters"""
+    return jsonify(admission.stats())
+
+@app.route('/scoring-model', methods=['GET'])
+def scoring_model():
+    """Version, weights and thresholds risk scores are currently computed with"""
+    return jsonify(risk_classifier.model.to_dict())
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Population aggregates: risk levels, factor prevalence and co-occurrence, by age band"""
+    body, status_code = _population_query(request.args.getlist)
+    return jsonify(body), status_code
+
+@app.route('/results/<result_id>', methods=['GET'])
+def get_result(result_id):
+    """A stored /analyze-complete result"""
+    body, status_code = _get_stored_result(result_id)
+    return jsonify(body), status_code
+
+@app.route('/results', methods=['GET'])
+def find_results():
+    """Stored results by subject and/or time range, newest first"""
+    body, status_code = _find_stored_results(request.args)
+    return jsonify(body), status_code
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage and request latency histograms in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+def _population_query(getlist):
+    """/stats body and status; ``getlist`` reads a repeated (or comma-separated) query parameter"""
+    if population_stats is None:
+        return {"error": "Population stats are disabled"}, 404
+    
+    def labels(name):
+        return [label for value in getlist(name) for label in value.split(',') if label]
+    
+    try:
+        return population_stats.query(labels('age_band'), labels('risk_level')), 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+def _get_stored_result(result_id):
+    """/results/<id> body and status"""
+    if result_store is None:
+        return {"error": "Result store is disabled"}, 404
+    
+    row = result_store.get(result_id)
+    if row is None:
+        return {"error": "Result not found"}, 404
+    return _stored_result(row), 200
+
+def _find_stored_results(args):
+    """/results body and status; ``args`` maps query parameter names to values"""
+    if result_store is None:
+        return {"error": "Result store is disabled"}, 404
+    
+    try:
+        since = _parse_time(args.get('since'))
+        until = _parse_time(args.get('until'))
+        limit = int(args.get('limit', 100))
+    except ValueError as e:
+        return {"error": f"Invalid query: {str(e)}"}, 400
+    if not 1 <= limit <= 1000:
+        return {"error": "limit must be between 1 and 1000"}, 400
+    
+    rows = result_store.find(args.get('subject'), since, until, limit)
+    return {"results": [_stored_result(row) for row in rows], "count": len(rows)}, 200
+
+def _parse_time(value):
+    """Epoch seconds or ISO 8601 (UTC unless it has an offset) as epoch seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+def _stored_result(row):
+    """Stored row with its recommendation texts looked up again"""
+    return dict(row, recommendations=recommender.texts(row['recommendation_ids']))
+
+def _store_result(complete_result, subject):
+    """Queue a finished analysis for the result store; its id, or None if the store is full"""
+    factors = complete_result['factors']['factors']
+    risk = complete_result['risk_classification']
+    return result_store.add(
+        subject,
+        complete_result['parsing']['answers'],
+        factors,
+        factor_mask(factor_codes(factors)),
+        risk['risk_level'],
+        risk['score'],
+        recommender.recommendation_ids(complete_result['recommendations']['recommendations']),
+        risk_classifier.model.version
+    )
+
+def _subject():
+    """Subject key results are stored under (?subject= or a form field)"""
+    return request.args.get('subject') or request.form.get('subject')
+
+def _complete_from_parse(parse_result, subject=None):
+    """Steps 2-4 for a parsed survey, as (body, status_code); stores the result when the store is on"""
+    if parse_result.get('status') == 'busy':
+        return parse_result, 503
+    if parse_result.get('status') == 'incomplete_profile':
+        return parse_result, 400
+    if 'error' in parse_result:
+        return parse_result, 500
+    
+    complete_result = pipeline.analyze_parsed(parse_result)
+    if 'error' in complete_result:
+        return complete_result, 500
+    
+    if result_store is not None:
+        result_id = _store_result(complete_result, subject)
+        if result_id is not None:
+            complete_result['result_id'] = result_id
+    
+    return complete_result, 200
+
+def _parse_image_batch(uploads):
+    """/parse-image-batch body and status for (filename, bytes or None if invalid) uploads"""
+    if len(uploads) > Config.MAX_IMAGE_BATCH_SIZE:
+        return {"error": f"Batch too large (max {Config.MAX_IMAGE_BATCH_SIZE} images)"}, 400
+    
+    valid = [index for index, (_, data) in enumerate(uploads) if data is not None]
+    parsed = dict(zip(valid, ocr_processor.parse_image_batch([uploads[index][1] for index in valid])))
+    
+    results = []
+    for index, (filename, _) in enumerate(uploads):
+        result = parsed.get(index, {"error": "Invalid image format"})
+        if 'duplicate_of' in result:
+            # Index within the request, not within the valid images
+            result = dict(result, duplicate_of=valid[result['duplicate_of']])
+        results.append(dict(result, index=index, filename=filename))
+    
+    failed = sum(1 for result in results if 'error' in result)
+    duplicates = sum(1 for result in results if 'duplicate_of' in result)
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "unique": len(results) - duplicates,
+            "duplicates": duplicates,
+            "cached": sum(1 for result in results if result.get('cached')),
+            "succeeded": len(results) - failed,
+            "failed": failed
+        },
+        "status": "ok"
+    }, 200
+
+def _parse_image_job(image):
+    result = ocr_processor.parse_image(image)
+    return result, 503 if result.get('status') == 'busy' else 200
+
+def _analyze_image_job(image, subject=None):
+    return _complete_from_parse(ocr_processor.parse_image(image), subject)
+
+def _wants_async():
+    value = request.args.get('async') or request.form.get('async') or ''
+    return value.lower() in ('1', 'true', 'yes')
+
+def _submit_job(fn, image, *args):
+    """Queue an image job and answer 202 with where to poll for it"""
+    try:
+        job_id = job_queue.submit(fn, image, *args)
+    except QueueFullError as e:
+        return _busy_response({"status": "busy", "error": str(e)})
+    
+    response = jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}"
+    })
+    response.status_code = 202
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response
+
+def _open_upload(file):
+    return open_upload(file, app.config['UPLOAD_FOLDER'], app.config['UPLOAD_SPOOL_THRESHOLD'])
+
+def _busy_response(result):
+    """503 telling the client to retry once the OCR queue drains"""
+    response = jsonify(result)
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(app.config['OCR_TIMEOUT']) or 1)
+    return response
+
+def _rejected_response(error):
+    """503 (over budget) or 429 (rate limited) with a Retry-After hint"""
+    response = jsonify(error.to_dict())
+    response.status_code = error.status_code
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -0,0 +1,493 @@
+# ASGI serving mode: the endpoints of app.py on Starlette
+#
+#   uvicorn asgi:app --port 8080
+#   gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+#
+# Processors, caches and the job queue are shared with the Flask app, and
+# request/response schemas are identical. Text scoring runs inline on the
+# event loop; OCR runs on a thread pool, so one process can hold many
+# uploads while Tesseract works.
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+import app as wsgi
+from config import Config
+from utils.admission import AdmissionRejected
+from utils.job_queue import QueueFullError
+from utils.metrics import metrics
+from utils.validators import validate_input, validate_image
+
+ocr_processor = wsgi.ocr_processor
+pipeline = wsgi.pipeline
+job_queue = wsgi.job_queue
+admission = wsgi.admission
+risk_classifier = wsgi.risk_classifier
+
+# Threads that block on OCR (subprocess or worker pool) while the event loop keeps serving
+ocr_executor = ThreadPoolExecutor(max_workers=Config.ASGI_OCR_THREADS, thread_name_prefix='ocr')
+
+
+class RequestError(Exception):
+    """Client error raised while reading a request; becomes a JSON error response"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def endpoint(handler):
+    """Wrap a handler returning (body, status[, headers]) with error handling and metrics.
+
+    Mirrors the Flask app: exceptions become ``{"error": ...}`` with a 500,
+    request latency is recorded under the handler's name, and ``?timings=1``
+    adds per-stage milliseconds to dict bodies.
+    """
+    @functools.wraps(handler)
+    async def wrapper(request):
+        timings = None
+        if metrics.enabled:
+            start = time.perf_counter()
+            if _timings_requested(request):
+                timings = metrics.start_request_timings()
+
+        ticket = None
+        try:
+            ticket = await _admit(request)
+            result = await handler(request)
+        except AdmissionRejected as e:
+            result = (e.to_dict(), e.status_code, {"Retry-After": str(e.retry_after)})
+        except RequestError as e:
+            result = ({"error": str(e)}, e.status_code)
+        except Exception as e:
+            result = ({"error": str(e)}, 500)
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+        if isinstance(result, Response):
+            response = result
+        else:
+            body, status_code, headers = (result + (None,))[:3]
+            if timings is not None and isinstance(body, dict):
+                body['timings'] = {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()}
+            response = json_response(body, status_code, headers)
+
+        if metrics.enabled:
+            if timings is not None:
+                metrics.stop_request_timings()
+            metrics.observe_request(handler.__name__, time.perf_counter() - start)
+        return response
+
+    return wrapper
+
+
+def json_response(body, status_code=200, headers=None):
+    """JSON encoded exactly as Flask's jsonify does"""
+    return Response(
+        wsgi.app.json.dumps_bytes(body) + b'\n',
+        status_code=status_code,
+        headers=headers,
+        media_type='application/json'
+    )
+
+
+async def run_ocr(fn, *args):
+    """Run blocking OCR work on the OCR threads, keeping the request's timing context"""
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(ocr_executor, functools.partial(context.run, fn, *args))
+
+
+@endpoint
+async def health_check(request):
+    """Health check endpoint"""
+    return wsgi.SERVICE_INFO, 200
+
+
+@endpoint
+async def parse_text(request):
+    """Step 1: Parse text input and extract health survey data"""
+    data = await _get_json(request)
+
+    if not data:
+        return {"error": "No JSON data provided"}, 400
+
+    validation_result = validate_input(data)
+    if not validation_result['valid']:
+        return {
+            "status": "incomplete_profile",
+            "reason": validation_result['reason']
+        }, 400
+
+    return ocr_processor.parse_text(data), 200
+
+
+@endpoint
+async def parse_image(request):
+    """Step 1: Parse image input using OCR"""
+    form, upload = await _get_upload(request)
+
+    if _wants_async(request, form):
+        return _submit_job(wsgi._parse_image_job, await upload.read())
+
+    result, status_code = await run_ocr(_with_upload, wsgi._parse_image_job, upload)
+    if status_code == 503:
+        return _busy_response(result)
+
+    return result, 200
+
+
+@endpoint
+async def parse_document(request):
+    """Step 1 for multi-page / multi-form scans: one parsed survey per detected form"""
+    _, upload = await _get_upload(request)
+
+    result = await run_ocr(_with_upload, ocr_processor.parse_document, upload)
+    if 'error' in result:
+        return result, 500
+
+    return result, 200
+
+
+@endpoint
+async def parse_image_batch(request):
+    """Step 1 for many scans at once: duplicates parsed once, the rest OCR'd in parallel"""
+    _check_content_length(request)
+    form = await request.form()
+    files = [upload for upload in form.getlist('images') if hasattr(upload, 'filename')]
+    if not files:
+        return {"error": "No image files provided"}, 400
+
+    # Invalid files get a per-image error instead of failing the batch
+    uploads = [
+        (upload.filename, await upload.read() if validate_image(SimpleNamespace(filename=upload.filename or '')) else None)
+        for upload in files
+    ]
+    return await run_ocr(wsgi._parse_image_batch, uploads)
+
+
+@endpoint
+async def extract_factors(request):
+    """Step 2: Extract risk factors from parsed answers"""
+    data = await _get_json(request)
+
+    if not data or 'answers' not in data:
+        return {"error": "No answers data provided"}, 400
+
+    return wsgi.factor_extractor.extract_factors(data['answers']), 200
+
+
+@endpoint
+async def classify_risk(request):
+    """Step 3: Classify risk level based on factors"""
+    data = await _get_json(request)
+
+    if not data or 'factors' not in data:
+        return {"error": "No factors data provided"}, 400
+
+    return wsgi.risk_classifier.classify_risk(data['factors']), 200
+
+
+@endpoint
+async def get_recommendations(request):
+    """Step 4: Generate recommendations based on risk profile"""
+    data = await _get_json(request)
+
+    required_fields = ['risk_level', 'factors']
+    if not all(field in data for field in required_fields):
+        return {"error": "Missing required fields: risk_level, factors"}, 400
+
+    result = wsgi.recommender.generate_recommendations(
+        data['risk_level'],
+        data['factors']
+    )
+    return result, 200
+
+
+@endpoint
+async def analyze_complete(request):
+    """Complete pipeline: Process input through all 4 steps"""
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form, upload = await _get_upload(request, check_filename=False)
+
+        subject = request.query_params.get('subject') or form.get('subject')
+        if _wants_async(request, form):
+            return _submit_job(wsgi._analyze_image_job, await upload.read(), subject)
+
+        parse_result = await run_ocr(_with_upload, ocr_processor.parse_image, upload)
+    else:
+        subject = request.query_params.get('subject')
+        data = await _get_json(request)
+        if not data:
+            return {"error": "No data provided"}, 400
+
+        validation_result = validate_input(data)
+        if not validation_result['valid']:
+            return {
+                "status": "incomplete_profile",
+                "reason": validation_result['reason']
+            }, 400
+
+        parse_result = ocr_processor.parse_text(data)
+
+    complete_result, status_code = wsgi._complete_from_parse(parse_result, subject)
+    if status_code == 503:
+        return _busy_response(complete_result)
+
+    return complete_result, status_code
+
+
+@endpoint
+async def analyze_batch(request):
+    """Complete text pipeline over a batch of surveys (JSON list or NDJSON)"""
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if mimetype in wsgi.NDJSON_MIMETYPES:
+        _check_content_length(request)
+        surveys = list(wsgi._read_ndjson((await request.body()).splitlines()))
+    else:
+        data = await _get_json(request, silent=True)
+        if isinstance(data, dict):
+            data = data.get('surveys')
+        if not isinstance(data, list):
+            return {"error": "Expected a JSON list of surveys, {\"surveys\": [...]} or NDJSON"}, 400
+        surveys = data
+
+    if not surveys:
+        return {"error": "No surveys provided"}, 400
+    if len(surveys) > Config.MAX_BATCH_SIZE:
+        return {
+            "error": f"Batch too large: {len(surveys)} surveys (max {Config.MAX_BATCH_SIZE})"
+        }, 413
+
+    result = pipeline.analyze_batch(surveys)
+    if len(result['results']) + len(result['errors']) < Config.STREAM_BATCH_THRESHOLD or _timings_requested(request):
+        return result, 200
+    return StreamingResponse(wsgi.app.json.iter_encode(result), media_type='application/json')
+
+
+@endpoint
+async def get_job(request):
+    """Status and, once finished, result of a background image job"""
+    job = job_queue.get(request.path_params['job_id'])
+    if job is None:
+        return {"error": "Job not found or expired"}, 404
+
+    if 'result' in job:
+        job['result'], job['result_status'] = job['result']
+
+    return job, 200
+
+
+@endpoint
+async def cache_stats(request):
+    """Hit/miss counters for sizing the caches"""
+    ocr_cache = ocr_processor.ocr_cache
+    return {
+        "ocr": ocr_cache.stats() if ocr_cache is not None else None,
+        "pipeline": pipeline.cache_stats()
+    }, 200
+
+
+@endpoint
+async def admission_stats(request):
+    """Concurrency budgets, upload bytes in flight and rejection counters"""
+    return admission.stats(), 200
+
+
+@endpoint
+async def scoring_model(request):
+    """Version, weights and thresholds risk scores are currently computed with"""
+    return risk_classifier.model.to_dict(), 200
+
+
+@endpoint
+async def stats(request):
+    """Population aggregates: risk levels, factor prevalence and co-occurrence, by age band"""
+    return wsgi._population_query(request.query_params.getlist)
+
+
+@endpoint
+async def get_result(request):
+    """A stored /analyze-complete result"""
+    # Reads wait for queued writes, so keep them off the event loop
+    return await asyncio.to_thread(wsgi._get_stored_result, request.path_params['result_id'])
+
+
+@endpoint
+async def find_results(request):
+    """Stored results by subject and/or time range, newest first"""
+    return await asyncio.to_thread(wsgi._find_stored_results, request.query_params)
+
+
+@endpoint
+async def prometheus_metrics(request):
+    """Stage and request latency histograms in Prometheus text format"""
+    return Response(metrics.render_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+def _timings_requested(request):
+    return metrics.enabled and request.query_params.get('timings', '').lower() in ('1', 'true', 'yes')
+
+
+async def _admit(request):
+    """Admission ticket for the request (None if not controlled); waits off the loop when queued"""
+    if not admission.enabled:
+        return None
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    route_class = admission.route_class(request.method, mimetype)
+    if route_class is None:
+        return None
+
+    length = request.headers.get('content-length')
+    client = request.client.host if request.client else None
+    ticket = admission.admit(route_class, client, int(length) if length and length.isdigit() else None)
+    if not ticket.started:
+        # Shielded: a client disconnect cancels this await, not the thread inside ticket.wait()
+        waiting = asyncio.ensure_future(asyncio.to_thread(ticket.wait))
+        try:
+            await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # Release once wait() returns: the slot it took, or nothing if it timed out
+            waiting.add_done_callback(functools.partial(_release_after_wait, ticket))
+            raise
+        except BaseException:
+            ticket.release()
+            raise
+    return ticket
+
+
+def _release_after_wait(ticket, waiting):
+    if not waiting.cancelled():
+        waiting.exception()  # A timeout nobody awaits any more isn't an unhandled error
+    ticket.release()
+
+
+def _check_content_length(request):
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > Config.MAX_CONTENT_LENGTH:
+        raise RequestError(f"Request body too large (max {Config.MAX_CONTENT_LENGTH} bytes)", 413)
+
+
+async def _get_json(request, silent=False):
+    """Decoded JSON body, timed as the json_decode stage like the Flask app.
+
+    Undecodable bodies raise ValueError, answered with a 500 like Flask's get_json.
+    """
+    _check_content_length(request)
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if mimetype != 'application/json' and not mimetype.endswith('+json'):
+        if silent:
+            return None
+        raise ValueError(
+            "415 Unsupported Media Type: Did not attempt to load JSON data because the request Content-Type was not 'application/json'."
+        )
+
+    body = await request.body()
+    start = time.perf_counter()
+    try:
+        return wsgi.app.json.loads(body)
+    except ValueError:
+        if silent:
+            return None
+        raise
+    finally:
+        if metrics.enabled:
+            metrics.observe_stage('json_decode', time.perf_counter() - start)
+
+
+async def _get_upload(request, check_filename=True):
+    """(form, validated 'image' upload); raises RequestError like the Flask checks"""
+    _check_content_length(request)
+    form = await request.form()
+    upload = form.get('image')
+    if upload is None or not hasattr(upload, 'filename'):
+        raise RequestError("No image file provided")
+    if check_filename and upload.filename == '':
+        raise RequestError("No file selected")
+    if not validate_image(SimpleNamespace(filename=upload.filename or '')):
+        raise RequestError("Invalid image format")
+    return form, upload
+
+
+def _with_upload(fn, upload):
+    """fn(image) on an upload already spooled by the multipart parser (runs off the event loop)"""
+    file = SimpleNamespace(stream=upload.file, filename=upload.filename)
+    with wsgi._open_upload(file) as image:
+        return fn(image)
+
+
+def _wants_async(request, form):
+    value = request.query_params.get('async') or form.get('async') or ''
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _submit_job(fn, image, *args):
+    """Queue an image job and answer 202 with where to poll for it"""
+    try:
+        job_id = job_queue.submit(fn, image, *args)
+    except QueueFullError as e:
+        return _busy_response({"status": "busy", "error": str(e)})
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}"
+    }, 202, {"Location": f"/jobs/{job_id}"}
+
+
+def _busy_response(result):
+    """503 telling the client to retry once the OCR queue drains"""
+    return result, 503, {"Retry-After": str(int(Config.OCR_TIMEOUT) or 1)}
+
+
+async def _http_error(request, exc):
+    if exc.status_code == 404:
+        return json_response({"error": "Endpoint not found"}, 404)
+    return json_response({"error": exc.detail}, exc.status_code)
+
+
+async def _internal_error(request, exc):
+    return json_response({"error": "Internal server error"}, 500)
+
+
+app = Starlette(
+    routes=[
+        Route('/', health_check, methods=['GET']),
+        Route('/parse-text', parse_text, methods=['POST']),
+        Route('/parse-image', parse_image, methods=['POST']),
+        Route('/parse-document', parse_document, methods=['POST']),
+        Route('/parse-image-batch', parse_image_batch, methods=['POST']),
+        Route('/extract-factors', extract_factors, methods=['POST']),
+        Route('/classify-risk', classify_risk, methods=['POST']),
+        Route('/get-recommendations', get_recommendations, methods=['POST']),
+        Route('/analyze-complete', analyze_complete, methods=['POST']),
+        Route('/analyze-batch', analyze_batch, methods=['POST']),
+        Route('/jobs/{job_id}', get_job, methods=['GET']),
+        Route('/cache-stats', cache_stats, methods=['GET']),
+        Route('/admission-stats', admission_stats, methods=['GET']),
+        Route('/scoring-model', scoring_model, methods=['GET']),
+        Route('/stats', stats, methods=['GET']),
+        Route('/results', find_results, methods=['GET']),
+        Route('/results/{result_id}', get_result, methods=['GET']),
+        Route('/metrics', prometheus_metrics, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    exception_handlers={HTTPException: _http_error, 500: _internal_error}
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    print("Starting ASGI app on http://127.0.0.1:8080")
+    uvicorn.run(app, host='127.0.0.1', port=8080)
@@ -0,0 +1,132 @@
+# Load test: WSGI (gunicorn gthread + Flask) vs ASGI (gunicorn uvicorn worker + Starlette)
+#
+#   python -m benchmarks.bench_asgi --workers 2 --concurrency 8 64
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from benchmarks.run_benchmarks import percentiles, tesseract_available
+from benchmarks.workloads import ROOT, sample_form_bytes, synthetic_answers
+
+SERVERS = {
+    'wsgi': ['app:app'],
+    'asgi': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app'],
+}
+
+
+@contextmanager
+def serve(args, workers, env=None):
+    """Run gunicorn with gunicorn.conf.py on a free port; yields the base URL"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, **(env or {}), BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(
+        ['gunicorn', '-c', 'gunicorn.conf.py'] + args,
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base_url + '/', timeout=1).read()
+                break
+            except Exception:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError(f"Server failed to start: {' '.join(args)}")
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def multipart(field, filename, content):
+    """(body, content type) for a single-file multipart upload"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def load(url, body, content_type, count, concurrency):
+    """Send count POSTs with concurrency in flight; latency summary plus throughput"""
+    def send(_):
+        req = urllib.request.Request(url, data=body, method='POST')
+        req.add_header('Content-Type', content_type)
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(req, timeout=120).read()
+            ok = True
+        except urllib.error.HTTPError as e:
+            e.read()
+            ok = e.code < 500
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(send, range(count)))
+    elapsed = time.perf_counter() - started
+    return dict(
+        percentiles([seconds for seconds, _ in outcomes]),
+        requests_per_sec=round(count / elapsed, 2),
+        failed=sum(1 for _, ok in outcomes if not ok)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WSGI and ASGI serving modes")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 64])
+    parser.add_argument('--requests', type=int, default=400, help="Text requests per run")
+    parser.add_argument('--image-requests', type=int, default=40, help="Image uploads per run")
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    if not shutil.which('gunicorn'):
+        raise SystemExit("gunicorn is not installed")
+
+    survey = json.dumps(synthetic_answers(1)[0]).encode('utf-8')
+    upload, upload_type = multipart('image', 'survey_form.jpg', sample_form_bytes())
+    has_tesseract = tesseract_available()
+
+    results = {}
+    for mode, server_args in SERVERS.items():
+        with serve(server_args, args.workers) as base_url:
+            for concurrency in args.concurrency:
+                runs = [('analyze_complete_text', '/analyze-complete', survey, 'application/json', args.requests)]
+                if has_tesseract:
+                    runs.append(('parse_image', '/parse-image', upload, upload_type, args.image_requests))
+                for name, path, body, content_type, count in runs:
+                    result = load(base_url + path, body, content_type, count, concurrency)
+                    results[f"{mode}.{name}.c{concurrency}"] = result
+                    print(
+                        f"{mode:<5} {name:<22} c={concurrency:<4} p50 {result['p50_ms']:>9.2f} ms  "
+                        f"p99 {result['p99_ms']:>9.2f} ms  {result['requests_per_sec']:>8.1f} req/s  "
+                        f"failed {result['failed']}"
+                    )
+
+    if not has_tesseract:
+        print("Tesseract not installed: image uploads not load tested")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
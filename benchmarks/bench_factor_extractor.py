@@ -0,0 +1,75 @@
+# Microbenchmark: per-survey factor extraction, legacy scans vs compiled rule table
+import argparse
+import timeit
+
+from benchmarks.workloads import synthetic_answers
+from models.factor_extractor import FactorExtractor
+from utils.metrics import metrics
+
+def legacy_extract_factors(answers):
+    """Pre-rule-table FactorExtractor.extract_factors, kept for comparison"""
+    factors = []
+    confidence_scores = []
+    if answers.get('smoker') is True:
+        factors.append('smoking')
+        confidence_scores.append(0.95)
+    diet = answers.get('diet', '').lower()
+    if any(term in diet for term in ['high sugar', 'fast food', 'processed', 'junk']):
+        factors.append('poor diet')
+        confidence_scores.append(0.9)
+    exercise = answers.get('exercise', '').lower()
+    if exercise in ['rarely', 'never', 'seldom']:
+        factors.append('low exercise')
+        confidence_scores.append(0.85)
+    alcohol = answers.get('alcohol', '').lower()
+    if alcohol in ['heavy', 'excessive', 'daily']:
+        factors.append('excessive alcohol')
+        confidence_scores.append(0.9)
+    sleep = answers.get('sleep', '').lower()
+    if any(term in sleep for term in ['poor', 'insomnia', 'less than 6', '<6']):
+        factors.append('poor sleep')
+        confidence_scores.append(0.8)
+    stress = answers.get('stress', '').lower()
+    if stress in ['high', 'severe', 'chronic']:
+        factors.append('high stress')
+        confidence_scores.append(0.85)
+    family_history = answers.get('family_history', '').lower()
+    if family_history in ['yes', 'true', 'positive']:
+        factors.append('family history')
+        confidence_scores.append(0.9)
+    if confidence_scores:
+        overall_confidence = sum(confidence_scores) / len(confidence_scores)
+    else:
+        overall_confidence = 0.95
+    return {"factors": factors, "confidence": round(overall_confidence, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-survey factor extraction: legacy scans vs compiled rule table")
+    parser.add_argument('--surveys', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    # Compare the extraction logic alone, without stage instrumentation
+    metrics.enabled = False
+    
+    surveys = synthetic_answers(args.surveys)
+    extractor = FactorExtractor()
+    
+    # Both implementations must agree before timing means anything
+    for answers in surveys:
+        assert extractor.extract_factors(answers) == legacy_extract_factors(answers), answers
+    
+    def run_legacy():
+        for answers in surveys:
+            legacy_extract_factors(answers)
+    
+    def run_compiled():
+        for answers in surveys:
+            extractor.extract_factors(answers)
+    
+    for name, fn in (('legacy', run_legacy), ('compiled', run_compiled)):
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:>8}: {best / len(surveys) * 1e6:.2f} us/survey")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Benchmark: one parse_image call per scan vs parse_image_batch (dedupe + shared-memory process pool)
+import argparse
+import os
+import time
+
+from benchmarks.run_benchmarks import tesseract_available
+from benchmarks.workloads import synthetic_form_bytes
+from models.image_batch import ImageBatchParser
+from models.ocr_processor import OCRProcessor
+from utils.metrics import metrics
+
+
+def batch_images(count, duplicates, seed=0):
+    """``count`` encoded forms, the last ``duplicates`` fraction of them repeats of earlier ones"""
+    unique = max(1, round(count * (1 - duplicates)))
+    forms = [image for image, _ in synthetic_form_bytes(unique, seed=seed)]
+    return [forms[i % unique] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential parse_image vs parse_image_batch")
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--duplicates', type=float, default=0.25, help="Fraction of the batch that repeats earlier scans")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    metrics.enabled = False
+    images = batch_images(args.images, args.duplicates)
+    print(f"{args.images} images, {len(set(images))} distinct, {os.cpu_count()} CPUs")
+
+    # No OCR cache, so every run does the same work
+    processor = OCRProcessor()
+    processor.ocr_cache = None
+    processor.parse_image(images[0])  # Warm up the image stack
+
+    started = time.perf_counter()
+    sequential = [processor.parse_image(image) for image in images]
+    baseline = time.perf_counter() - started
+    print(f"{'sequential':<20}{baseline * 1000:>10.0f} ms")
+
+    for workers in args.workers:
+        batch_parser = ImageBatchParser(processor, workers=workers)
+        batch_parser.parse_images(images[:workers])  # Start the pool outside the timing
+        started = time.perf_counter()
+        results = batch_parser.parse_images(images)
+        elapsed = time.perf_counter() - started
+        batch_parser.close()
+
+        same = all(
+            {k: v for k, v in result.items() if k != 'duplicate_of'} == expected
+            for result, expected in zip(results, sequential)
+        )
+        print(f"{f'batch, {workers} workers':<20}{elapsed * 1000:>10.0f} ms{baseline / elapsed:>8.1f}x  same results: {same}")
+
+    if not tesseract_available():
+        print("Tesseract not installed: timings cover decoding and preprocessing only")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Benchmark: legacy vs adaptive image preprocessing (latency and OCR field recovery)
+import argparse
+import timeit
+
+import cv2
+
+from benchmarks.run_benchmarks import tesseract_available
+from benchmarks.workloads import sample_form_bytes, synthetic_answers, synthetic_form_image
+from models.ocr_processor import OCRProcessor
+from utils.metrics import metrics
+
+# What survey_form.jpg says
+SAMPLE_FORM_ANSWERS = {
+    'age': 42,
+    'smoker': True,
+    'exercise': 'rarely',
+    'diet': 'high sugar',
+    'alcohol': 'moderate',
+    'sleep': 'poor'
+}
+
+
+def variants(seed=0):
+    """(name, encoded image, expected answers) test images"""
+    answers = synthetic_answers(1, seed=seed)[0]
+    clean = synthetic_form_image(answers)
+    images = [
+        ('survey_form.jpg', sample_form_bytes(), SAMPLE_FORM_ANSWERS),
+        ('synthetic_clean.png', cv2.imencode('.png', clean)[1].tobytes(), answers),
+        ('synthetic_noisy.jpg', cv2.imencode('.jpg', synthetic_form_image(answers, noise=0.15, seed=seed))[1].tobytes(), answers),
+        ('synthetic_skewed.jpg', cv2.imencode('.jpg', synthetic_form_image(answers, angle=2.0))[1].tobytes(), answers),
+        ('synthetic_12mp.jpg', cv2.imencode('.jpg', cv2.resize(clean, (3024, 4032)))[1].tobytes(), answers),
+    ]
+    return images
+
+
+def field_recovery(processor, processed, expected):
+    """Fraction of expected answers the OCR text parser recovers correctly"""
+    text = processor.ocr_backend.image_to_string(processed)
+    parsed = processor.parse_text(processor._parse_extracted_text(text)).get('answers', {})
+    normalized = {field: processor._normalize_field_value(field, value) for field, value in expected.items()}
+    hits = sum(1 for field, value in normalized.items() if parsed.get(field) == value)
+    return round(hits / len(normalized), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Legacy vs adaptive preprocessing: latency and OCR field recovery")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    metrics.enabled = False
+    has_tesseract = tesseract_available()
+    processors = {}
+    for mode in ('legacy', 'adaptive'):
+        processors[mode] = OCRProcessor()
+        processors[mode].preprocess_mode = mode
+
+    print(f"{'image':<22}{'mode':<10}{'ms':>9}{'pixels':>12}{'recovery':>10}")
+    for name, image, expected in variants():
+        for mode, processor in processors.items():
+            best = min(timeit.repeat(lambda: processor._preprocess_image(image), number=1, repeat=args.repeat))
+            processed = processor._preprocess_image(image)
+            recovery = field_recovery(processor, processed, expected) if has_tesseract else 'n/a'
+            print(f"{name:<22}{mode:<10}{best * 1000:>9.1f}{processed.size:>12}{recovery:>10}")
+
+    if not has_tesseract:
+        print("Tesseract not installed: field recovery not measured")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Benchmark: worker cold start (import time, first and second request) for text and image workers
+#
+#   python -m benchmarks.bench_startup --runs 5
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FORM = os.path.join(ROOT, 'survey_form.jpg')
+
+# Modules the OCR stack pulls in; a text-only worker should never load them
+HEAVY_MODULES = ('cv2', 'numpy', 'PIL', 'pytesseract')
+
+# scenario -> (request kind, load the OCR stack before serving, as gunicorn --preload does)
+SCENARIOS = {
+    'text': ('text', False),
+    'image': ('image', False),
+    'image-preload': ('image', True),
+}
+
+SURVEY = {
+    "age": 42,
+    "smoker": True,
+    "exercise": "rarely",
+    "diet": "high sugar",
+    "sleep": "poor"
+}
+
+METRICS = ('import_ms', 'preload_ms', 'first_request_ms', 'second_request_ms', 'max_rss_mb')
+
+
+def child(scenario):
+    """Run one fresh worker process; prints its timings as JSON"""
+    kind, preload = SCENARIOS[scenario]
+
+    start = time.perf_counter()
+    import app
+    imported = time.perf_counter()
+    if preload:
+        app.warm_start()
+    ready = time.perf_counter()
+    loaded_before = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    client = app.app.test_client()
+
+    def send():
+        began = time.perf_counter()
+        if kind == 'text':
+            client.post('/analyze-complete', json=SURVEY)
+        else:
+            with open(SAMPLE_FORM, 'rb') as f:
+                client.post('/parse-image', data={'image': (f, 'survey_form.jpg')})
+        return time.perf_counter() - began
+
+    first = send()
+    second = send()
+
+    import resource
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "preload_ms": (ready - imported) * 1000,
+        "first_request_ms": first * 1000,
+        "second_request_ms": second * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "heavy_modules_at_start": loaded_before,
+        "heavy_modules_after_requests": [name for name in HEAVY_MODULES if name in sys.modules]
+    }))
+
+
+def run_scenario(scenario, runs):
+    """Median of each metric over ``runs`` fresh processes"""
+    # No OCR cache, so the second image request really runs OCR again
+    env = dict(os.environ, OCR_CACHE_BYTES='0', OCR_CACHE_DIR='', METRICS_ENABLED='false')
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_startup', '--child', scenario],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {metric: round(statistics.median(s[metric] for s in samples), 2) for metric in METRICS}
+    result['heavy_modules_at_start'] = samples[0]['heavy_modules_at_start']
+    result['heavy_modules_after_requests'] = samples[0]['heavy_modules_after_requests']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold start: import time and first-request latency")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per scenario")
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--output', help="Write results as JSON")
+    parser.add_argument('--child', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    results = {}
+    print(f"{'scenario':<15}{'import':>9}{'preload':>9}{'1st req':>10}{'2nd req':>10}{'rss MB':>8}  loaded at start")
+    for scenario in args.scenario:
+        result = results[scenario] = run_scenario(scenario, args.runs)
+        print(
+            f"{scenario:<15}{result['import_ms']:>9.1f}{result['preload_ms']:>9.1f}"
+            f"{result['first_request_ms']:>10.1f}{result['second_request_ms']:>10.1f}"
+            f"{result['max_rss_mb']:>8.1f}  {', '.join(result['heavy_modules_at_start']) or '-'}"
+        )
+    print("Times in ms (median of --runs fresh processes). Without Tesseract, image requests stop at the OCR call.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
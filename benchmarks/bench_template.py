@@ -0,0 +1,68 @@
+# Benchmark: template mode (aligned answer regions) vs full-page OCR on the sample form
+import argparse
+import os
+import timeit
+
+import cv2
+import numpy as np
+
+from benchmarks.run_benchmarks import tesseract_available
+from benchmarks.workloads import ROOT, sample_form_bytes
+from models.form_template import FormTemplate, stack_regions
+from models.ocr_processor import OCRProcessor
+from utils.metrics import metrics
+
+TEMPLATE_FILE = os.path.join(ROOT, 'form_templates', 'survey_form.json')
+
+
+def skewed(image_bytes, angle=3.0, scale=0.85):
+    """The sample form rotated and shrunk, as a crooked rescan would be"""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, scale)
+    rotated = cv2.warpAffine(image, matrix, (width, height), borderValue=(40, 40, 40))
+    return cv2.imencode('.jpg', rotated)[1].tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template mode vs full-page OCR: pixels OCR'd and latency")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    metrics.enabled = False
+    template = FormTemplate.from_file(TEMPLATE_FILE)
+    full_page = OCRProcessor()
+    full_page.ocr_cache = None
+    full_page.form_template = None
+
+    print(f"{'image':<20}{'path':<12}{'ms':>9}{'ocr pixels':>12}")
+    for name, image in (('survey_form.jpg', sample_form_bytes()), ('skewed rescan', skewed(sample_form_bytes()))):
+        gray = full_page.adaptive_preprocessor.load_gray(image)
+        best = min(timeit.repeat(lambda: template.align(gray), number=1, repeat=args.repeat))
+        homography = template.align(gray)
+        if homography is None:
+            print(f"{name:<20}{'template':<12}{'not aligned':>21}")
+        else:
+            stacked = stack_regions(list(template.region_images(gray, homography).values()))
+            print(f"{name:<20}{'template':<12}{best * 1000:>9.1f}{stacked.size:>12}")
+
+        for mode in ('legacy', 'adaptive'):
+            full_page.preprocess_mode = mode
+            best = min(timeit.repeat(lambda: full_page._preprocess_image(image), number=1, repeat=args.repeat))
+            print(f"{name:<20}{mode:<12}{best * 1000:>9.1f}{full_page._preprocess_image(image).size:>12}")
+
+    print("ms: alignment (template) or preprocessing (full page), before OCR")
+
+    if tesseract_available():
+        templated = OCRProcessor(form_template=template)
+        templated.ocr_cache = None
+        full_page.preprocess_mode = 'legacy'
+        for label, processor in (('template', templated), ('full page', full_page)):
+            best = min(timeit.repeat(lambda: processor.parse_image(sample_form_bytes()), number=1, repeat=args.repeat))
+            print(f"parse_image {label:<10}{best * 1000:>9.1f} ms")
+    else:
+        print("Tesseract not installed: end-to-end OCR latency not measured")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+# Reproducible benchmark suite: pipeline stages and every endpoint
+#
+#   python -m benchmarks.run_benchmarks --output bench.json
+#   python -m benchmarks.run_benchmarks --gunicorn --compare baseline.json
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.workloads import (
+    ROOT,
+    load_surveys_file,
+    postman_payloads,
+    sample_form_bytes,
+    synthetic_answers,
+    synthetic_form_bytes
+)
+from config import Config
+from models.ocr_backends import load_pytesseract
+
+SCHEMA_VERSION = 1
+
+
+def percentiles(samples):
+    """Latency summary in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 4)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 4)
+    }
+
+
+def time_calls(fn, args_list, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def tesseract_available():
+    try:
+        load_pytesseract().get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def bench_stages(surveys, images, has_tesseract):
+    """Per-stage latency, calling each processor directly"""
+    from app import factor_extractor, ocr_processor, recommender, risk_classifier
+    from models.pipeline import AnalysisPipeline
+    from utils.validators import validate_input
+
+    parsed = [ocr_processor.parse_text(s) for s in surveys]
+    answers = [p['answers'] for p in parsed if 'answers' in p]
+    factors = [factor_extractor.extract_factors(a)['factors'] for a in answers]
+    risks = [risk_classifier.classify_risk(f) for f in factors]
+
+    stages = {
+        "validate_input": time_calls(validate_input, [(s,) for s in surveys]),
+        "parse_text": time_calls(ocr_processor.parse_text, [(s,) for s in surveys]),
+        "extract_factors": time_calls(factor_extractor.extract_factors, [(a,) for a in answers]),
+        "classify_risk": time_calls(risk_classifier.classify_risk, [(f,) for f in factors]),
+        "generate_recommendations": time_calls(
+            recommender.generate_recommendations,
+            [(r['risk_level'], f) for r, f in zip(risks, factors)]
+        ),
+        "analyze_parsed_uncached": time_calls(
+            AnalysisPipeline(ocr_processor, factor_extractor, risk_classifier, recommender, cache_size=0).analyze_parsed,
+            [(p,) for p in parsed if 'answers' in p]
+        ),
+        "analyze_parsed_cached": time_calls(
+            AnalysisPipeline(ocr_processor, factor_extractor, risk_classifier, recommender).analyze_parsed,
+            [(p,) for p in parsed if 'answers' in p],
+            repeat=2
+        ),
+    }
+
+    start = time.perf_counter()
+    risk_classifier.classify_batch(factors)
+    stages["classify_batch_per_record"] = [(time.perf_counter() - start) / max(len(factors), 1)]
+
+    stages["preprocess_image"] = time_calls(ocr_processor._preprocess_image, [(img,) for img in images])
+    if has_tesseract:
+        processed = [ocr_processor._preprocess_image(img) for img in images]
+        texts = [ocr_processor.ocr_backend.image_to_string(p) for p in processed]
+        stages["image_to_string"] = time_calls(ocr_processor.ocr_backend.image_to_string, [(p,) for p in processed])
+        stages["parse_extracted_text"] = time_calls(ocr_processor._parse_extracted_text, [(t,) for t in texts])
+
+    return {name: percentiles(samples) for name, samples in stages.items()}
+
+
+def endpoint_requests(payloads, surveys, images):
+    """(name, method, path, kwargs) for every endpoint, test-client style"""
+    batch = surveys[:500]
+    requests = [
+        ("health_check", "GET", "/", {}),
+        ("metrics", "GET", "/metrics", {}),
+    ]
+    for path, body in sorted(payloads.items()):
+        requests.append((path.strip('/'), "POST", path, {"json": body}))
+    requests.append(("analyze_batch_500", "POST", "/analyze-batch", {"json": batch}))
+    for i, image in enumerate(images[:2]):
+        requests.append((f"parse_image_{i}", "POST", "/parse-image", {"image": image}))
+        requests.append((f"analyze_complete_image_{i}", "POST", "/analyze-complete", {"image": image}))
+    return requests
+
+
+def bench_test_client(requests, iterations, has_tesseract):
+    """End-to-end latency, throughput and memory through Flask's test client"""
+    from app import app
+    client = app.test_client()
+    results = {}
+
+    for name, method, path, kwargs in requests:
+        if 'image' in kwargs and not has_tesseract:
+            results[name] = {"skipped": "tesseract not installed"}
+            continue
+        count = max(1, iterations // 20) if 'image' in kwargs or 'batch' in name else iterations
+
+        def send():
+            if 'image' in kwargs:
+                from io import BytesIO
+                data = {'image': (BytesIO(kwargs['image']), 'form.jpg')}
+                return client.open(path, method=method, data=data, content_type='multipart/form-data')
+            return client.open(path, method=method, json=kwargs.get('json'))
+
+        send()  # Warm up
+        samples = []
+        started = time.perf_counter()
+        for _ in range(count):
+            start = time.perf_counter()
+            response = send()
+            samples.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+
+        # Peak Python allocation for one request
+        tracemalloc.start()
+        send()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = dict(
+            percentiles(samples),
+            requests_per_sec=round(count / elapsed, 2),
+            status_code=response.status_code,
+            peak_alloc_bytes=peak
+        )
+    return results
+
+
+def bench_gunicorn(requests, iterations, workers, concurrency, has_tesseract):
+    """End-to-end latency and throughput against a local gunicorn server"""
+    if not shutil.which('gunicorn'):
+        return {"skipped": "gunicorn not installed"}
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        ['gunicorn', '-w', str(workers), '--threads', '4', '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, env=dict(os.environ, POPULATION_STATS_ENABLED='false'),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base_url + '/', timeout=1).read()
+                break
+            except Exception:
+                if time.time() > deadline or server.poll() is not None:
+                    return {"skipped": "gunicorn failed to start"}
+                time.sleep(0.2)
+
+        results = {}
+        for name, method, path, kwargs in requests:
+            if 'image' in kwargs:
+                # Keep the HTTP client stdlib-only; image endpoints are covered by the test client run
+                if not has_tesseract:
+                    results[name] = {"skipped": "tesseract not installed"}
+                continue
+            body = json.dumps(kwargs['json']).encode('utf-8') if 'json' in kwargs else None
+            count = max(1, iterations // 20) if 'batch' in name else iterations
+
+            def send(_):
+                req = urllib.request.Request(base_url + path, data=body, method=method)
+                if body is not None:
+                    req.add_header('Content-Type', 'application/json')
+                start = time.perf_counter()
+                try:
+                    urllib.request.urlopen(req, timeout=60).read()
+                except urllib.error.HTTPError as e:
+                    e.read()
+                return time.perf_counter() - start
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                samples = list(executor.map(send, range(count)))
+            elapsed = time.perf_counter() - started
+            results[name] = dict(percentiles(samples), requests_per_sec=round(count / elapsed, 2))
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def compare(current, baseline_path, tolerance):
+    """Print p50 changes against a previous run; returns the regressed benchmarks"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for section in ('stages', 'test_client', 'gunicorn'):
+        for name, result in (current.get(section) or {}).items():
+            before = (baseline.get(section) or {}).get(name)
+            if not isinstance(result, dict) or not isinstance(before, dict):
+                continue
+            if 'p50_ms' not in result or 'p50_ms' not in before or not before['p50_ms']:
+                continue
+            ratio = result['p50_ms'] / before['p50_ms']
+            marker = ''
+            if ratio > 1 + tolerance:
+                marker = '  REGRESSION'
+                regressions.append(f"{section}.{name}")
+            print(f"{section}.{name}: p50 {before['p50_ms']:.4f} -> {result['p50_ms']:.4f} ms ({ratio:.2f}x){marker}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages and endpoints")
+    parser.add_argument('--surveys', type=int, default=2000, help="Synthetic surveys to generate")
+    parser.add_argument('--surveys-file', help="NDJSON file of surveys to use instead of synthetic ones")
+    parser.add_argument('--images', type=int, default=3, help="Synthetic form images to generate")
+    parser.add_argument('--iterations', type=int, default=200, help="Requests per endpoint")
+    parser.add_argument('--gunicorn', action='store_true', help="Also benchmark a local gunicorn server")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="Previous results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p50 slowdown before flagging")
+    args = parser.parse_args()
+
+    # Benchmark traffic must not end up in the /stats population counts
+    Config.POPULATION_STATS_ENABLED = False
+
+    surveys = load_surveys_file(args.surveys_file) if args.surveys_file else synthetic_answers(args.surveys)
+    images = [sample_form_bytes()] + [image for image, _ in synthetic_form_bytes(args.images)]
+    has_tesseract = tesseract_available()
+    requests = endpoint_requests(postman_payloads(), surveys, images)
+
+    results = {
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": time.time(),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "tesseract": has_tesseract,
+        "config": vars(args),
+        "stages": bench_stages(surveys, images, has_tesseract),
+        "test_client": bench_test_client(requests, args.iterations, has_tesseract),
+        "gunicorn": (
+            bench_gunicorn(requests, args.iterations, args.workers, args.concurrency, has_tesseract)
+            if args.gunicorn else None
+        ),
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
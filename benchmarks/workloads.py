@@ -0,0 +1,100 @@
+# Benchmark payloads: Postman collection bodies, the sample form and synthetic data
+import json
+import os
+import random
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POSTMAN_COLLECTION = os.path.join(ROOT, 'postman', 'health_risk_profiler.json')
+SAMPLE_FORM = os.path.join(ROOT, 'survey_form.jpg')
+
+FIELD_VALUES = {
+    'smoker': [True, False],
+    'diet': ['high sugar', 'balanced', 'low fat', 'vegetarian', 'fast food and junk', 'mostly processed'],
+    'exercise': ['rarely', 'never', 'sometimes', 'often', 'daily'],
+    'alcohol': ['never', 'rarely', 'moderate', 'heavy', 'daily'],
+    'sleep': ['good', 'poor', 'insomnia', 'less than 6 hours', '8 hours'],
+    'stress': ['low', 'moderate', 'high', 'chronic'],
+    'family_history': ['yes', 'no', 'unknown']
+}
+
+
+def synthetic_answers(count, seed=0):
+    """Random survey answers covering every factor rule"""
+    rng = random.Random(seed)
+    surveys = []
+    for _ in range(count):
+        answers = {'age': rng.randint(18, 90)}
+        for field, values in FIELD_VALUES.items():
+            if field in ('smoker', 'diet', 'exercise') or rng.random() < 0.7:
+                answers[field] = rng.choice(values)
+        surveys.append(answers)
+    return surveys
+
+
+def load_surveys_file(path):
+    """Surveys from an NDJSON file (one JSON object per line)"""
+    surveys = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                surveys.append(json.loads(line))
+    return surveys
+
+
+def postman_payloads(path=POSTMAN_COLLECTION):
+    """Raw JSON request bodies from the Postman collection, keyed by endpoint path"""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    payloads = {}
+    for item in collection.get('item', []):
+        request = item.get('request', {})
+        body = request.get('body', {})
+        if request.get('method') != 'POST' or body.get('mode') != 'raw':
+            continue
+        endpoint = '/' + '/'.join(request['url'].get('path', []))
+        payloads.setdefault(endpoint, json.loads(body['raw']))
+    return payloads
+
+
+def sample_form_bytes():
+    with open(SAMPLE_FORM, 'rb') as f:
+        return f.read()
+
+
+def synthetic_form_image(answers, width=1700, height=2200, noise=0.0, angle=0.0, seed=0):
+    """Render a survey as a scanned-looking page and return it as a BGR array"""
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    scale = width / 850
+    y = int(120 * scale)
+    for field, value in answers.items():
+        if isinstance(value, bool):
+            value = 'yes' if value else 'no'
+        label = field.replace('_', ' ').title()
+        cv2.putText(image, f"{label}: {value}", (int(60 * scale), y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.0 * scale, (0, 0, 0), max(1, int(2 * scale)), cv2.LINE_AA)
+        y += int(70 * scale)
+
+    if angle:
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        image = cv2.warpAffine(image, matrix, (width, height), borderValue=(255, 255, 255))
+    if noise:
+        rng = np.random.default_rng(seed)
+        speckle = rng.normal(0, 255 * noise, image.shape)
+        image = np.clip(image.astype(np.float32) + speckle, 0, 255).astype(np.uint8)
+    return image
+
+
+def synthetic_form_bytes(count, seed=0, **kwargs):
+    """Encoded JPEG forms plus the answers rendered on each"""
+    forms = []
+    for i, answers in enumerate(synthetic_answers(count, seed=seed)):
+        image = synthetic_form_image(answers, seed=seed + i, **kwargs)
+        ok, encoded = cv2.imencode('.jpg', image)
+        if ok:
+            forms.append((encoded.tobytes(), answers))
+    return forms
@@ -0,0 +1,145 @@
+# Offline bulk scoring: stream NDJSON surveys through the pipeline
+#
+#   python bulk_score.py surveys.ndjson -o results.ndjson --workers 8
+#   cat surveys.ndjson | python bulk_score.py - > results.ndjson
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Per-process pipeline, built once by _init_worker
+_pipeline = None
+
+
+def _build_pipeline():
+    from models.ocr_processor import OCRProcessor
+    from models.factor_extractor import FactorExtractor
+    from models.risk_classifier import RiskClassifier
+    from models.recommender import Recommender
+    from models.pipeline import AnalysisPipeline
+
+    return AnalysisPipeline(OCRProcessor(), FactorExtractor(), RiskClassifier(), Recommender())
+
+
+def _init_worker():
+    global _pipeline
+    _pipeline = _build_pipeline()
+
+
+def score_chunk(chunk):
+    """Score (line_number, raw_line) pairs; returns one output dict per record"""
+    surveys = []
+    for line_number, line in chunk:
+        try:
+            surveys.append(json.loads(line))
+        except ValueError as e:
+            surveys.append(ValueError(f"Invalid JSON on line {line_number}: {str(e)}"))
+
+    batch = _pipeline.analyze_batch(surveys)
+    records = batch['results'] + batch['errors']
+    for record in records:
+        record['line'] = chunk[record.pop('index')][0]
+    records.sort(key=lambda record: record['line'])
+    return records
+
+
+def read_chunks(stream, chunk_size):
+    """Yield lists of (line_number, line) for non-blank lines, chunk_size at a time"""
+    numbered = ((n, line) for n, line in enumerate(stream, start=1) if line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_results(chunks, workers):
+    """Score chunks in order, keeping at most 2 x workers chunks in flight.
+
+    A chunk that fails as a whole becomes one error record per line, so
+    the stream carries on.
+    """
+    if workers <= 1:
+        _init_worker()
+        for chunk in chunks:
+            try:
+                records = score_chunk(chunk)
+            except Exception as e:
+                records = _chunk_errors(chunk, e)
+            yield records
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+        chunks = iter(chunks)
+        exhausted = False
+
+        while True:
+            # Bounded window keeps memory flat however large the input is
+            while not exhausted and len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending.append((chunk, executor.submit(score_chunk, chunk)))
+
+            if not pending:
+                return
+
+            # Block on the oldest chunk; later ones keep running meanwhile
+            chunk, future = pending.popleft()
+            try:
+                records = future.result()
+            except Exception as e:
+                records = _chunk_errors(chunk, e)
+            yield records
+
+
+def _chunk_errors(chunk, error):
+    return [
+        {"status": "error", "error": f"Scoring error: {str(error)}", "line": line_number}
+        for line_number, _ in chunk
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an NDJSON stream of surveys")
+    parser.add_argument('input', help="NDJSON file of surveys, or - for stdin")
+    parser.add_argument('-o', '--output', default='-', help="NDJSON results file, or - for stdout")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Records per worker task")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    total = failed = 0
+    started = time.perf_counter()
+    try:
+        for records in iter_results(read_chunks(source, args.chunk_size), args.workers):
+            for record in records:
+                total += 1
+                if record.get('status') != 'ok':
+                    failed += 1
+                sink.write(json.dumps(record, separators=(',', ':')))
+                sink.write('\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0.0
+    print(
+        f"Scored {total} records ({failed} failed) in {elapsed:.2f}s ({rate:.0f} records/s)",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,62 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Uploads up to this size are decoded straight from memory; larger ones are spooled to UPLOAD_FOLDER
+    UPLOAD_SPOOL_THRESHOLD = int(os.environ.get('UPLOAD_SPOOL_THRESHOLD', 8 * 1024 * 1024))
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))  # Surveys per /analyze-batch request
+    STREAM_BATCH_THRESHOLD = int(os.environ.get('STREAM_BATCH_THRESHOLD', 1000))  # Batches this large stream their response
+    
+    # OCR engine: 'subprocess' (one tesseract process per image) or 'pool'
+    # (long-lived worker processes, falls back to subprocess if unavailable)
+    OCR_BACKEND = os.environ.get('OCR_BACKEND', 'subprocess')
+    OCR_POOL_WORKERS = int(os.environ.get('OCR_POOL_WORKERS', os.cpu_count() or 2))
+    OCR_POOL_MAX_PENDING = int(os.environ.get('OCR_POOL_MAX_PENDING', 16))  # Queued images beyond busy workers
+    OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 30))  # Seconds to wait for a slot / a result
+    OCR_BATCH_WORKERS = int(os.environ.get('OCR_BATCH_WORKERS', os.cpu_count() or 2))  # Processes for /parse-image-batch
+    MAX_IMAGE_BATCH_SIZE = int(os.environ.get('MAX_IMAGE_BATCH_SIZE', 100))  # Images per /parse-image-batch request
+    OCR_LANG = os.environ.get('OCR_LANG', 'eng')
+    TESSERACT_CMD = os.environ.get('TESSERACT_CMD')  # tesseract binary when it isn't on PATH
+    # Image preprocessing: 'legacy' (full-resolution gray/median/Otsu) or 'adaptive'
+    # (reduced decode, downscale to PREPROCESS_CHAR_HEIGHT px text, skip needless denoising, crop)
+    PREPROCESS_MODE = os.environ.get('PREPROCESS_MODE', 'legacy')
+    PREPROCESS_MAX_SIDE = int(os.environ.get('PREPROCESS_MAX_SIDE', 2400))
+    PREPROCESS_CHAR_HEIGHT = int(os.environ.get('PREPROCESS_CHAR_HEIGHT', 32))
+    # Known form layout (JSON, see form_templates/); scans are aligned to it and only answer
+    # regions are OCR'd, falling back to full-page OCR when alignment fails
+    FORM_TEMPLATE_FILE = os.environ.get('FORM_TEMPLATE_FILE')
+    ASGI_OCR_THREADS = int(os.environ.get('ASGI_OCR_THREADS', 32))  # asgi.py: OCR calls in flight per process
+    OCR_REGION_WORKERS = int(os.environ.get('OCR_REGION_WORKERS', os.cpu_count() or 2))  # Parallel form regions per document
+    
+    # OCR result cache keyed by image hash; 0 disables it
+    OCR_CACHE_BYTES = int(os.environ.get('OCR_CACHE_BYTES', 32 * 1024 * 1024))
+    OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR')  # Optional on-disk tier
+    
+    # Memoized factor -> risk -> recommendation results per canonical survey; 0 disables it
+    PIPELINE_CACHE_SIZE = int(os.environ.get('PIPELINE_CACHE_SIZE', 4096))
+    
+    # Background image jobs (?async=true on /parse-image and /analyze-complete)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 64))
+    JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 600))  # Seconds finished jobs stay pollable
+    # SQLite file holding job state, so every worker process can answer /jobs; in-memory if unset
+    # (gunicorn.conf.py sets a temporary one when it starts more than one worker)
+    JOB_STORE_FILE = os.environ.get('JOB_STORE_FILE')
+    
+    # Admission control (see utils/admission.py): separate concurrency budgets for OCR uploads and
+    # text requests, a cap on upload bytes in flight, and optional per-client token buckets
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    OCR_CONCURRENCY = int(os.environ.get('OCR_CONCURRENCY', os.cpu_count() or 2))  # Uploads processed at once
+    OCR_MAX_QUEUED = int(os.environ.get('OCR_MAX_QUEUED', 8))  # Uploads waiting beyond that; more get an immediate 503
+    TEXT_CONCURRENCY = int(os.environ.get('TEXT_CONCURRENCY', 64))
+    TEXT_MAX_QUEUED = int(os.environ.get('TEXT_MAX_QUEUED', 256))
+    ADMISSION_TIMEOUT = float(os.environ.get('ADMISSION_TIMEOUT', 10))  # Seconds a queued request waits for a slot
+    MAX_INFLIGHT_UPLOAD_BYTES = int(os.environ.get('MAX_INFLIGHT_UPLOAD_BYTES', 64 * 1024 * 1024))
+    RATE_LIMIT_PER_SEC = float(os.environ.get('RATE_LIMIT_PER_SEC', 0))  # Tokens per client per second; 0 disables
+    RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 20))
+    RATE_LIMIT_OCR_COST = float(os.environ.get('RATE_LIMIT_OCR_COST', 10))  # Tokens an upload costs (text requests cost 1)
+    
+    # Per-stage latency histograms served at /metrics; set METRICS_ENABLED=false to turn off
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
     
     # Health survey fields
     REQUIRED_FIELDS = ['age', 'smoker', 'exercise', 'diet']
@@ -23,5 +79,52 @@ class Config:
         'family_history': 15
     }
     
+    # Score thresholds: inclusive lower bounds of the moderate and high risk levels
+    RISK_THRESHOLDS = (40, 70)
+    
+    # Versioned weights/thresholds as JSON (ScoringModel.from_file), reloaded when the file
+    # changes; RISK_WEIGHTS and RISK_THRESHOLDS if unset
+    SCORING_MODEL_FILE = os.environ.get('SCORING_MODEL_FILE')
+    SCORING_MODEL_CHECK_INTERVAL = float(os.environ.get('SCORING_MODEL_CHECK_INTERVAL', 1))  # Seconds between mtime checks
+    
+    # Factor extraction rules, compiled once by FactorExtractor. Match types:
+    #   'true'     - answer is exactly True
+    #   'contains' - lowercased answer contains any term
+    #   'exact'    - lowercased answer equals one of the terms
+    # Set FACTOR_RULES_FILE to a JSON list of rules to override these.
+    FACTOR_RULES = [
+        {'factor': 'smoking', 'field': 'smoker', 'match': 'true', 'confidence': 0.95},
+        {'factor': 'poor diet', 'field': 'diet', 'match': 'contains',
+         'terms': ['high sugar', 'fast food', 'processed', 'junk'], 'confidence': 0.9},
+        {'factor': 'low exercise', 'field': 'exercise', 'match': 'exact',
+         'terms': ['rarely', 'never', 'seldom'], 'confidence': 0.85},
+        {'factor': 'excessive alcohol', 'field': 'alcohol', 'match': 'exact',
+         'terms': ['heavy', 'excessive', 'daily'], 'confidence': 0.9},
+        {'factor': 'poor sleep', 'field': 'sleep', 'match': 'contains',
+         'terms': ['poor', 'insomnia', 'less than 6', '<6'], 'confidence': 0.8},
+        {'factor': 'high stress', 'field': 'stress', 'match': 'exact',
+         'terms': ['high', 'severe', 'chronic'], 'confidence': 0.85},
+        {'factor': 'family history', 'field': 'family_history', 'match': 'exact',
+         'terms': ['yes', 'true', 'positive'], 'confidence': 0.9}
+    ]
+    FACTOR_RULES_FILE = os.environ.get('FACTOR_RULES_FILE')
+    
+    # Recommendation text (e.g. localized), JSON in Recommender.load's format; built-in English if unset
+    RECOMMENDATIONS_FILE = os.environ.get('RECOMMENDATIONS_FILE')
+    
+    # Population aggregates behind /stats: counts per factor set x risk level x age band,
+    # kept in memory, or merged into POPULATION_STATS_FILE (shared by all workers) every flush interval when set
+    POPULATION_STATS_ENABLED = os.environ.get('POPULATION_STATS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    POPULATION_STATS_FILE = os.environ.get('POPULATION_STATS_FILE', '')  # e.g. /var/lib/hrp/population_stats.npz
+    POPULATION_STATS_FLUSH_INTERVAL = float(os.environ.get('POPULATION_STATS_FLUSH_INTERVAL', 5))  # Seconds
+    AGE_BAND_EDGES = [18, 30, 40, 50, 60, 70]  # Lower bounds of the age bands after '<18'
+    
+    # Optional SQLite (WAL) store of /analyze-complete results, served at /results; off if unset
+    RESULT_STORE_FILE = os.environ.get('RESULT_STORE_FILE')
+    RESULT_STORE_BATCH_SIZE = int(os.environ.get('RESULT_STORE_BATCH_SIZE', 256))  # Rows per write transaction
+    RESULT_STORE_FLUSH_INTERVAL = float(os.environ.get('RESULT_STORE_FLUSH_INTERVAL', 0.05))  # Seconds rows gather before a commit
+    RESULT_STORE_MAX_PENDING = int(os.environ.get('RESULT_STORE_MAX_PENDING', 10000))  # Queued rows; beyond that results aren't stored
+    RESULT_STORE_BUSY_TIMEOUT = float(os.environ.get('RESULT_STORE_BUSY_TIMEOUT', 5))  # Seconds to wait on a locked database
+    
     # Minimum confidence threshold
     MIN_CONFIDENCE = 0.7
@@ -0,0 +1,40 @@
+# Gunicorn settings for both serving modes
+#
+#   WSGI (Flask, one thread per request):  gunicorn -c gunicorn.conf.py app:app
+#   ASGI (Starlette, OCR off the loop):    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+import os
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:8080')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Per gthread worker; uvicorn workers ignore it. Admission control (utils/admission.py) limits how
+# many of these uploads can hold, so the rest stay free for text requests.
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))  # OCR of a large scan can take tens of seconds
+keepalive = 5
+
+# --preload (or GUNICORN_PRELOAD=true) imports the app once in the master. The OCR stack is
+# loaded there as well, so forked workers share it copy-on-write and start warm.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+# A job runs in the worker that accepted it but may be polled on any other, so with several
+# workers job state goes in a SQLite file they share (removed on exit unless JOB_STORE_FILE is set)
+_job_store = None
+if workers > 1 and not os.environ.get('JOB_STORE_FILE'):
+    _job_store = os.environ['JOB_STORE_FILE'] = os.path.join(tempfile.gettempdir(), f'hrp-jobs-{os.getpid()}.db')
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        app.warm_start()
+
+
+def on_exit(server):
+    if _job_store is not None:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(_job_store + suffix)
+            except OSError:
+                pass
@@ -0,0 +1,110 @@
+# Page splitting and form region detection for multi-form documents
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image, ImageSequence
+
+# Region detection runs on a copy downscaled to at most this many pixels per side
+LAYOUT_MAX_SIDE = 1000
+
+# Regions smaller than this fraction of the page are treated as noise
+MIN_REGION_FRACTION = 0.01
+
+# Gaps up to these multiples of the character height are bridged within a form
+CHAR_GAP_X = 4.0
+CHAR_GAP_Y = 3.0
+
+
+def split_pages(image):
+    """Yield (page_index, BGR array or exception) for every page of a document.
+
+    Multi-page TIFFs and animated formats are split frame by frame, so a
+    corrupt page yields its exception and the remaining pages still decode.
+    """
+    if isinstance(image, str):
+        with open(image, 'rb') as f:
+            image = f.read()
+
+    try:
+        document = Image.open(BytesIO(image))
+    except Exception:
+        # Not something PIL can open; let OpenCV try it as a single page
+        decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        yield 0, decoded if decoded is not None else ValueError("Could not decode image")
+        return
+
+    page_index = 0
+    frames = ImageSequence.Iterator(document)
+    while True:
+        try:
+            frame = next(frames)
+        except StopIteration:
+            return
+        except Exception as e:
+            # Unreadable page: report it and stop, later frames can't be located
+            yield page_index, e
+            return
+
+        try:
+            rgb = np.asarray(frame.convert('RGB'))
+            yield page_index, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            yield page_index, e
+        page_index += 1
+
+
+def detect_form_regions(page):
+    """Bounding boxes (x, y, w, h) of separate forms on a page, in reading order.
+
+    Text is thresholded and dilated, scaled to the character height, so that
+    each form merges into one blob; forms separated by clear whitespace stay
+    apart. Returns the whole page when fewer than two forms are found.
+    """
+    height, width = page.shape[:2]
+    whole_page = [(0, 0, width, height)]
+
+    scale = min(1.0, LAYOUT_MAX_SIDE / max(height, width))
+    small = cv2.resize(page, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else page
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    # Make ink white on black whatever the page polarity
+    flags = cv2.THRESH_BINARY + cv2.THRESH_OTSU
+    if gray.mean() >= 128:
+        flags = cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
+    _, ink = cv2.threshold(gray, 0, 255, flags)
+
+    # Size the merge kernel from the typical character height, so lines of one
+    # form join up while the wider gaps between forms stay open
+    char_height = median_char_height(ink)
+    if char_height is None:
+        return whole_page
+    kernel_size = (int(CHAR_GAP_X * char_height), int(CHAR_GAP_Y * char_height))
+    blobs = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, kernel_size))
+    contours, _ = cv2.findContours(blobs, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = MIN_REGION_FRACTION * small.shape[0] * small.shape[1]
+    boxes = [cv2.boundingRect(c) for c in contours]
+    boxes = [box for box in boxes if box[2] * box[3] >= min_area]
+    if len(boxes) < 2:
+        return whole_page
+
+    # Back to full-resolution coordinates with a margin, top-to-bottom then left-to-right
+    margin_x, margin_y = kernel_size
+    regions = []
+    for x, y, w, h in sorted(boxes, key=lambda box: (box[1], box[0])):
+        x0, y0 = max(0, int((x - margin_x) / scale)), max(0, int((y - margin_y) / scale))
+        x1 = min(width, int((x + w + margin_x) / scale))
+        y1 = min(height, int((y + h + margin_y) / scale))
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+    return regions
+
+
+def median_char_height(ink):
+    """Median height of character-sized connected components, or None"""
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    heights = heights[(heights >= 4) & (heights <= ink.shape[0] // 8)]
+    if heights.size == 0:
+        return None
+    return float(np.median(heights))
@@ -1,75 +1,76 @@
 # Extract risk factors
+import json
+import re
 from config import Config
+from models.records import FactorResult, RiskFactor, factor_label
+from utils.metrics import timed
 
 class FactorExtractor:
-    def __init__(self):
-        self.risk_factors = {
-            'smoking': ['smoker'],
-            'poor_diet': ['diet'],
-            'low_exercise': ['exercise'],
-            'excessive_alcohol': ['alcohol'],
-            'poor_sleep': ['sleep'],
-            'high_stress': ['stress'],
-            'family_history': ['family_history']
-        }
-    
+    def __init__(self, rules=None):
+        if rules is None:
+            rules = load_factor_rules()
+
+        # Compile the rule table once; extract_factors only walks it
+        self.rules = [_compile_rule(rule) for rule in rules]
+
+        # Factor label -> answer fields it is derived from
+        self.risk_factors = {}
+        for factor, field, _, _ in self.rules:
+            self.risk_factors.setdefault(factor_label(factor), []).append(field)
+
     def extract_factors(self, answers):
         """Extract risk factors from survey answers"""
         try:
-            factors = []
-            confidence_scores = []
-            
-            # Check smoking
-            if answers.get('smoker') is True:
-                factors.append('smoking')
-                confidence_scores.append(0.95)
-            
-            # Check diet
-            diet = answers.get('diet', '').lower()
-            if any(term in diet for term in ['high sugar', 'fast food', 'processed', 'junk']):
-                factors.append('poor diet')
-                confidence_scores.append(0.9)
-            
-            # Check exercise
-            exercise = answers.get('exercise', '').lower()
-            if exercise in ['rarely', 'never', 'seldom']:
-                factors.append('low exercise')
-                confidence_scores.append(0.85)
-            
-            # Check alcohol
-            alcohol = answers.get('alcohol', '').lower()
-            if alcohol in ['heavy', 'excessive', 'daily']:
-                factors.append('excessive alcohol')
-                confidence_scores.append(0.9)
-            
-            # Check sleep
-            sleep = answers.get('sleep', '').lower()
-            if any(term in sleep for term in ['poor', 'insomnia', 'less than 6', '<6']):
-                factors.append('poor sleep')
-                confidence_scores.append(0.8)
-            
-            # Check stress
-            stress = answers.get('stress', '').lower()
-            if stress in ['high', 'severe', 'chronic']:
-                factors.append('high stress')
-                confidence_scores.append(0.85)
-            
-            # Check family history
-            family_history = answers.get('family_history', '').lower()
-            if family_history in ['yes', 'true', 'positive']:
-                factors.append('family history')
-                confidence_scores.append(0.9)
-            
-            # Calculate overall confidence
-            if confidence_scores:
-                overall_confidence = sum(confidence_scores) / len(confidence_scores)
-            else:
-                overall_confidence = 0.95  # High confidence when no risk factors
-            
-            return {
-                "factors": factors,
-                "confidence": round(overall_confidence, 2)
-            }
-            
+            return self.extract(answers).to_dict()
+
         except Exception as e:
             return {"error": f"Factor extraction error: {str(e)}"}
+
+    @timed('extract_factors')
+    def extract(self, answers):
+        """FactorResult with factor codes, in rule order"""
+        factors = []
+        confidence_scores = []
+
+        for factor, field, matches, confidence in self.rules:
+            if matches(answers.get(field, '')):
+                factors.append(factor)
+                confidence_scores.append(confidence)
+
+        # Calculate overall confidence
+        if confidence_scores:
+            overall_confidence = sum(confidence_scores) / len(confidence_scores)
+        else:
+            overall_confidence = 0.95  # High confidence when no risk factors
+
+        return FactorResult(tuple(factors), round(overall_confidence, 2))
+
+def load_factor_rules():
+    """Factor rules from FACTOR_RULES_FILE if set, else Config.FACTOR_RULES"""
+    if Config.FACTOR_RULES_FILE:
+        with open(Config.FACTOR_RULES_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    return Config.FACTOR_RULES
+
+def _compile_rule(rule):
+    """Compile a rule dict into (factor, field, matcher, confidence).
+
+    Known factors become RiskFactor codes; custom ones keep their label.
+    """
+    match = rule.get('match', 'exact')
+    terms = [term.lower() for term in rule.get('terms', [])]
+
+    if match == 'contains':
+        # One alternation per field instead of a substring scan per term
+        pattern = re.compile('|'.join(re.escape(term) for term in terms) or r'(?!)')
+        matches = lambda value: pattern.search(value.lower()) is not None
+    elif match == 'exact':
+        term_set = frozenset(terms)
+        matches = lambda value: value.lower() in term_set
+    elif match == 'true':
+        matches = lambda value: value is True
+    else:
+        raise ValueError(f"Unknown factor rule match type: {match}")
+
+    factor = RiskFactor.from_label(rule['factor']) or rule['factor']
+    return (factor, rule['field'], matches, rule['confidence'])
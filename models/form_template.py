@@ -0,0 +1,192 @@
+# Known-layout forms: align scans to a registered template and read only the answer regions
+import hashlib
+import json
+import logging
+import os
+
+import cv2
+import numpy as np
+
+# Feature matching runs on copies downscaled to at most this many pixels per side
+ALIGN_MAX_SIDE = 1000
+ORB_FEATURES = 1500
+
+# Alignment is rejected below this many RANSAC inliers or outside this scale range
+MIN_INLIERS = 25
+MAX_SCALE_CHANGE = 4.0
+
+# Answer regions are resampled to this height before OCR
+REGION_HEIGHT = 64
+REGION_PADDING = 8
+
+# Crops whose gray levels span no more than this hold no ink
+BLANK_CONTRAST = 64
+
+# Checkbox interiors (box shrunk by CHECKBOX_INSET per side) count as ticked above this ink fraction
+CHECKBOX_INSET = 0.2
+CHECKBOX_FILL = 0.15
+
+
+class FormTemplate:
+    """A registered form layout.
+
+    Template files are JSON::
+
+        {
+          "name": "survey_form",
+          "reference_image": "survey_form.jpg",
+          "regions": [{"field": "age", "box": [x, y, w, h]}, ...],
+          "checkboxes": [{"field": "smoker", "value": true, "box": [x, y, w, h]}, ...]
+        }
+
+    Boxes are in reference image pixels; ``reference_image`` is relative to
+    the template file. Reference features are computed once, at load time.
+    """
+
+    def __init__(self, name, reference, regions, checkboxes=None, min_inliers=MIN_INLIERS):
+        self.name = name
+        self.regions = regions
+        self.checkboxes = checkboxes or []
+        self.min_inliers = min_inliers
+        self.size = (reference.shape[1], reference.shape[0])
+
+        small, self._reference_scale = _downscale(reference)
+        self._keypoints, self._descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+        if self._descriptors is None or len(self._keypoints) < self.min_inliers:
+            raise ValueError(f"Reference image for template '{name}' has too few features")
+
+        layout = json.dumps([name, regions, self.checkboxes, self.size], sort_keys=True)
+        self.fingerprint = hashlib.sha256(layout.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a template JSON file and its reference image"""
+        with open(path, encoding='utf-8') as f:
+            spec = json.load(f)
+
+        reference_path = os.path.join(os.path.dirname(os.path.abspath(path)), spec['reference_image'])
+        reference = cv2.imread(reference_path, cv2.IMREAD_GRAYSCALE)
+        if reference is None:
+            raise ValueError(f"Could not read reference image {reference_path}")
+
+        return cls(
+            name=spec.get('name', os.path.splitext(os.path.basename(path))[0]),
+            reference=reference,
+            regions=spec.get('regions', []),
+            checkboxes=spec.get('checkboxes', []),
+            min_inliers=spec.get('min_inliers', MIN_INLIERS)
+        )
+
+    def align(self, gray):
+        """Homography from scan to reference coordinates, or None if the scan doesn't match"""
+        # Detector and matcher are cheap to build; per-call instances keep this thread-safe
+        small, scale = _downscale(gray)
+        keypoints, descriptors = cv2.ORB_create(ORB_FEATURES).detectAndCompute(small, None)
+        if descriptors is None or len(keypoints) < self.min_inliers:
+            return None
+
+        matches = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True).match(descriptors, self._descriptors)
+        if len(matches) < self.min_inliers:
+            return None
+
+        source = np.float32([keypoints[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+        target = np.float32([self._keypoints[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+        homography, inliers = cv2.findHomography(source, target, cv2.RANSAC, 5.0)
+        if homography is None or int(inliers.sum()) < self.min_inliers:
+            return None
+
+        # Undo both downscales: scan pixels -> small scan -> small reference -> reference pixels
+        homography = (
+            np.diag([1 / self._reference_scale, 1 / self._reference_scale, 1.0])
+            @ homography
+            @ np.diag([scale, scale, 1.0])
+        )
+
+        # Reject degenerate fits (mirrored, collapsed or wildly rescaled)
+        determinant = np.linalg.det(homography[:2, :2])
+        if not 1 / MAX_SCALE_CHANGE ** 2 < determinant < MAX_SCALE_CHANGE ** 2:
+            return None
+        return homography
+
+    def region_images(self, gray, homography):
+        """{field: binarized, deskewed answer crop ready for single-line OCR}; blank regions are left out"""
+        crops = {}
+        for region in self.regions:
+            crop = _warp_box(gray, homography, region['box'])
+            if np.ptp(crop) <= BLANK_CONTRAST:
+                continue
+            _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            if cv2.countNonZero(binary) < binary.size // 2:
+                cv2.bitwise_not(binary, dst=binary)
+
+            scale = REGION_HEIGHT / binary.shape[0]
+            if scale < 1.0:
+                binary = cv2.resize(binary, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            crops[region['field']] = cv2.copyMakeBorder(
+                binary, REGION_PADDING, REGION_PADDING, REGION_PADDING, REGION_PADDING,
+                cv2.BORDER_CONSTANT, value=255
+            )
+        return crops
+
+    def checked_values(self, gray, homography):
+        """{field: value of the most filled ticked checkbox} from ink density"""
+        best = {}
+        for checkbox in self.checkboxes:
+            x, y, w, h = checkbox['box']
+            inset_x, inset_y = int(w * CHECKBOX_INSET), int(h * CHECKBOX_INSET)
+            interior = _warp_box(gray, homography, (x + inset_x, y + inset_y, w - 2 * inset_x, h - 2 * inset_y))
+            _, ink = cv2.threshold(interior, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+            # Otsu on a blank interior splits paper noise; require real contrast too
+            fill = float(np.mean(ink)) if np.ptp(interior) > BLANK_CONTRAST else 0.0
+            field = checkbox['field']
+            if fill > CHECKBOX_FILL and fill > best.get(field, (0.0, None))[0]:
+                best[field] = (fill, checkbox['value'])
+        return {field: value for field, (_, value) in best.items()}
+
+
+def load_form_template(path):
+    """Template from a file, or None when no path is configured or it can't be loaded"""
+    if not path:
+        return None
+    try:
+        return FormTemplate.from_file(path)
+    except Exception as e:
+        logging.warning(f"Failed to load form template {path}, using full-page OCR: {str(e)}")
+        return None
+
+
+def stack_regions(crops):
+    """One white-padded image with the crops stacked top to bottom, for a single OCR call"""
+    width = max(crop.shape[1] for crop in crops)
+    rows = [
+        cv2.copyMakeBorder(crop, 0, REGION_PADDING, 0, width - crop.shape[1], cv2.BORDER_CONSTANT, value=255)
+        for crop in crops
+    ]
+    return np.vstack(rows)
+
+
+def stacked_row_bounds(crops):
+    """Bottom edge of each crop's band in stack_regions' output"""
+    bounds = []
+    bottom = 0
+    for crop in crops:
+        bottom += crop.shape[0] + REGION_PADDING
+        bounds.append(bottom)
+    return bounds
+
+
+def _downscale(gray):
+    scale = min(1.0, ALIGN_MAX_SIDE / max(gray.shape[:2]))
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def _warp_box(gray, homography, box):
+    """Sample one reference-space box out of the scan; only the box's pixels are computed"""
+    x, y, w, h = box
+    to_box = np.array([[1, 0, -x], [0, 1, -y], [0, 0, 1]], dtype=np.float64) @ homography
+    return cv2.warpPerspective(
+        gray, to_box, (int(w), int(h)),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+    )
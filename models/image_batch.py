@@ -0,0 +1,229 @@
+# Batch image parsing: hash dedupe, decoded images in shared memory, OCR across a process pool
+import hashlib
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+from utils.cache import OCRResultCache
+
+# Pool workers are started fresh rather than forked (spawn where there is no forkserver, e.g. Windows)
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class ImageBatchParser:
+    """Parses many encoded scans with the same results as OCRProcessor.parse_image.
+
+    - Exact duplicates (same bytes) are found by hash and parsed once;
+      scans already in the OCR cache are not parsed at all.
+    - The parent decodes each remaining scan into its own shared memory
+      block. Workers get only the block's name, shape and dtype, and
+      preprocess and OCR a zero-copy view of it, so no pixels are pickled.
+    - At most 2 x ``workers`` blocks exist at a time, each unlinked as soon
+      as its scan is done, so memory stays bounded however big the batch.
+    """
+
+    def __init__(self, ocr_processor, workers=None):
+        self.ocr_processor = ocr_processor
+        self.workers = workers or Config.OCR_BATCH_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def parse_images(self, images):
+        """Parse results for encoded images (bytes or paths), in input order.
+
+        Duplicates carry ``duplicate_of`` (index of the first copy) and
+        cache hits ``cached: true``.
+        """
+        images = [_read(image) for image in images]
+        results = [None] * len(images)
+
+        # Index of the first copy of each distinct image
+        first_copy = {}
+        duplicates = []
+        pending = []
+        for index, data in enumerate(images):
+            digest = hashlib.sha256(data).digest()
+            if digest in first_copy:
+                duplicates.append((index, first_copy[digest]))
+                continue
+            first_copy[digest] = index
+
+            cache_key = self._cache_key(data)
+            cached = self.ocr_processor.ocr_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[index] = dict(json.loads(cached), cached=True)
+            else:
+                pending.append((index, cache_key))
+
+        cache_keys = dict(pending)
+        for index, result in self._parse_pending(images, [index for index, _ in pending]):
+            results[index] = result
+            if cache_keys[index] is not None and 'error' not in result:
+                self.ocr_processor.ocr_cache.put(cache_keys[index], json.dumps(result))
+
+        for index, original in duplicates:
+            results[index] = dict(results[original], duplicate_of=original)
+            results[index].pop('cached', None)
+        return results
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _parse_pending(self, images, indices):
+        """Yield (index, result) for the images that need parsing, as they finish"""
+        if self.workers <= 1 or len(indices) <= 1:
+            for index in indices:
+                yield index, self.ocr_processor.parse_image(images[index])
+            return
+
+        answered = set()
+        in_flight = {}
+        try:
+            executor = self._pool()
+            remaining = iter(indices)
+            exhausted = False
+            while True:
+                # Bounded window: decode the next scans only as slots free up
+                while not exhausted and len(in_flight) < self.workers * 2:
+                    index = next(remaining, None)
+                    if index is None:
+                        exhausted = True
+                        break
+                    try:
+                        block, handle = self._share(images[index])
+                    except Exception as e:
+                        answered.add(index)
+                        yield index, {"error": f"OCR processing error: {str(e)}"}
+                        continue
+                    try:
+                        future = executor.submit(_parse_shared, handle)
+                    except BaseException:
+                        _release(block)
+                        raise
+                    in_flight[future] = (index, block)
+
+                if not in_flight:
+                    return
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, block = in_flight.pop(future)
+                    _release(block)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        # One scan failing in its worker doesn't lose the rest of the batch
+                        result = {"error": f"OCR processing error: {str(e)}"}
+                    answered.add(index)
+                    yield index, result
+        except BrokenProcessPool:
+            logging.warning("Batch OCR pool is broken, parsing the rest of the batch in-process")
+            self._executor = None
+            for future, (_, block) in in_flight.items():
+                future.cancel()
+                _release(block)
+            in_flight.clear()
+            for index in indices:
+                if index not in answered:
+                    yield index, self.ocr_processor.parse_image(images[index])
+        finally:
+            # Generator closed early: don't leak the blocks still in flight
+            for future, (_, block) in in_flight.items():
+                future.cancel()
+                _release(block)
+            in_flight.clear()
+
+    def _share(self, data):
+        """Decode into a new shared memory block; (block, handle a worker can attach to)"""
+        from multiprocessing import shared_memory
+        import numpy as np
+
+        decoded = self._decode(data)
+        block = shared_memory.SharedMemory(create=True, size=max(decoded.nbytes, 1))
+        view = np.ndarray(decoded.shape, dtype=decoded.dtype, buffer=block.buf)
+        view[...] = decoded
+        del view
+        return block, (block.name, decoded.shape, decoded.dtype.str)
+
+    def _decode(self, data):
+        """The array parse_image would decode first: grayscale (with libjpeg's
+        reduced decode) for adaptive preprocessing, BGR for the legacy one"""
+        processor = self.ocr_processor
+        if processor.preprocess_mode == 'adaptive':
+            return processor.adaptive_preprocessor.load_gray(data)
+        return processor._load_image(data)
+
+    def _cache_key(self, data):
+        processor = self.ocr_processor
+        if processor.ocr_cache is None:
+            return None
+        template = processor.form_template
+        settings = (
+            'parse_image',
+            processor._preprocess_settings(),
+            template.fingerprint if template is not None else None,
+            Config.OCR_LANG
+        )
+        return OCRResultCache.make_key(data, settings)
+
+    def _pool(self):
+        # Started on first use. Forking a server process whose other threads may hold locks can
+        # deadlock the child; fresh workers are safe and only need the block names.
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(_START_METHOD),
+                        initializer=_init_worker,
+                        initargs=(Config.OCR_LANG, self.ocr_processor.preprocess_mode)
+                    )
+        return self._executor
+
+
+def _read(image):
+    if isinstance(image, str):
+        with open(image, 'rb') as f:
+            return f.read()
+    return bytes(image)
+
+
+def _release(block):
+    block.close()
+    block.unlink()
+
+
+# Per-worker OCRProcessor, built once by _init_worker
+_processor = None
+
+
+def _init_worker(lang, preprocess_mode):
+    """Build an OCRProcessor that runs OCR in this process rather than in a nested pool"""
+    global _processor
+    from models.ocr_backends import InProcessOCRBackend
+    from models.ocr_processor import OCRProcessor
+    _processor = OCRProcessor(ocr_backend=InProcessOCRBackend(lang))
+    _processor.preprocess_mode = preprocess_mode  # Must match the array the parent decoded
+
+
+def _parse_shared(handle):
+    """parse_image on a decoded image in a shared memory block, without copying it"""
+    from multiprocessing import shared_memory
+    import numpy as np
+
+    name, shape, dtype = handle
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        result = _processor.parse_image(image)
+        del image
+        return result
+    finally:
+        block.close()
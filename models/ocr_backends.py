@@ -0,0 +1,210 @@
+# OCR engine backends used by OCRProcessor
+import importlib.util
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+
+
+class OCRBusyError(RuntimeError):
+    """Raised when the OCR pool is saturated or a job times out"""
+
+
+class SubprocessOCRBackend:
+    """pytesseract: forks a new tesseract process for every image"""
+
+    name = 'subprocess'
+
+    def image_to_string(self, image, psm=None):
+        return load_pytesseract().image_to_string(image, config=_psm_config(psm))
+
+    def image_to_lines(self, image, psm=None):
+        return _pytesseract_lines(image, psm)
+
+    def close(self):
+        pass
+
+
+class PooledOCRBackend:
+    """Bounded pool of long-lived OCR worker processes.
+
+    Each worker loads the engine once (tesserocr's C API when installed,
+    otherwise pytesseract). At most ``workers + max_pending`` images are
+    admitted at a time; callers beyond that wait up to ``timeout`` seconds
+    for a slot and then get OCRBusyError.
+    """
+
+    name = 'pool'
+
+    def __init__(self, workers, max_pending, timeout, lang='eng'):
+        if importlib.util.find_spec('tesserocr') is None:
+            logging.warning(
+                "tesserocr is not installed: OCR pool workers will still start a tesseract process "
+                "per image (pip install -r requirements-optional.txt)"
+            )
+        self.workers = workers
+        self.timeout = timeout
+        self.lang = lang
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._fallback = SubprocessOCRBackend()
+
+    def image_to_string(self, image, psm=None):
+        return self._run(_worker_image_to_string, self._fallback.image_to_string, image, psm)
+
+    def image_to_lines(self, image, psm=None):
+        return self._run(_worker_image_to_lines, self._fallback.image_to_lines, image, psm)
+
+    def _run(self, fn, fallback, image, psm):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OCRBusyError("OCR queue is full, try again later")
+
+        executor = self._executor
+        try:
+            future = executor.submit(fn, image, psm)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._restart(executor)
+            return fallback(image, psm)
+        except Exception:
+            self._slots.release()
+            raise
+
+        # Free the slot when the worker actually finishes, not when we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise OCRBusyError(f"OCR timed out after {self.timeout}s")
+        except BrokenProcessPool:
+            self._restart(executor)
+            return fallback(image, psm)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.lang,)
+        )
+
+    def _restart(self, broken):
+        """Start a fresh pool in place of a broken one, once however many callers saw it break"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logging.warning("OCR worker pool is broken, restarting it and falling back to subprocess OCR")
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False)
+
+
+class InProcessOCRBackend:
+    """Runs the engine in the calling process; for code already inside a worker process"""
+
+    name = 'inprocess'
+
+    def __init__(self, lang='eng'):
+        _init_worker(lang)
+
+    def image_to_string(self, image, psm=None):
+        return _worker_image_to_string(image, psm)
+
+    def image_to_lines(self, image, psm=None):
+        return _worker_image_to_lines(image, psm)
+
+    def close(self):
+        pass
+
+
+def create_ocr_backend():
+    """Build the backend selected by Config.OCR_BACKEND"""
+    if Config.OCR_BACKEND == 'pool':
+        try:
+            return PooledOCRBackend(
+                workers=Config.OCR_POOL_WORKERS,
+                max_pending=Config.OCR_POOL_MAX_PENDING,
+                timeout=Config.OCR_TIMEOUT,
+                lang=Config.OCR_LANG
+            )
+        except Exception as e:
+            logging.warning(f"Failed to start OCR worker pool, using subprocess OCR: {str(e)}")
+    return SubprocessOCRBackend()
+
+
+def load_pytesseract():
+    """Import pytesseract on first use, pointed at Config.TESSERACT_CMD when set"""
+    import pytesseract
+    if Config.TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = Config.TESSERACT_CMD
+    return pytesseract
+
+
+# Per-worker engine state, set up once by _init_worker
+_tess_api = None
+
+
+def _init_worker(lang):
+    """Load the OCR engine once per worker process"""
+    global _tess_api
+    try:
+        import tesserocr
+        _tess_api = tesserocr.PyTessBaseAPI(lang=lang)
+    except Exception:
+        _tess_api = None
+
+
+def _psm_config(psm):
+    """Tesseract page segmentation mode flag (e.g. 7 for a single text line)"""
+    return f'--psm {psm}' if psm is not None else ''
+
+
+def _worker_image_to_string(image, psm=None):
+    if _tess_api is None:
+        return load_pytesseract().image_to_string(image, config=_psm_config(psm))
+
+    from PIL import Image
+    from tesserocr import PSM
+    _tess_api.SetPageSegMode(psm if psm is not None else PSM.AUTO)
+    _tess_api.SetImage(Image.fromarray(image))
+    return _tess_api.GetUTF8Text()
+
+
+def _worker_image_to_lines(image, psm=None):
+    if _tess_api is None:
+        return _pytesseract_lines(image, psm)
+
+    from PIL import Image
+    from tesserocr import PSM, RIL, iterate_level
+    _tess_api.SetPageSegMode(psm if psm is not None else PSM.AUTO)
+    _tess_api.SetImage(Image.fromarray(image))
+    _tess_api.Recognize()
+    lines = []
+    for line in iterate_level(_tess_api.GetIterator(), RIL.TEXTLINE):
+        text = (line.GetUTF8Text(RIL.TEXTLINE) or '').strip()
+        box = line.BoundingBox(RIL.TEXTLINE)
+        if text and box:
+            lines.append(((box[1] + box[3]) / 2, text))
+    return lines
+
+
+def _pytesseract_lines(image, psm=None):
+    """(vertical centre, text) of each recognised line, top to bottom"""
+    pytesseract = load_pytesseract()
+    data = pytesseract.image_to_data(image, config=_psm_config(psm), output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        top, bottom = data['top'][i], data['top'][i] + data['height'][i]
+        line = lines.setdefault((data['block_num'][i], data['par_num'][i], data['line_num'][i]), [top, bottom, []])
+        line[0] = min(line[0], top)
+        line[1] = max(line[1], bottom)
+        line[2].append(word)
+    return sorted(((top + bottom) / 2, ' '.join(words)) for top, bottom, words in lines.values())
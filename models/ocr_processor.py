@@ -1,18 +1,105 @@
 # OCR and text parsing
-import pytesseract
-from PIL import Image
-import cv2
-import numpy as np
-import re
 import json
+import threading
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from models.text_parser import SurveyTextParser
+from models.ocr_backends import OCRBusyError, create_ocr_backend, load_pytesseract
+from utils.cache import OCRResultCache
+from utils.metrics import timed
+
+# Identifies the preprocessing steps; part of the OCR cache key so changing
+# them never serves stale text
+PREPROCESS_SETTINGS = 'gray/median5/otsu'
 
 class OCRProcessor:
-    def __init__(self):
+    """Survey parsing from text and images.
+
+    The image stack (OpenCV, numpy, PIL, pytesseract) is imported on the
+    first image request, so processes that only score JSON never load it.
+    Call load_ocr_stack() to load it up front instead.
+    """
+
+    def __init__(self, ocr_backend=None, ocr_cache=None, form_template=None):
         self.required_fields = Config.REQUIRED_FIELDS
         self.optional_fields = Config.OPTIONAL_FIELDS
         self.all_fields = self.required_fields + self.optional_fields
+        if ocr_cache is None and Config.OCR_CACHE_BYTES > 0:
+            ocr_cache = OCRResultCache(Config.OCR_CACHE_BYTES, Config.OCR_CACHE_DIR)
+        self.ocr_cache = ocr_cache
+        self.preprocess_mode = Config.PREPROCESS_MODE
+        self.text_parser = SurveyTextParser()
+        
+        # Built on first use; see the properties below
+        self._ocr_backend = ocr_backend
+        self._adaptive_preprocessor = None
+        self._form_template = form_template
+        self._form_template_loaded = form_template is not None or not Config.FORM_TEMPLATE_FILE
+        self._batch_parser = None
+        self._load_lock = threading.Lock()
+    
+    @property
+    def ocr_backend(self):
+        if self._ocr_backend is None:
+            with self._load_lock:
+                if self._ocr_backend is None:
+                    self._ocr_backend = create_ocr_backend()
+        return self._ocr_backend
+    
+    @ocr_backend.setter
+    def ocr_backend(self, backend):
+        self._ocr_backend = backend
+    
+    @property
+    def adaptive_preprocessor(self):
+        if self._adaptive_preprocessor is None:
+            with self._load_lock:
+                if self._adaptive_preprocessor is None:
+                    from models.preprocessing import AdaptivePreprocessor
+                    self._adaptive_preprocessor = AdaptivePreprocessor(
+                        max_side=Config.PREPROCESS_MAX_SIDE,
+                        target_char_height=Config.PREPROCESS_CHAR_HEIGHT
+                    )
+        return self._adaptive_preprocessor
+    
+    @property
+    def form_template(self):
+        if not self._form_template_loaded:
+            with self._load_lock:
+                if not self._form_template_loaded:
+                    from models.form_template import load_form_template
+                    self._form_template = load_form_template(Config.FORM_TEMPLATE_FILE)
+                    self._form_template_loaded = True
+        return self._form_template
+    
+    @form_template.setter
+    def form_template(self, template):
+        self._form_template = template
+        self._form_template_loaded = True
+    
+    @property
+    def batch_parser(self):
+        if self._batch_parser is None:
+            with self._load_lock:
+                if self._batch_parser is None:
+                    from models.image_batch import ImageBatchParser
+                    self._batch_parser = ImageBatchParser(self)
+        return self._batch_parser
+    
+    def load_ocr_stack(self):
+        """Import the image libraries and build the preprocessor and form template now.
+
+        Lets a pre-fork server (gunicorn --preload) load them once in the
+        master so workers share the pages copy-on-write. The OCR backend is
+        left alone: a worker pool must be started after the fork.
+        """
+        # OpenCV, numpy and PIL come in with these
+        import models.document_layout
+        import models.form_template
+        load_pytesseract()
+        self.adaptive_preprocessor
+        self.form_template
     
     def parse_text(self, data):
         """Parse text input and extract health survey data"""
@@ -48,27 +135,218 @@ class OCRProcessor:
         except Exception as e:
             return {"error": f"Text parsing error: {str(e)}"}
     
-    def parse_image(self, image_path):
-        """Parse image using OCR and extract health survey data"""
+    def parse_image(self, image):
+        """Parse image using OCR and extract health survey data.
+
+        ``image`` is a file path, the encoded image bytes, or a decoded array.
+        """
         try:
-            # Preprocess image
-            processed_image = self._preprocess_image(image_path)
-            
-            # Extract text using OCR
-            extracted_text = pytesseract.image_to_string(processed_image)
+            # Known layout: OCR only the answer regions of the aligned scan
+            ocr_mode = 'template'
+            parsed = self._parse_with_template(image) if self.form_template is not None else None
             
-            # Parse extracted text
-            parsed_data = self._parse_extracted_text(extracted_text)
+            if parsed is None:
+                # Preprocess image and extract text using OCR (or reuse cached text)
+                ocr_mode = 'full_page'
+                extracted_text = self._extract_text(image)
+                
+                # Parse extracted text
+                parsed = self._parse_with_confidence(extracted_text)
             
-            return self.parse_text(parsed_data)
+            parsed_data, field_confidence = parsed
+            result = self.parse_text(parsed_data)
+            if 'answers' in result:
+                result['field_confidence'] = field_confidence
+                result['ocr_mode'] = ocr_mode
+            return result
             
+        except OCRBusyError as e:
+            return {"status": "busy", "error": str(e)}
         except Exception as e:
             return {"error": f"OCR processing error: {str(e)}"}
     
-    def _preprocess_image(self, image_path):
+    def parse_image_batch(self, images):
+        """parse_image for many encoded images (bytes or paths), in input order.
+        
+        Identical images are parsed once and the rest spread over a process
+        pool; see ImageBatchParser.
+        """
+        return self.batch_parser.parse_images(images)
+    
+    def parse_document(self, image):
+        """Parse every form in a multi-page and/or multi-form document.
+
+        Pages are split, each page is segmented into form regions, and the
+        regions are OCR'd in parallel. A bad page or region is reported in
+        ``errors`` without discarding the others.
+        """
+        try:
+            from models.document_layout import detect_form_regions, split_pages
+            
+            forms = []
+            errors = []
+            jobs = []
+            page_count = 0
+            
+            for page_index, page in split_pages(image):
+                page_count += 1
+                if isinstance(page, Exception):
+                    errors.append({"page": page_index, "error": f"Page decode error: {str(page)}"})
+                    continue
+                try:
+                    regions = detect_form_regions(page)
+                except Exception as e:
+                    errors.append({"page": page_index, "error": f"Layout detection error: {str(e)}"})
+                    continue
+                for region_index, (x, y, w, h) in enumerate(regions):
+                    jobs.append((page_index, region_index, (x, y, w, h), page[y:y + h, x:x + w]))
+            
+            # Threads are enough: OpenCV and the Tesseract call both release the GIL
+            with ThreadPoolExecutor(max_workers=Config.OCR_REGION_WORKERS) as executor:
+                results = executor.map(lambda job: self.parse_image(job[3]), jobs)
+                for (page_index, region_index, bbox, _), result in zip(jobs, results):
+                    location = {"page": page_index, "region": region_index, "bbox": list(bbox)}
+                    if 'answers' in result:
+                        forms.append(dict(location, **result))
+                    else:
+                        errors.append(dict(location, **result))
+            
+            return {
+                "forms": forms,
+                "errors": errors,
+                "pages": page_count,
+                "status": "ok"
+            }
+            
+        except Exception as e:
+            return {"error": f"Document processing error: {str(e)}"}
+    
+    def _extract_text(self, image):
+        """OCR text for an image; cache hits skip decoding and OCR entirely"""
+        cache_key = self._cache_key(image)
+        if cache_key is not None:
+            cached_text = self.ocr_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        
+        processed_image = self._preprocess_image(image)
+        extracted_text = self._image_to_string(processed_image)
+        
+        if cache_key is not None:
+            self.ocr_cache.put(cache_key, extracted_text)
+        return extracted_text
+    
+    @timed('image_to_string')
+    def _image_to_string(self, processed_image, psm=None):
+        return self.ocr_backend.image_to_string(processed_image, psm=psm)
+    
+    def _parse_with_template(self, image):
+        """(parsed fields, per-field confidence) via the form template, or None if the scan doesn't align"""
+        readout = self._template_readout(image)
+        if not readout['aligned']:
+            return None
+        
+        parsed_data = {}
+        field_confidence = {}
+        for field, value in readout['checked'].items():
+            parsed_data[field] = value
+            field_confidence[field] = 1.0
+        for field, text in readout['text'].items():
+            if field in parsed_data:
+                continue
+            value, confidence = self.text_parser.parse_value(field, text)
+            if value is not None:
+                parsed_data[field] = value
+                field_confidence[field] = round(confidence, 2)
+        return parsed_data, field_confidence
+    
+    def _template_readout(self, image):
+        """Aligned region text and checkbox values, cached per image like full-page text"""
+        template = self.form_template
+        settings = ('template/lines', template.fingerprint, Config.OCR_LANG, self.ocr_backend.name)
+        cache_key = self._cache_key(image, settings)
+        if cache_key is not None:
+            cached = self.ocr_cache.get(cache_key)
+            if cached is not None:
+                return json.loads(cached)
+        
+        gray = self.adaptive_preprocessor.load_gray(image)
+        homography = self._align_to_template(gray)
+        
+        if homography is None:
+            readout = {"aligned": False}
+        else:
+            crops = template.region_images(gray, homography)
+            readout = {
+                "aligned": True,
+                "text": self._read_regions(crops),
+                "checked": template.checked_values(gray, homography)
+            }
+        
+        if cache_key is not None:
+            self.ocr_cache.put(cache_key, json.dumps(readout))
+        return readout
+    
+    @timed('image_to_string')
+    def _image_to_lines(self, processed_image, psm=None):
+        return self.ocr_backend.image_to_lines(processed_image, psm=psm)
+    
+    @timed('align_template')
+    def _align_to_template(self, gray):
+        return self.form_template.align(gray)
+    
+    def _read_regions(self, crops):
+        """{field: text} for answer crops, in one OCR call over the stacked crops.
+        
+        Each recognised line goes to the crop whose band holds its centre, so
+        a crop read as two lines or as none can't shift answers into other
+        fields. Crops with no line are read again on their own.
+        """
+        if not crops:
+            return {}
+        
+        from models.form_template import stack_regions, stacked_row_bounds
+        fields = list(crops)
+        bounds = stacked_row_bounds(list(crops.values()))
+        lines = {field: [] for field in fields}
+        for centre, text in self._image_to_lines(stack_regions(list(crops.values())), psm=6):
+            row = min(bisect_right(bounds, centre), len(fields) - 1)
+            lines[fields[row]].append(text.strip())
+        
+        return {
+            field: ' '.join(lines[field]) if lines[field] else self._image_to_string(crop, psm=7).strip()
+            for field, crop in crops.items()
+        }
+    
+    def _cache_key(self, image, settings=None):
+        """Cache key for encoded image bytes or a path; None if not cacheable"""
+        if self.ocr_cache is None:
+            return None
+        if getattr(image, 'ndim', 0) > 1:
+            return None  # Decoded array
+        if isinstance(image, str):
+            with open(image, 'rb') as f:
+                image = f.read()
+        
+        if settings is None:
+            settings = (self._preprocess_settings(), Config.OCR_LANG, self.ocr_backend.name)
+        return OCRResultCache.make_key(image, settings)
+    
+    def _preprocess_settings(self):
+        if self.preprocess_mode == 'adaptive':
+            return self.adaptive_preprocessor.settings
+        return PREPROCESS_SETTINGS
+    
+    @timed('preprocess_image')
+    def _preprocess_image(self, image):
         """Preprocess image for better OCR results"""
+        if self.preprocess_mode == 'adaptive':
+            return self.adaptive_preprocessor(image)
+        
+        import cv2
+        
         # Read image
-        image = cv2.imread(image_path)
+        image = self._load_image(image)
         
         # Convert to grayscale
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -81,63 +359,32 @@ class OCRProcessor:
         
         return thresh
     
+    def _load_image(self, image):
+        """Decode a path, encoded bytes or an already decoded array into a BGR array"""
+        import cv2
+        import numpy as np
+        
+        if isinstance(image, np.ndarray) and image.ndim > 1:
+            return image
+        
+        if isinstance(image, str):
+            decoded = cv2.imread(image)
+        else:
+            # Decode straight from the request buffer, no temp file
+            decoded = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        
+        if decoded is None:
+            raise ValueError("Could not decode image")
+        return decoded
+    
     def _parse_extracted_text(self, text):
         """Parse OCR extracted text to find health survey fields"""
-        parsed_data = {}
-        lines = text.split('\n')
-        
-        for line in lines:
-            line = line.strip().lower()
-            if not line:
-                continue
-            
-            # Age parsing
-            if 'age' in line:
-                age_match = re.search(r'age[:\s]*(\d+)', line)
-                if age_match:
-                    parsed_data['age'] = int(age_match.group(1))
-            
-            # Smoker parsing
-            elif 'smok' in line:
-                if any(word in line for word in ['yes', 'true', 'y']):
-                    parsed_data['smoker'] = True
-                elif any(word in line for word in ['no', 'false', 'n']):
-                    parsed_data['smoker'] = False
-            
-            # Exercise parsing
-            elif 'exercise' in line or 'activity' in line:
-                if 'rarely' in line or 'never' in line:
-                    parsed_data['exercise'] = 'rarely'
-                elif 'sometimes' in line or 'moderate' in line:
-                    parsed_data['exercise'] = 'sometimes'
-                elif 'often' in line or 'regular' in line:
-                    parsed_data['exercise'] = 'often'
-                elif 'daily' in line:
-                    parsed_data['exercise'] = 'daily'
-            
-            # Diet parsing
-            elif 'diet' in line or 'food' in line:
-                if 'high sugar' in line or 'sweet' in line:
-                    parsed_data['diet'] = 'high sugar'
-                elif 'balanced' in line:
-                    parsed_data['diet'] = 'balanced'
-                elif 'low fat' in line:
-                    parsed_data['diet'] = 'low fat'
-                elif 'vegetarian' in line:
-                    parsed_data['diet'] = 'vegetarian'
-            
-            # Alcohol parsing
-            elif 'alcohol' in line or 'drink' in line:
-                if 'never' in line or 'no' in line:
-                    parsed_data['alcohol'] = 'never'
-                elif 'rarely' in line:
-                    parsed_data['alcohol'] = 'rarely'
-                elif 'moderate' in line:
-                    parsed_data['alcohol'] = 'moderate'
-                elif 'heavy' in line or 'excessive' in line:
-                    parsed_data['alcohol'] = 'heavy'
-        
-        return parsed_data
+        return self._parse_with_confidence(text)[0]
+    
+    @timed('parse_extracted_text')
+    def _parse_with_confidence(self, text):
+        """(parsed fields, per-field confidence) for OCR extracted text"""
+        return self.text_parser.parse(text)
     
     def _normalize_field_value(self, field, value):
         """Normalize field values to standard format"""
@@ -0,0 +1,259 @@
+# Full analysis pipeline (parse -> factors -> risk -> recommendations)
+import threading
+
+from config import Config
+from utils.cache import LRUCache
+from utils.validators import validate_input
+
+
+class AnalysisPipeline:
+    def __init__(self, ocr_processor, factor_extractor, risk_classifier, recommender, cache_size=None,
+                 population_stats=None):
+        self.ocr_processor = ocr_processor
+        self.factor_extractor = factor_extractor
+        self.risk_classifier = risk_classifier
+        self.recommender = recommender
+        self.population_stats = population_stats  # Counts every scored survey when set
+
+        # Memoized steps 2-4, keyed by the canonical answers they depend on
+        if cache_size is None:
+            cache_size = Config.PIPELINE_CACHE_SIZE
+        self.result_cache = LRUCache(max_entries=cache_size) if cache_size > 0 else None
+        self._cache_fingerprint = None
+        self._fingerprint_lock = threading.Lock()
+        self._scored_fields = tuple(sorted({
+            field
+            for fields in factor_extractor.risk_factors.values()
+            for field in fields
+        }))
+
+    def analyze_parsed(self, parse_result):
+        """Run steps 2-4 on an already parsed survey"""
+        cache_key = self._cache_key(parse_result['answers'])
+        stages = self._cached_stages(cache_key)
+        if stages is None:
+            stages = self._run_stages(parse_result['answers'])
+            if isinstance(stages, dict):
+                return stages
+            self._store_stages(cache_key, stages)
+
+        if self.population_stats is not None:
+            self.population_stats.record(*_population_row(parse_result, stages))
+        return self._combine(parse_result, stages)
+
+    def canonicalize(self, answers):
+        """Answers reduced to the fields scoring actually reads, in a fixed order.
+
+        Age and other unscored fields are dropped, so profiles that only
+        differ there share one cache entry.
+        """
+        return tuple(answers.get(field, _MISSING) for field in self._scored_fields)
+
+    def cache_stats(self):
+        return self.result_cache.stats() if self.result_cache is not None else None
+
+    def _run_stages(self, answers):
+        """Steps 2-4 as a (factors, risk, recommendations) record tuple, or an error dict"""
+        factor_result = _run_typed_stage("Factor extraction error", self.factor_extractor.extract, answers)
+        if isinstance(factor_result, dict):
+            return factor_result
+
+        risk_result = _run_typed_stage("Risk classification error", self.risk_classifier.classify, factor_result.factors)
+        if isinstance(risk_result, dict):
+            return risk_result
+
+        recommendation_result = _run_typed_stage(
+            "Recommendation generation error",
+            self.recommender.generate,
+            risk_result.risk_level,
+            factor_result.factors
+        )
+        if isinstance(recommendation_result, dict):
+            return recommendation_result
+
+        return factor_result, risk_result, recommendation_result
+
+    @staticmethod
+    def _combine(parse_result, stages):
+        factor_result, risk_result, recommendation_result = stages
+        return {
+            "parsing": parse_result,
+            "factors": factor_result.to_dict(),
+            "risk_classification": risk_result.to_dict(),
+            "recommendations": recommendation_result.to_dict(),
+            "status": "ok"
+        }
+
+    def _cache_key(self, answers):
+        if self.result_cache is None:
+            return None
+        key = self.canonicalize(answers)
+        try:
+            hash(key)
+        except TypeError:
+            return None  # Unhashable answer values are never cached
+        return key
+
+    def _cached_stages(self, cache_key):
+        if cache_key is None:
+            return None
+        self._check_fingerprint()
+        return self.result_cache.get(cache_key)
+
+    def _store_stages(self, cache_key, stages):
+        if cache_key is not None:
+            self.result_cache.put(cache_key, stages)
+
+    def _check_fingerprint(self):
+        """Drop cached results when the scoring model or recommendation DB change"""
+        fingerprint = hash((
+            self.risk_classifier.model.fingerprint,
+            self.recommender.version
+        ))
+        if fingerprint != self._cache_fingerprint:
+            with self._fingerprint_lock:
+                if fingerprint != self._cache_fingerprint:
+                    self.result_cache.clear()
+                    self._cache_fingerprint = fingerprint
+
+    def analyze_batch(self, surveys):
+        """Run the complete text pipeline over a batch of surveys.
+
+        Each stage runs over the whole batch before the next one starts.
+        A bad record (including an ``Exception`` placeholder for input that
+        could not be decoded) is reported in ``errors`` and dropped from
+        later stages; it never fails the rest of the batch.
+        """
+        surveys = list(surveys)
+        errors = []
+
+        # Step 1: Validate and parse every record
+        parsed = []
+        for index, data in enumerate(surveys):
+            parse_result = self._parse_record(data)
+            if 'answers' in parse_result:
+                parsed.append((index, parse_result))
+            else:
+                errors.append(dict(parse_result, index=index))
+
+        # Serve repeated profiles from the cache; only misses run steps 2-4
+        results = []
+        misses = []
+        scored = []  # (parse_result, stages) for population stats
+        for index, parse_result in parsed:
+            cache_key = self._cache_key(parse_result['answers'])
+            stages = self._cached_stages(cache_key)
+            if stages is None:
+                misses.append((index, parse_result))
+            else:
+                scored.append((parse_result, stages))
+                results.append(dict(self._combine(parse_result, stages), index=index))
+
+        # Step 2: Extract factors
+        extracted = []
+        for index, parse_result in misses:
+            factor_result = _run_typed_stage(
+                "Factor extraction error", self.factor_extractor.extract, parse_result['answers']
+            )
+            if isinstance(factor_result, dict):
+                errors.append({"index": index, "status": "error", "error": factor_result['error']})
+            else:
+                extracted.append((index, parse_result, factor_result))
+
+        # Step 3: Classify risk (one vectorized pass over the batch)
+        classified = []
+        try:
+            batch_risk = self.risk_classifier.classify_batch(
+                [factor_result.factors for _, _, factor_result in extracted]
+            )
+            for row, (index, parse_result, factor_result) in enumerate(extracted):
+                classified.append((index, parse_result, factor_result, batch_risk.result(row)))
+        except Exception:
+            # Fall back to scoring record by record so one bad row stays isolated
+            classified = []
+            for index, parse_result, factor_result in extracted:
+                risk_result = _run_typed_stage(
+                    "Risk classification error", self.risk_classifier.classify, factor_result.factors
+                )
+                if isinstance(risk_result, dict):
+                    errors.append({"index": index, "status": "error", "error": risk_result['error']})
+                else:
+                    classified.append((index, parse_result, factor_result, risk_result))
+
+        # Step 4: Generate recommendations
+        for index, parse_result, factor_result, risk_result in classified:
+            recommendation_result = _run_typed_stage(
+                "Recommendation generation error",
+                self.recommender.generate,
+                risk_result.risk_level,
+                factor_result.factors
+            )
+            if isinstance(recommendation_result, dict):
+                errors.append({"index": index, "status": "error", "error": recommendation_result['error']})
+                continue
+
+            stages = (factor_result, risk_result, recommendation_result)
+            self._store_stages(self._cache_key(parse_result['answers']), stages)
+            scored.append((parse_result, stages))
+            results.append(dict(self._combine(parse_result, stages), index=index))
+
+        if self.population_stats is not None:
+            self.population_stats.record_many(_population_row(*row) for row in scored)
+
+        results.sort(key=lambda result: result['index'])
+        errors.sort(key=lambda error: error['index'])
+
+        return {
+            "results": results,
+            "errors": errors,
+            "summary": {
+                "total": len(surveys),
+                "succeeded": len(results),
+                "failed": len(errors)
+            },
+            "status": "ok"
+        }
+
+    def _parse_record(self, data):
+        """Validate and parse a single batch record"""
+        if isinstance(data, Exception):
+            # Record that could not even be decoded
+            return {"status": "error", "error": str(data)}
+
+        validation_result = validate_input(data)
+        if not validation_result['valid']:
+            return {
+                "status": "incomplete_profile",
+                "reason": validation_result['reason']
+            }
+
+        parse_result = self._run_stage(self.ocr_processor.parse_text, data)
+        if 'error' in parse_result:
+            return {"status": "error", "error": parse_result['error']}
+        return parse_result
+
+    @staticmethod
+    def _run_stage(stage, *args):
+        """Call a pipeline stage, turning unexpected exceptions into error dicts"""
+        try:
+            return stage(*args)
+        except Exception as e:
+            return {"error": str(e)}
+
+
+def _run_typed_stage(error_prefix, stage, *args):
+    """Call a typed pipeline stage; failures become the error dict its legacy method returns"""
+    try:
+        return stage(*args)
+    except Exception as e:
+        return {"error": f"{error_prefix}: {str(e)}"}
+
+
+def _population_row(parse_result, stages):
+    """(factor mask, risk level, age) of a scored survey, as PopulationStats counts it"""
+    factor_result, risk_result, _ = stages
+    return factor_result.mask, risk_result.risk_level, parse_result['answers'].get('age')
+
+
+# Placeholder for answers that are absent, distinct from any real value
+_MISSING = object()
@@ -0,0 +1,258 @@
+# Population aggregates: survey counts per factor mask x risk level x age band
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file lock
+    fcntl = None
+
+from config import Config
+from models.records import FACTOR_MASKS, RiskFactor, RiskLevel, factor_label
+
+# Band label for surveys without a usable age
+UNKNOWN_AGE = 'unknown'
+
+
+class PopulationStats:
+    """Counters over every scored survey, sliced by factor set, risk level
+    and age band.
+
+    The whole population fits in a 128 x 3 x bands array (one cell per
+    factor mask, level and band), so recording a survey is one increment
+    and every query works on that array alone, never on stored records.
+
+    Several worker processes can share one file: each counts into a local
+    delta and, every ``flush_interval`` seconds, adds it to the file under
+    an exclusive lock and picks up the others' counts.
+    """
+
+    def __init__(self, path=None, age_band_edges=None, flush_interval=None):
+        self.path = path or None
+        self.age_band_edges = tuple(Config.AGE_BAND_EDGES if age_band_edges is None else age_band_edges)
+        self.flush_interval = Config.POPULATION_STATS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.age_bands = _band_labels(self.age_band_edges)
+        self._band_index = {label: band for band, label in enumerate(self.age_bands)}
+        self._base = None  # Counts as of the last sync with the file (numpy, created lazily)
+        self._delta = None  # Counted here since then
+        self._flushing = None  # Delta being written by a flush in progress
+        self._next_flush = 0.0
+        self._lock = threading.Lock()  # Guards the arrays; never held during file I/O
+        self._flush_lock = threading.Lock()  # One flush at a time
+
+    @classmethod
+    def from_config(cls):
+        return cls(Config.POPULATION_STATS_FILE)
+
+    @property
+    def shape(self):
+        return (FACTOR_MASKS, len(RiskLevel), len(self.age_bands))
+
+    def age_band(self, age):
+        """Band index of an age answer; non-numeric or missing ages are 'unknown'"""
+        if isinstance(age, bool):
+            return len(self.age_bands) - 1
+        try:
+            age = float(age)
+        except (TypeError, ValueError):
+            return len(self.age_bands) - 1
+        if not age >= 0:  # Also catches NaN
+            return len(self.age_bands) - 1
+        return bisect_right(self.age_band_edges, age)
+
+    def record(self, mask, risk_level, age):
+        """Count one scored survey"""
+        band = self.age_band(age)
+        with self._lock:
+            self._ensure_arrays()
+            self._delta[mask, risk_level, band] += 1
+        self._maybe_flush()
+
+    def record_many(self, rows):
+        """Count (mask, risk_level, age) rows in one update"""
+        rows = list(rows)
+        if not rows:
+            return
+        import numpy as np
+        masks = np.fromiter((mask for mask, _, _ in rows), dtype=np.intp, count=len(rows))
+        levels = np.fromiter((level for _, level, _ in rows), dtype=np.intp, count=len(rows))
+        bands = np.fromiter((self.age_band(age) for _, _, age in rows), dtype=np.intp, count=len(rows))
+        with self._lock:
+            self._ensure_arrays()
+            np.add.at(self._delta, (masks, levels, bands), 1)
+        self._maybe_flush()
+
+    def counts(self):
+        """Snapshot of the full counter array"""
+        self._maybe_flush()
+        with self._lock:
+            self._ensure_arrays()
+            counts = self._base + self._delta
+            if self._flushing is not None:
+                counts += self._flushing
+            return counts
+
+    def query(self, age_bands=None, risk_levels=None):
+        """Risk level distribution, per-band totals, factor prevalence and
+        pairwise co-occurrence, optionally restricted to some age bands
+        and/or risk levels (lists of labels).
+
+        Raises ValueError for an unknown band or level label.
+        """
+        import numpy as np
+        band_ids = self._select(age_bands, self._band_index, 'age band')
+        level_ids = self._select(risk_levels, {level.label: level for level in RiskLevel}, 'risk level')
+
+        counts = self.counts()[:, level_ids][:, :, band_ids]
+        per_mask = counts.sum(axis=(1, 2))
+        total = int(per_mask.sum())
+
+        # bits[mask, column] = 1 if the mask contains that factor
+        bits = (np.arange(FACTOR_MASKS)[:, None] >> np.arange(len(RiskFactor))) & 1
+        prevalence = per_mask @ bits
+        co_occurrence = bits.T @ (bits * per_mask[:, None])
+
+        labels = [factor_label(factor) for factor in RiskFactor]
+        level_labels = [RiskLevel(level).label for level in level_ids]
+        return {
+            "total": total,
+            "filters": {
+                "age_bands": [self.age_bands[band] for band in band_ids],
+                "risk_levels": level_labels
+            },
+            "risk_levels": dict(zip(level_labels, counts.sum(axis=(0, 2)).tolist())),
+            "age_bands": {
+                self.age_bands[band]: {
+                    "total": int(column.sum()),
+                    "risk_levels": dict(zip(level_labels, column.sum(axis=0).tolist()))
+                }
+                for band, column in zip(band_ids, np.moveaxis(counts, 2, 0))
+            },
+            "factors": {
+                label: {"count": int(count), "prevalence": round(count / total, 4) if total else 0.0}
+                for label, count in zip(labels, prevalence.tolist())
+            },
+            "co_occurrence": {
+                label: dict(zip(labels, row)) for label, row in zip(labels, co_occurrence.tolist())
+            }
+        }
+
+    def flush(self):
+        """Add local counts to the file and reload everyone's; no-op without a path"""
+        if self.path is None:
+            return
+        with self._flush_lock:
+            self._flush()
+
+    def _maybe_flush(self):
+        if self.path is None or time.monotonic() < self._next_flush:
+            return
+        # Another thread already flushing covers this interval
+        if self._flush_lock.acquire(blocking=False):
+            try:
+                self._flush()
+            finally:
+                self._flush_lock.release()
+
+    def _flush(self):
+        # Take the delta under the lock, then write without it so record() never waits on the file
+        import numpy as np
+        with self._lock:
+            self._ensure_arrays()
+            self._next_flush = time.monotonic() + self.flush_interval
+            pending = self._flushing = self._delta
+            self._delta = np.zeros(self.shape, dtype=np.int64)
+        try:
+            merged = self._sync(pending)
+        except Exception as e:
+            merged = None
+            logging.warning(f"Failed to save population stats to {self.path}: {str(e)}")
+        with self._lock:
+            if merged is None:
+                self._delta += pending  # Kept for the next attempt
+            else:
+                self._base = merged
+            self._flushing = None
+
+    def _sync(self, pending):
+        """Add ``pending`` to the file under its lock; the merged counts"""
+        import numpy as np
+        with _FileLock(self.path + '.lock'):
+            stored = self._load()
+            merged = (self._base if stored is None else stored) + pending
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, counts=merged, age_band_edges=np.array(self.age_band_edges))
+            os.replace(tmp_path, self.path)
+        return merged
+
+    def _load(self):
+        """Counts stored in the file, or None if there is none yet.
+
+        A file written with different age bands can't be merged; it is
+        moved aside and counting starts over.
+        """
+        import numpy as np
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path) as data:
+            counts = data['counts']
+            edges = tuple(data['age_band_edges'].tolist())
+        if counts.shape != self.shape or edges != self.age_band_edges:
+            os.replace(self.path, self.path + '.old')
+            logging.warning(
+                f"Population stats in {self.path} use other age bands {list(edges)}, "
+                f"moved to {self.path}.old and starting over"
+            )
+            return np.zeros(self.shape, dtype=np.int64)
+        return counts.astype(np.int64)
+
+    def _ensure_arrays(self):
+        if self._delta is None:
+            import numpy as np
+            self._base = np.zeros(self.shape, dtype=np.int64)
+            self._delta = np.zeros(self.shape, dtype=np.int64)
+
+    @staticmethod
+    def _select(labels, index, kind):
+        """Indices for the requested labels, each once, or all of them"""
+        if not labels:
+            return sorted(set(index.values()))
+        unknown = [label for label in labels if label not in index]
+        if unknown:
+            raise ValueError(f"Unknown {kind} {unknown[0]!r}; expected one of {list(index)}")
+        # A repeated label would count the same records twice in the totals
+        return list(dict.fromkeys(int(index[label]) for label in labels))
+
+
+class _FileLock:
+    """Exclusive advisory lock on a file, held for a with-block"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _band_labels(edges):
+    """'<18', '18-29', ..., '70+', then 'unknown'"""
+    if not edges:
+        return ['all', UNKNOWN_AGE]
+    labels = [f"<{edges[0]}"]
+    labels += [f"{low}-{high - 1}" for low, high in zip(edges, edges[1:])]
+    labels.append(f"{edges[-1]}+")
+    labels.append(UNKNOWN_AGE)
+    return labels
@@ -1,79 +1,196 @@
 # Generate recommendations
+import hashlib
+import json
+from types import MappingProxyType
+
+from config import Config
+from models.records import FACTOR_SETS, RecommendationResult, RiskLevel, factor_labels
+from utils.metrics import timed
+
+# Advice per factor label
+DEFAULT_RECOMMENDATIONS = {
+    'smoking': [
+        "Quit smoking immediately - consult a healthcare provider for cessation programs",
+        "Consider nicotine replacement therapy",
+        "Join a smoking cessation support group"
+    ],
+    'poor diet': [
+        "Reduce sugar intake and processed foods",
+        "Increase consumption of fruits and vegetables",
+        "Consult a nutritionist for a personalized meal plan"
+    ],
+    'low exercise': [
+        "Walk 30 minutes daily",
+        "Start with light exercises and gradually increase intensity",
+        "Consider joining a gym or fitness class"
+    ],
+    'excessive alcohol': [
+        "Limit alcohol consumption to recommended guidelines",
+        "Seek professional help if needed",
+        "Replace alcohol with healthier beverages"
+    ],
+    'poor sleep': [
+        "Maintain a regular sleep schedule",
+        "Create a comfortable sleep environment",
+        "Avoid caffeine and screens before bedtime"
+    ],
+    'high stress': [
+        "Practice stress management techniques like meditation",
+        "Consider counseling or therapy",
+        "Engage in relaxing activities like yoga"
+    ],
+    'family history': [
+        "Schedule regular health checkups",
+        "Discuss family history with your healthcare provider",
+        "Consider preventive screening tests"
+    ]
+}
+
+# General advice per risk level, placed before ('first') and after ('last') the factor advice
+DEFAULT_LEVEL_RECOMMENDATIONS = {
+    'high': {
+        'first': ["Consult a healthcare provider immediately"],
+        'last': ["Consider comprehensive health screening"]
+    },
+    'moderate': {
+        'last': ["Schedule a routine health checkup", "Monitor your health metrics regularly"]
+    },
+    'low': {
+        'last': ["Maintain current healthy lifestyle", "Continue regular health monitoring"]
+    }
+}
+
+MAX_RECOMMENDATIONS = 10
+
 class Recommender:
-    def __init__(self):
-        self.recommendations_db = {
-            'smoking': [
-                "Quit smoking immediately - consult a healthcare provider for cessation programs",
-                "Consider nicotine replacement therapy",
-                "Join a smoking cessation support group"
-            ],
-            'poor diet': [
-                "Reduce sugar intake and processed foods",
-                "Increase consumption of fruits and vegetables",
-                "Consult a nutritionist for a personalized meal plan"
-            ],
-            'low exercise': [
-                "Walk 30 minutes daily",
-                "Start with light exercises and gradually increase intensity",
-                "Consider joining a gym or fitness class"
-            ],
-            'excessive alcohol': [
-                "Limit alcohol consumption to recommended guidelines",
-                "Seek professional help if needed",
-                "Replace alcohol with healthier beverages"
-            ],
-            'poor sleep': [
-                "Maintain a regular sleep schedule",
-                "Create a comfortable sleep environment",
-                "Avoid caffeine and screens before bedtime"
-            ],
-            'high stress': [
-                "Practice stress management techniques like meditation",
-                "Consider counseling or therapy",
-                "Engage in relaxing activities like yoga"
-            ],
-            'family history': [
-                "Schedule regular health checkups",
-                "Discuss family history with your healthcare provider",
-                "Consider preventive screening tests"
-            ]
-        }
-    
+    """Recommendations for every factor set and risk level are precomputed
+    into shared tuples, so generating them is a dict lookup. The index is
+    rebuilt whenever the recommendation DB is replaced."""
+
+    def __init__(self, recommendations_file=None):
+        self.version = 0
+        if recommendations_file is None:
+            recommendations_file = Config.RECOMMENDATIONS_FILE
+        if recommendations_file:
+            self.load(recommendations_file)
+        else:
+            self.set_recommendations(DEFAULT_RECOMMENDATIONS, DEFAULT_LEVEL_RECOMMENDATIONS)
+
+    @property
+    def recommendations_db(self):
+        """Read-only factor label -> advice mapping; assign a new dict to replace it"""
+        return self._state[0]
+
+    @recommendations_db.setter
+    def recommendations_db(self, recommendations):
+        self.set_recommendations(recommendations)
+
+    def load(self, path):
+        """Replace the DB with a JSON file: {"factors": {...}, "risk_levels": {...}}.
+
+        Both sections use the shape of the defaults; a missing section or
+        risk level keeps the default text.
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.set_recommendations(
+            data.get('factors', DEFAULT_RECOMMENDATIONS),
+            dict(DEFAULT_LEVEL_RECOMMENDATIONS, **data.get('risk_levels', {}))
+        )
+
+    def set_recommendations(self, recommendations, level_recommendations=None):
+        """Replace factor advice (and optionally per-level advice) and rebuild the index"""
+        db = MappingProxyType({factor: tuple(recs) for factor, recs in recommendations.items()})
+        if level_recommendations is None:
+            levels = self._state[1]
+        else:
+            levels = tuple(
+                (
+                    tuple(level_recommendations[level.label].get('first', ())),
+                    tuple(level_recommendations[level.label].get('last', ()))
+                )
+                for level in RiskLevel
+            )
+
+        # One dict per RiskLevel, mapping each factor set in code order, as a
+        # tuple of codes and as a tuple of labels, to its recommendations
+        index = []
+        for level in RiskLevel:
+            entries = {}
+            for factors in FACTOR_SETS:
+                labels = tuple(factor_labels(factors))
+                entries[factors] = entries[labels] = _build(db, levels, level, labels)
+            index.append(entries)
+        index = tuple(index)
+
+        # Stable ids for every text, so stored results can reference advice instead of copying it
+        texts = [text for recs in db.values() for text in recs]
+        texts += [text for first, last in levels for text in first + last]
+        ids = {text: recommendation_id(text) for text in texts}
+        texts_by_id = {text_id: text for text, text_id in ids.items()}
+
+        # Swapped in one assignment so concurrent lookups never mix old and new
+        self._state = (db, levels, index, ids, texts_by_id)
+        self.version += 1
+
+    @timed('generate_recommendations')
     def generate_recommendations(self, risk_level, factors):
         """Generate actionable health recommendations"""
         try:
-            recommendations = []
-            
-            # Get specific recommendations for each factor
-            for factor in factors:
-                if factor in self.recommendations_db:
-                    recommendations.extend(self.recommendations_db[factor])
-            
-            # Add general recommendations based on risk level
-            if risk_level == "high":
-                recommendations.insert(0, "Consult a healthcare provider immediately")
-                recommendations.append("Consider comprehensive health screening")
-            elif risk_level == "moderate":
-                recommendations.append("Schedule a routine health checkup")
-                recommendations.append("Monitor your health metrics regularly")
-            else:
-                recommendations.append("Maintain current healthy lifestyle")
-                recommendations.append("Continue regular health monitoring")
-            
-            # Remove duplicates while preserving order
-            unique_recommendations = []
-            seen = set()
-            for rec in recommendations:
-                if rec not in seen:
-                    unique_recommendations.append(rec)
-                    seen.add(rec)
-            
+            level = RiskLevel.from_label(risk_level) or RiskLevel.LOW  # Unknown levels get low-risk advice
             return {
                 "risk_level": risk_level,
                 "factors": factors,
-                "recommendations": unique_recommendations[:10],  # Limit to top 10
+                "recommendations": self._lookup(level, tuple(factors)),
                 "status": "ok"
             }
-            
+
         except Exception as e:
             return {"error": f"Recommendation generation error: {str(e)}"}
+
+    @timed('generate_recommendations')
+    def generate(self, risk_level, factors):
+        """RecommendationResult for a RiskLevel and factor codes"""
+        factors = tuple(factors)
+        return RecommendationResult(risk_level, factors, self._lookup(risk_level, factors))
+
+    def recommendation_ids(self, recommendations):
+        """Ids of recommendation texts (see recommendation_id)"""
+        ids = self._state[3]
+        return [ids.get(text) or recommendation_id(text) for text in recommendations]
+
+    def texts(self, ids):
+        """Texts for recommendation ids; None for text no longer in the DB"""
+        texts_by_id = self._state[4]
+        return [texts_by_id.get(text_id) for text_id in ids]
+
+    def _lookup(self, risk_level, factors):
+        """Shared recommendation tuple for a level and a tuple of factor codes or labels.
+
+        Factor sets outside the index (custom factors, repeats, another
+        order) are built on the spot and not stored.
+        """
+        db, levels, index, _, _ = self._state
+        try:
+            recommendations = index[risk_level].get(factors)
+        except TypeError:
+            recommendations = None  # Unhashable factor values
+        if recommendations is None:
+            recommendations = _build(db, levels, risk_level, factor_labels(factors))
+        return recommendations
+
+
+def recommendation_id(text):
+    """Short content hash of a recommendation text; the same text always has the same id"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def _build(db, levels, risk_level, factors):
+    """Level advice around each factor's advice, deduplicated in order, top MAX_RECOMMENDATIONS"""
+    first, last = levels[risk_level]
+    recommendations = list(first)
+    for factor in factors:
+        if factor in db:
+            recommendations.extend(db[factor])
+    recommendations.extend(last)
+    return tuple(dict.fromkeys(recommendations))[:MAX_RECOMMENDATIONS]
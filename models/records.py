@@ -0,0 +1,160 @@
+# Typed records passed between pipeline stages; strings only at the JSON boundary
+from enum import IntEnum, IntFlag
+from typing import NamedTuple
+
+
+class RiskFactor(IntFlag):
+    """Risk factor codes. Bit i is column i of the risk classifier's factor table,
+    so a set of factors is also a 7-bit mask."""
+
+    SMOKING = 1
+    POOR_DIET = 2
+    LOW_EXERCISE = 4
+    EXCESSIVE_ALCOHOL = 8
+    POOR_SLEEP = 16
+    HIGH_STRESS = 32
+    FAMILY_HISTORY = 64
+
+    @property
+    def label(self):
+        """Human-readable name used in requests and responses ('poor diet')"""
+        return _LABELS[self]
+
+    @property
+    def weight_key(self):
+        """Key in Config.RISK_WEIGHTS ('poor_diet')"""
+        return _WEIGHT_KEYS[self]
+
+    @property
+    def reason(self):
+        """Rationale text reported when the factor contributes to a risk score"""
+        return _REASONS[self]
+
+    @property
+    def column(self):
+        return self.value.bit_length() - 1
+
+    @classmethod
+    def from_label(cls, label):
+        """Factor for a label, or None if the label isn't a known factor"""
+        return _FACTORS_BY_LABEL.get(label) if isinstance(label, str) else None
+
+
+_LABELS = {factor: factor.name.lower().replace('_', ' ') for factor in RiskFactor}
+_WEIGHT_KEYS = {factor: factor.name.lower() for factor in RiskFactor}
+_FACTORS_BY_LABEL = {label: factor for factor, label in _LABELS.items()}
+_BITS = {factor: factor.value for factor in RiskFactor}  # Plain ints; OR-ing IntFlags is slow
+_REASONS = {
+    RiskFactor.SMOKING: 'smoking',
+    RiskFactor.POOR_DIET: 'high sugar diet',
+    RiskFactor.LOW_EXERCISE: 'low activity',
+    RiskFactor.EXCESSIVE_ALCOHOL: 'excessive alcohol consumption',
+    RiskFactor.POOR_SLEEP: 'poor sleep quality',
+    RiskFactor.HIGH_STRESS: 'high stress levels',
+    RiskFactor.FAMILY_HISTORY: 'family history of health issues',
+}
+
+# Every possible factor set
+FACTOR_MASKS = 1 << len(RiskFactor)
+
+# Factor set of each mask, in code order (the order FactorExtractor's default rules emit)
+FACTOR_SETS = tuple(
+    tuple(factor for factor in RiskFactor if mask & factor.value)
+    for mask in range(FACTOR_MASKS)
+)
+
+
+class RiskLevel(IntEnum):
+    """Risk levels in score order; values index RISK_LEVELS"""
+
+    LOW = 0
+    MODERATE = 1
+    HIGH = 2
+
+    @property
+    def label(self):
+        return _LEVEL_LABELS[self]
+
+    @classmethod
+    def from_label(cls, label):
+        """Level for a name ('high'), or None if it isn't one"""
+        return _LEVELS_BY_LABEL.get(label) if isinstance(label, str) else None
+
+
+_LEVEL_LABELS = tuple(level.name.lower() for level in RiskLevel)
+_LEVELS_BY_LABEL = {label: level for level, label in zip(RiskLevel, _LEVEL_LABELS)}
+
+# Levels by value, for indexing with numpy level codes
+RISK_LEVEL_CODES = tuple(RiskLevel)
+
+
+def factor_codes(labels):
+    """Factor labels as codes; labels of custom factors that have no code stay strings"""
+    return tuple(RiskFactor.from_label(label) or label for label in labels)
+
+
+def factor_label(factor):
+    """Label of a code; custom factor strings are their own label"""
+    return _LABELS.get(factor, factor)
+
+
+def factor_labels(factors):
+    """Codes (or custom factor strings) back to their labels, for serialization"""
+    return [_LABELS.get(factor, factor) for factor in factors]
+
+
+def factor_mask(factors):
+    """OR of the coded factors as a plain int; custom factors carry no bit"""
+    mask = 0
+    for factor in factors:
+        mask |= _BITS.get(factor, 0)
+    return mask
+
+
+class FactorResult(NamedTuple):
+    """Step 2 output: factors in extraction order and the mean rule confidence"""
+
+    factors: tuple
+    confidence: float
+
+    @property
+    def mask(self):
+        return factor_mask(self.factors)
+
+    def to_dict(self):
+        return {
+            "factors": factor_labels(self.factors),
+            "confidence": self.confidence
+        }
+
+
+class RiskResult(NamedTuple):
+    """Step 3 output. ``rationale`` holds the factors that scored, in input
+    order; their reason strings are looked up when serializing."""
+
+    risk_level: RiskLevel
+    score: int
+    rationale: tuple
+
+    def to_dict(self):
+        return {
+            "risk_level": self.risk_level.label,
+            "score": self.score,
+            "rationale": [factor.reason for factor in self.rationale]
+        }
+
+
+class RecommendationResult(NamedTuple):
+    """Step 4 output; ``recommendations`` is shared, never mutated"""
+
+    risk_level: RiskLevel
+    factors: tuple
+    recommendations: tuple
+
+    def to_dict(self):
+        return {
+            "risk_level": self.risk_level.label,
+            "factors": factor_labels(self.factors),
+            "recommendations": self.recommendations,
+            "status": "ok"
+        }
@@ -1,53 +1,209 @@
 # Risk level calculation
+from bisect import bisect_right
+
 from config import Config
+from models.records import RISK_LEVEL_CODES, RiskFactor, RiskLevel, RiskResult, factor_codes
+from models.scoring_model import DEFAULT_WEIGHTS, ScoringModel, ScoringModelFile
+from utils.metrics import timed
+
+# Factor label -> (weight key, default weight, rationale), in column order
+# for the vectorized engine
+FACTOR_TABLE = tuple(
+    (factor.label, factor.weight_key, DEFAULT_WEIGHTS[factor], factor.reason)
+    for factor in RiskFactor
+)
+
+# Level names, indexed by level code
+RISK_LEVELS = tuple(level.label for level in RiskLevel)
+
 
 class RiskClassifier:
-    def __init__(self):
-        self.risk_weights = Config.RISK_WEIGHTS
-    
+    """Scores factor lists one at a time or, with numpy (imported on the
+    first batch call), a whole batch at once.
+
+    Weights and thresholds come from a ScoringModel: Config's, rebuilt when
+    Config.RISK_WEIGHTS or RISK_THRESHOLDS are edited, or one loaded from
+    ``model_file`` (Config.SCORING_MODEL_FILE by default) and reloaded
+    whenever that file changes.
+    """
+
+    def __init__(self, model=None, model_file=None):
+        if model_file is None:
+            model_file = Config.SCORING_MODEL_FILE
+        self._model_file = ScoringModelFile(model_file) if model_file else None
+        self._config = None  # Config values the model was built from, while it follows Config
+        if model is None:
+            if self._model_file:
+                model = self._model_file.load()
+            else:
+                self._config = _config_values()
+                model = ScoringModel(*self._config)
+        self._model = model
+
+    @property
+    def model(self):
+        """Current ScoringModel, picking up changes to the model file or Config"""
+        if self._model_file is not None:
+            reloaded = self._model_file.reload_if_changed()
+            if reloaded is not None:
+                self._model = reloaded
+        elif self._config is not None and _config_changed(self._config):
+            self._config = _config_values()
+            self._model = ScoringModel(*self._config)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._config = None  # An explicit model stops following Config
+        self._model = model
+
+    @property
+    def risk_weights(self):
+        """Read-only weight key -> weight mapping; assign a new dict to replace the weights"""
+        return self.model.weights
+
+    @risk_weights.setter
+    def risk_weights(self, weights):
+        self.model = ScoringModel(weights, self.model.thresholds)
+
     def classify_risk(self, factors):
         """Classify risk level based on extracted factors"""
         try:
-            score = 0
-            rationale = []
-            
-            # Calculate risk score
-            for factor in factors:
-                if factor == 'smoking':
-                    score += self.risk_weights.get('smoking', 25)
-                    rationale.append('smoking')
-                elif factor == 'poor diet':
-                    score += self.risk_weights.get('poor_diet', 20)
-                    rationale.append('high sugar diet')
-                elif factor == 'low exercise':
-                    score += self.risk_weights.get('low_exercise', 15)
-                    rationale.append('low activity')
-                elif factor == 'excessive alcohol':
-                    score += self.risk_weights.get('excessive_alcohol', 15)
-                    rationale.append('excessive alcohol consumption')
-                elif factor == 'poor sleep':
-                    score += self.risk_weights.get('poor_sleep', 10)
-                    rationale.append('poor sleep quality')
-                elif factor == 'high stress':
-                    score += self.risk_weights.get('high_stress', 10)
-                    rationale.append('high stress levels')
-                elif factor == 'family history':
-                    score += self.risk_weights.get('family_history', 15)
-                    rationale.append('family history of health issues')
-            
-            # Determine risk level
-            if score >= 70:
-                risk_level = "high"
-            elif score >= 40:
-                risk_level = "moderate"
-            else:
-                risk_level = "low"
-            
-            return {
-                "risk_level": risk_level,
-                "score": min(score, 100),  # Cap at 100
-                "rationale": rationale
-            }
-            
+            return self.classify(factor_codes(factors)).to_dict()
+
         except Exception as e:
             return {"error": f"Risk classification error: {str(e)}"}
+
+    @timed('classify_risk')
+    def classify(self, factors):
+        """RiskResult for factor codes; strings and unknown values are ignored"""
+        model = self.model
+        weights = model.weight_of
+        score = 0
+        rationale = []
+
+        # Calculate risk score
+        for factor in factors:
+            if isinstance(factor, RiskFactor):
+                score += weights[factor]
+                rationale.append(factor)
+
+        # Determine risk level
+        risk_level = RISK_LEVEL_CODES[bisect_right(model.thresholds, score)]
+
+        return RiskResult(risk_level, min(score, 100), tuple(rationale))  # Cap at 100
+
+    def weight_vector(self, model=None):
+        """Weights as a vector aligned with FACTOR_TABLE columns"""
+        import numpy as np
+        weights = (model or self.model).factor_weights
+        dtype = np.int64 if all(isinstance(w, int) for w in weights) else np.float64
+        return np.array(weights, dtype=dtype)
+
+    @staticmethod
+    def encode_factors(factor_lists):
+        """Encode factor lists (codes or labels) as an (n, 7) matrix of per-factor counts.
+
+        Counts rather than booleans keep repeated factors scoring exactly as
+        the scalar path does; unknown factors are ignored.
+        """
+        rows = []
+        columns = []
+        for row, factors in enumerate(factor_lists):
+            for factor in factors:
+                column = _factor_column(factor)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+
+        import numpy as np
+        matrix = np.zeros((len(factor_lists), len(FACTOR_TABLE)), dtype=np.int64)
+        np.add.at(matrix, (rows, columns), 1)
+        return matrix
+
+    @staticmethod
+    def masks_to_matrix(masks):
+        """Expand factor bitmasks (bit i = FACTOR_TABLE column i) into a 0/1 matrix"""
+        import numpy as np
+        masks = np.asarray(masks, dtype=np.int64)
+        return (masks[:, None] >> np.arange(len(FACTOR_TABLE))) & 1
+
+    def classify_matrix(self, matrix):
+        """Score an encoded factor matrix in one dot product.
+
+        Returns ``(level_codes, scores)``: indices into RISK_LEVELS and the
+        uncapped scores.
+        """
+        import numpy as np
+        model = self.model
+        scores = matrix @ self.weight_vector(model)
+        level_codes = np.searchsorted(np.array(model.thresholds), scores, side='right')
+        return level_codes, scores
+
+    @timed('classify_batch')
+    def classify_batch(self, factor_lists):
+        """Vectorized classify_risk over many factor lists"""
+        factor_lists = list(factor_lists)
+        level_codes, scores = self.classify_matrix(self.encode_factors(factor_lists))
+        return BatchRiskResult(factor_lists, level_codes, scores)
+
+
+class BatchRiskResult:
+    """Columnar classify_batch output; rationale strings are built on demand"""
+
+    def __init__(self, factor_lists, level_codes, scores):
+        self.factor_lists = factor_lists
+        self.level_codes = level_codes
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.factor_lists)
+
+    @property
+    def risk_levels(self):
+        import numpy as np
+        return np.array(RISK_LEVELS, dtype=object)[self.level_codes]
+
+    @property
+    def capped_scores(self):
+        import numpy as np
+        return np.minimum(self.scores, 100)
+
+    def rationale(self, row):
+        """Scoring factor codes for one row, in the row's original factor order"""
+        return tuple(code for code in map(_factor_code, self.factor_lists[row]) if code is not None)
+
+    def result(self, row):
+        """RiskResult for one row, as classify would return it"""
+        return RiskResult(
+            RISK_LEVEL_CODES[self.level_codes[row]],
+            min(self.scores[row].item(), 100),  # Cap at 100
+            self.rationale(row)
+        )
+
+    def to_list(self):
+        """Row results in the same shape classify_risk returns"""
+        return [self.result(row).to_dict() for row in range(len(self))]
+
+
+def _config_values():
+    """Config's weights and thresholds, copied so later in-place edits show up as changes"""
+    return dict(Config.RISK_WEIGHTS), tuple(Config.RISK_THRESHOLDS)
+
+
+def _config_changed(values):
+    weights, thresholds = values
+    return Config.RISK_WEIGHTS != weights or tuple(Config.RISK_THRESHOLDS) != thresholds
+
+
+def _factor_code(factor):
+    """RiskFactor for a code or a factor label, or None if unknown"""
+    if isinstance(factor, RiskFactor):
+        return factor
+    return RiskFactor.from_label(factor)
+
+
+def _factor_column(factor):
+    """Column of a factor code or label in FACTOR_TABLE, or None if unknown"""
+    code = _factor_code(factor)
+    return code.column if code is not None else None
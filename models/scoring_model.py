@@ -0,0 +1,143 @@
+# Versioned scoring model: factor weights and risk level thresholds, reloadable from JSON
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from types import MappingProxyType
+
+from config import Config
+from models.records import FACTOR_SETS, RISK_LEVEL_CODES, RiskFactor, RiskLevel
+
+# Weight used when a model has no entry for a factor
+DEFAULT_WEIGHTS = {
+    RiskFactor.SMOKING: 25,
+    RiskFactor.POOR_DIET: 20,
+    RiskFactor.LOW_EXERCISE: 15,
+    RiskFactor.EXCESSIVE_ALCOHOL: 15,
+    RiskFactor.POOR_SLEEP: 10,
+    RiskFactor.HIGH_STRESS: 10,
+    RiskFactor.FAMILY_HISTORY: 15,
+}
+
+
+class ScoringModel:
+    """One immutable version of the factor weights and the score thresholds
+    (inclusive lower bounds of moderate and high).
+
+    Since a factor set is a 7-bit mask, the score and level of all 128
+    possible sets are tabulated up front; re-scoring stored masks is a
+    table lookup.
+    """
+
+    def __init__(self, weights, thresholds, version=None):
+        thresholds = tuple(thresholds)
+        if len(thresholds) != len(RiskLevel) - 1 or list(thresholds) != sorted(thresholds):
+            raise ValueError(f"Expected {len(RiskLevel) - 1} ascending thresholds, got {list(thresholds)}")
+
+        self.weights = MappingProxyType(dict(weights))  # Weight key -> weight
+        self.thresholds = thresholds
+        # Weight of each factor, in code order
+        self.factor_weights = tuple(self.weights.get(f.weight_key, DEFAULT_WEIGHTS[f]) for f in RiskFactor)
+        self.weight_of = dict(zip(RiskFactor, self.factor_weights))
+
+        # Only what scoring depends on goes into the fingerprint
+        content = json.dumps([self.factor_weights, self.thresholds])
+        self.fingerprint = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+        self.version = str(version) if version is not None else self.fingerprint
+
+        raw_scores = [sum(self.factor_weights[f.column] for f in factors) for factors in FACTOR_SETS]
+        self.mask_levels = tuple(self.level(score) for score in raw_scores)
+        self.mask_scores = tuple(min(score, 100) for score in raw_scores)  # Cap at 100
+
+    @classmethod
+    def from_config(cls):
+        return cls(Config.RISK_WEIGHTS, Config.RISK_THRESHOLDS)
+
+    @classmethod
+    def from_file(cls, path):
+        """Model from JSON: {"version": ..., "weights": {...}, "thresholds": [40, 70]}.
+
+        Missing weights or thresholds fall back to Config; without a
+        version, the content fingerprint is used.
+        """
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(
+            dict(Config.RISK_WEIGHTS, **data.get('weights', {})),
+            data.get('thresholds', Config.RISK_THRESHOLDS),
+            data.get('version')
+        )
+
+    def level(self, score):
+        return RISK_LEVEL_CODES[bisect_right(self.thresholds, score)]
+
+    def changed_masks(self, previous):
+        """Masks whose level differs between ``previous`` and this model"""
+        return [
+            mask for mask, (old, new) in enumerate(zip(previous.mask_levels, self.mask_levels))
+            if old != new
+        ]
+
+    def rescore(self, masks, previous_levels):
+        """Rows of ``masks`` whose level under this model differs from ``previous_levels``.
+
+        Works on stored factor masks alone. Returns numpy arrays
+        ``(rows, level_codes, scores)`` for the changed rows only.
+        """
+        import numpy as np
+        masks = np.asarray(masks, dtype=np.intp)
+        levels = np.array(self.mask_levels, dtype=np.int8)[masks]
+        rows = np.flatnonzero(levels != np.asarray(previous_levels))
+        return rows, levels[rows], np.array(self.mask_scores)[masks[rows]]
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "weights": {f.weight_key: w for f, w in zip(RiskFactor, self.factor_weights)},
+            "thresholds": list(self.thresholds)
+        }
+
+
+class ScoringModelFile:
+    """Watches a model file. ``reload_if_changed`` re-reads it when its
+    mtime changes, checking at most every ``check_interval`` seconds; a
+    file that fails to load is logged and skipped, so the caller keeps
+    its last good model."""
+
+    def __init__(self, path, check_interval=None):
+        self.path = path
+        self.check_interval = Config.SCORING_MODEL_CHECK_INTERVAL if check_interval is None else check_interval
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the file now (errors propagate)"""
+        mtime = os.stat(self.path).st_mtime_ns
+        model = ScoringModel.from_file(self.path)
+        self._mtime = mtime
+        self._next_check = time.monotonic() + self.check_interval
+        return model
+
+    def reload_if_changed(self):
+        """New model if the file changed since the last load, else None"""
+        if time.monotonic() < self._next_check or not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return None
+            self._mtime = mtime  # A bad file is reported once; finishing the write changes mtime again
+            model = ScoringModel.from_file(self.path)
+            logging.info(f"Loaded scoring model {model.version} from {self.path}")
+            return model
+        except Exception as e:
+            logging.warning(f"Failed to reload scoring model {self.path}, keeping the current one: {str(e)}")
+            return None
+        finally:
+            self._lock.release()
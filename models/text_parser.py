@@ -0,0 +1,254 @@
+# Single-pass parser for OCR'd survey text
+import re
+from functools import lru_cache
+
+# Field -> label spellings that introduce it on a form line
+FIELD_LABELS = {
+    'age': ['age'],
+    'smoker': ['smoker', 'smoking', 'smokes', 'smoke'],
+    'exercise': ['exercise', 'activity', 'physical activity'],
+    'diet': ['diet', 'food'],
+    'alcohol': ['alcohol', 'drink', 'drinks', 'drinking'],
+    'sleep': ['sleep'],
+    'stress': ['stress'],
+    'family_history': ['family history', 'family']
+}
+
+# Field -> (canonical value, spellings) in priority order
+FIELD_VALUES = {
+    'smoker': [
+        (True, ['yes', 'y', 'true', '1']),
+        (False, ['no', 'n', 'false', '0', 'never'])
+    ],
+    'exercise': [
+        ('rarely', ['rarely', 'never']),
+        ('sometimes', ['sometimes', 'moderate']),
+        ('often', ['often', 'regular', 'regularly']),
+        ('daily', ['daily'])
+    ],
+    'diet': [
+        ('high sugar', ['high sugar', 'sweet', 'sweets']),
+        ('balanced', ['balanced']),
+        ('low fat', ['low fat']),
+        ('vegetarian', ['vegetarian'])
+    ],
+    'alcohol': [
+        ('never', ['never', 'no', 'none']),
+        ('rarely', ['rarely']),
+        ('moderate', ['moderate']),
+        ('heavy', ['heavy', 'excessive'])
+    ],
+    'sleep': [
+        ('poor', ['poor', 'bad', 'insomnia']),
+        ('good', ['good', 'well'])
+    ],
+    'stress': [
+        ('high', ['high', 'severe', 'chronic']),
+        ('moderate', ['moderate', 'medium']),
+        ('low', ['low'])
+    ],
+    'family_history': [
+        ('yes', ['yes', 'y', 'true', 'positive']),
+        ('no', ['no', 'n', 'false', 'negative'])
+    ]
+}
+
+# Free-text fields keep the raw answer when no known value matches
+FREE_TEXT_FIELDS = {'diet', 'sleep', 'stress'}
+
+# Without a separator, labels shorter than this only match exactly ('page 3' is not 'age 3')
+_MIN_FUZZY_LABEL_UNSEPARATED = 4
+
+# Confidence multipliers
+EXACT = 1.0
+FUZZY = 0.8
+RAW_VALUE = 0.5
+
+# "label: value" / "label = value"; lines without a separator are split on words
+_LINE_SEPARATOR = re.compile(r'\s*[:=]\s*')
+_WORD = re.compile(r'[a-z0-9<>]+')
+_AGE = re.compile(r'\b(\d{1,3})\b')
+
+# Digits OCR commonly produces inside words
+_OCR_LETTERS = str.maketrans({'0': 'o', '1': 'l', '5': 's', '8': 'b', '|': 'l'})
+
+
+class SurveyTextParser:
+    """Parse OCR text into survey answers in one pass over the lines.
+
+    Labels are looked up in an index (with a bounded-edit-distance fallback
+    for OCR noise), values are matched as whole words, and every field gets a
+    confidence in [0, 1]. Work per line is bounded by the fixed label and
+    value vocabularies, so parsing is linear in the length of the text.
+    """
+
+    def __init__(self, field_labels=None, field_values=None):
+        field_labels = field_labels or FIELD_LABELS
+        field_values = field_values or FIELD_VALUES
+
+        self.label_index = {}
+        for field, labels in field_labels.items():
+            for label in labels:
+                self.label_index[label] = field
+        self.max_label_words = max(len(label.split()) for label in self.label_index)
+
+        self.value_index = {}
+        for field, options in field_values.items():
+            index = {}
+            for canonical, spellings in options:
+                for spelling in spellings:
+                    index.setdefault(spelling, canonical)
+            self.value_index[field] = index
+
+        # OCR output repeats the same labels and values across forms
+        self._closest_label = lru_cache(maxsize=4096)(self._closest_label)
+        self._closest_value = lru_cache(maxsize=4096)(self._closest_value)
+
+    def parse(self, text):
+        """Return (answers, field_confidence)"""
+        answers = {}
+        confidence = {}
+
+        for line in text.lower().splitlines():
+            match = self._parse_line(line)
+            if match is None:
+                continue
+            field, value, field_confidence = match
+            if field_confidence > confidence.get(field, 0.0):
+                answers[field] = value
+                confidence[field] = round(field_confidence, 2)
+
+        return answers, confidence
+
+    def _parse_line(self, line):
+        parts = _LINE_SEPARATOR.split(line.strip(), maxsplit=1)
+        if len(parts) == 2:
+            field, label_confidence = self._match_label(parts[0])
+            value_text = parts[1]
+        else:
+            field, label_confidence, value_text = self._match_leading_label(parts[0])
+            if field is None:
+                field, label_confidence, value_text = self._match_inner_label(parts[0])
+        if field is None:
+            return None
+
+        value, value_confidence = self.parse_value(field, value_text)
+        if value is None:
+            return None
+        return field, value, label_confidence * value_confidence
+
+    def _match_label(self, label):
+        words = _WORD.findall(label)
+        field, label_confidence = self._closest_label(' '.join(words))
+        if field is not None:
+            return field, label_confidence
+
+        # "Alcohol consumption:" is labelled by its leading word(s)
+        for count in range(min(self.max_label_words, len(words) - 1), 0, -1):
+            field, label_confidence = self._closest_label(' '.join(words[:count]))
+            if field is not None:
+                return field, label_confidence
+        return None, 0.0
+
+    def _closest_label(self, label, min_fuzzy_length=0):
+        field = self.label_index.get(label)
+        if field is not None:
+            return field, EXACT
+
+        cleaned = label.translate(_OCR_LETTERS)
+        field = self.label_index.get(cleaned)
+        if field is not None:
+            return field, FUZZY
+
+        if len(cleaned) < 3:
+            return None, 0.0
+        best = None
+        for known, known_field in self.label_index.items():
+            if len(known) < min_fuzzy_length:
+                continue
+            distance = _edit_distance(cleaned, known, _max_edits(known))
+            if distance is not None and (best is None or distance < best[0]):
+                best = (distance, known_field)
+        if best is not None:
+            return best[1], FUZZY
+        return None, 0.0
+
+    def _match_leading_label(self, line):
+        """Label taken from the first word(s) when the separator was lost"""
+        words = _WORD.findall(line)
+        for count in range(min(self.max_label_words, len(words) - 1), 0, -1):
+            field, label_confidence = self._closest_label(' '.join(words[:count]), _MIN_FUZZY_LABEL_UNSEPARATED)
+            if field is not None:
+                return field, label_confidence * FUZZY, ' '.join(words[count:])
+        return None, 0.0, ''
+
+    def _match_inner_label(self, line):
+        """Exact label anywhere in the line, answer after it ('do you smoke? no')"""
+        words = _WORD.findall(line)
+        for start in range(len(words) - 1):
+            for count in range(min(self.max_label_words, len(words) - 1 - start), 0, -1):
+                field = self.label_index.get(' '.join(words[start:start + count]))
+                if field is not None:
+                    return field, FUZZY, ' '.join(words[start + count:])
+        return None, 0.0, ''
+
+    def parse_value(self, field, value_text):
+        """(canonical value, confidence) for one field's answer text; (None, 0.0) if unreadable"""
+        value_text = value_text.strip()
+        if not value_text:
+            return None, 0.0
+
+        if field == 'age':
+            age_match = _AGE.search(value_text)
+            return (int(age_match.group(1)), EXACT) if age_match else (None, 0.0)
+
+        index = self.value_index.get(field, {})
+        words = _WORD.findall(value_text)
+
+        # Whole-word matches only: 'y' must not match inside 'rarely'
+        for size in (2, 1):
+            for start in range(len(words) - size + 1):
+                canonical = index.get(' '.join(words[start:start + size]))
+                if canonical is not None:
+                    return canonical, EXACT
+
+        for word in words:
+            canonical = self._closest_value(field, word)
+            if canonical is not None:
+                return canonical, FUZZY
+
+        if field in FREE_TEXT_FIELDS:
+            return value_text, RAW_VALUE
+        return None, 0.0
+
+    def _closest_value(self, field, word):
+        """Known value within one edit of a word (4+ letters), or None"""
+        if len(word) < 4:
+            return None
+        for spelling, canonical in self.value_index.get(field, {}).items():
+            if _edit_distance(word.translate(_OCR_LETTERS), spelling, 1) is not None:
+                return canonical
+        return None
+
+
+def _max_edits(word):
+    return 1 if len(word) < 7 else 2
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance if it is at most limit, else None"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
@@ -0,0 +1,133 @@
+# Re-score stored results under a new scoring model, reporting only records whose risk level changed
+#
+#   python rescore.py results.ndjson --model weights-v2.json -o changed.ndjson
+#   python rescore.py results.ndjson --model weights-v2.json --previous-model weights-v1.json
+import argparse
+import json
+import sys
+import time
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+from bulk_score import read_chunks
+from models.records import FACTOR_MASKS, RISK_LEVEL_CODES, RiskFactor, RiskLevel, factor_mask
+from models.scoring_model import ScoringModel
+
+
+def stored_mask(record):
+    """Factor mask of a stored record: its "mask", or its factor labels
+    (a list, or bulk_score's {"factors": [...]} object)"""
+    mask = record.get('mask')
+    if mask is not None:
+        if not isinstance(mask, int) or not 0 <= mask < FACTOR_MASKS:
+            raise ValueError(f"Invalid factor mask {mask!r}")
+        return mask
+    factors = record['factors']
+    if isinstance(factors, dict):
+        factors = factors['factors']
+    return factor_mask(RiskFactor.from_label(label) for label in factors)
+
+
+def stored_level(record):
+    """Stored risk level code: "risk_level", or bulk_score's risk_classification.risk_level"""
+    label = record.get('risk_level')
+    if label is None:
+        label = record['risk_classification']['risk_level']
+    level = RiskLevel.from_label(label)
+    if level is None:
+        raise ValueError(f"Unknown risk level {label!r}")
+    return level
+
+
+def rescore_chunk(chunk, model, previous_model=None):
+    """Changed records of a chunk of (line_number, raw_line) pairs, and the number skipped.
+
+    Records without a usable factor set (or, without ``previous_model``,
+    a stored level) are skipped; bulk_score error records have neither.
+    """
+    import numpy as np
+    lines = []
+    ids = []
+    masks = []
+    levels = []
+    skipped = 0
+    for line_number, line in chunk:
+        try:
+            record = _loads(line)
+            mask = stored_mask(record)
+            level = previous_model.mask_levels[mask] if previous_model is not None else stored_level(record)
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            skipped += 1
+            continue
+        lines.append(line_number)
+        ids.append(record.get('id'))
+        masks.append(mask)
+        levels.append(level)
+
+    rows, level_codes, scores = model.rescore(np.array(masks, dtype=np.intp), np.array(levels, dtype=np.int8))
+    changed = [
+        {
+            "line": lines[row],
+            "id": ids[row],
+            "mask": masks[row],
+            "previous_level": RISK_LEVEL_CODES[levels[row]].label,
+            "risk_level": RISK_LEVEL_CODES[code].label,
+            "score": score
+        }
+        for row, code, score in zip(rows.tolist(), level_codes.tolist(), scores.tolist())
+    ]
+    return changed, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored factor sets under a new scoring model")
+    parser.add_argument('input', help="NDJSON stored results (bulk_score output or {\"mask\"/\"factors\", \"risk_level\"}), or - for stdin")
+    parser.add_argument('--model', help="New scoring model JSON; Config's weights and thresholds if omitted")
+    parser.add_argument('--previous-model', help="Model the input was scored with, instead of its stored risk levels")
+    parser.add_argument('-o', '--output', default='-', help="NDJSON of changed records, or - for stdout")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    model = ScoringModel.from_file(args.model) if args.model else ScoringModel.from_config()
+    previous_model = ScoringModel.from_file(args.previous_model) if args.previous_model else None
+
+    started = time.perf_counter()
+    if previous_model is not None and not model.changed_masks(previous_model):
+        # No factor set changes level, so no record can
+        print(f"Model {model.version} changes no risk level from {previous_model.version}", file=sys.stderr)
+        return
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    total = changed = skipped = 0
+    try:
+        for chunk in read_chunks(source, args.chunk_size):
+            records, chunk_skipped = rescore_chunk(chunk, model, previous_model)
+            total += len(chunk)
+            skipped += chunk_skipped
+            changed += len(records)
+            for record in records:
+                sink.write(json.dumps(record, separators=(',', ':')))
+                sink.write('\n')
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0.0
+    print(
+        f"Re-scored {total} records under model {model.version}: {changed} changed level, "
+        f"{skipped} skipped, in {elapsed:.2f}s ({rate:.0f} records/s)",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+# Shared fixtures: the Flask app with process-wide side effects kept out of the working tree
+import os
+
+# Read by Config at import, so set before the app is imported
+os.environ.setdefault('POPULATION_STATS_FILE', '')
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def wsgi():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(wsgi):
+    return wsgi.app.test_client()
+
+
+@pytest.fixture
+def uncached_pipeline(wsgi, monkeypatch):
+    """The app's pipeline with its result cache off, so every request runs steps 2-4"""
+    monkeypatch.setattr(wsgi.pipeline, 'result_cache', None)
+    return wsgi.pipeline
@@ -0,0 +1,77 @@
+# ASGI admission: a request cancelled while queued gives back exactly what it held
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.admission import OCR, TEXT, AdmissionController, ConcurrencyBudget
+
+REQUEST = SimpleNamespace(method='POST', headers={'content-type': 'application/json'}, client=None)
+
+
+@pytest.fixture
+def asgi_admission(wsgi, monkeypatch):
+    """A text budget of one slot and one queue place, installed in the ASGI app"""
+    import asgi
+    controller = AdmissionController(
+        budgets={OCR: ConcurrencyBudget(OCR, 1, 0, 1), TEXT: ConcurrencyBudget(TEXT, 1, 1, 1)},
+        max_upload_bytes=1024 * 1024
+    )
+    monkeypatch.setattr(asgi, 'admission', controller)
+    return asgi, controller.budgets[TEXT]
+
+
+async def until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        await asyncio.sleep(0.01)
+
+
+def counters(budget):
+    stats = budget.stats()
+    return stats['running'], stats['queued']
+
+
+def test_cancelled_request_releases_the_slot_it_gets_later(asgi_admission):
+    asgi, budget = asgi_admission
+
+    async def scenario():
+        running = await asgi._admit(REQUEST)
+        queued = asyncio.ensure_future(asgi._admit(REQUEST))
+        await until(lambda: counters(budget) == (1, 1))
+
+        queued.cancel()  # Client disconnects while queued
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert counters(budget) == (1, 1)  # Its thread is still waiting
+
+        running.release()  # The waiting thread takes the slot, then gives it back
+        await until(lambda: counters(budget) == (0, 0))
+        await asyncio.sleep(0.05)
+        return counters(budget)
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_cancelled_request_that_times_out_releases_nothing_twice(asgi_admission):
+    asgi, budget = asgi_admission
+    budget.timeout = 0.1
+
+    async def scenario():
+        running = await asgi._admit(REQUEST)
+        queued = asyncio.ensure_future(asgi._admit(REQUEST))
+        await until(lambda: counters(budget) == (1, 1))
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await until(lambda: budget.stats()['rejected'] == 1)
+        await asyncio.sleep(0.05)
+        result = counters(budget)
+        running.release()
+        return result
+
+    assert asyncio.run(scenario()) == (1, 0)
+    assert counters(budget) == (0, 0)
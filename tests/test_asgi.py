@@ -0,0 +1,99 @@
+# The Starlette app answers every endpoint exactly as the Flask app does
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+SURVEY = {"age": 42, "smoker": True, "exercise": "rarely", "diet": "high sugar"}
+IMAGE = (Path(__file__).resolve().parent.parent / 'survey_form.jpg').read_bytes()
+NDJSON = '{"age": 30, "smoker": false, "exercise": "daily", "diet": "balanced"}\nnot json\n'
+
+# (method, path, request body); bodies are compared byte for byte
+CASES = [
+    ('GET', '/', None),
+    ('GET', '/unknown', None),
+    ('POST', '/parse-text', {"json": SURVEY}),
+    ('POST', '/parse-text', {"json": {"age": 42}}),
+    ('POST', '/parse-text', {"data": "plain text", "content_type": "text/plain"}),
+    ('POST', '/extract-factors', {"json": {"answers": SURVEY}}),
+    ('POST', '/extract-factors', {"json": {}}),
+    ('POST', '/classify-risk', {"json": {"factors": ["smoking", "poor diet"]}}),
+    ('POST', '/get-recommendations', {"json": {"risk_level": "high", "factors": ["smoking"]}}),
+    ('POST', '/get-recommendations', {"json": {"risk_level": "extreme", "factors": []}}),
+    ('POST', '/analyze-complete', {"json": SURVEY}),
+    ('POST', '/analyze-complete', {"json": {"age": "old"}}),
+    ('POST', '/analyze-batch', {"json": [SURVEY, {"age": 1}, "not a survey"]}),
+    ('POST', '/analyze-batch', {"data": NDJSON, "content_type": "application/x-ndjson"}),
+    ('POST', '/parse-image', None),
+    ('POST', '/parse-image', {"image": IMAGE}),
+    ('POST', '/parse-image', {"image": b"not an image"}),
+    ('POST', '/analyze-complete', {"image": IMAGE}),
+    ('POST', '/parse-document', {"image": IMAGE}),
+    ('POST', '/parse-image-batch', {"images": [IMAGE, IMAGE]}),
+    ('GET', '/jobs/unknown', None),
+    ('GET', '/scoring-model', None),
+    ('GET', '/results/unknown', None),
+]
+
+# Counters move between the two calls, so only the shape is compared
+STATS = ['/stats', '/cache-stats', '/admission-stats']
+
+
+@pytest.fixture(scope='module')
+def asgi_client(wsgi):
+    from starlette.testclient import TestClient
+    import asgi
+    return TestClient(asgi.app)
+
+
+def flask_request(client, method, path, body):
+    if body is None:
+        return client.open(path, method=method)
+    if 'json' in body:
+        return client.open(path, method=method, json=body['json'])
+    if 'data' in body:
+        return client.open(path, method=method, data=body['data'], content_type=body['content_type'])
+    files = {'image': (io.BytesIO(body['image']), 'form.jpg')} if 'image' in body else {
+        'images': [(io.BytesIO(image), f'form{i}.jpg') for i, image in enumerate(body['images'])]
+    }
+    return client.open(path, method=method, data=files, content_type='multipart/form-data')
+
+
+def asgi_request(client, method, path, body):
+    if body is None:
+        return client.request(method, path)
+    if 'json' in body:
+        return client.request(method, path, json=body['json'])
+    if 'data' in body:
+        return client.request(method, path, content=body['data'], headers={'Content-Type': body['content_type']})
+    files = [('image', ('form.jpg', body['image'], 'image/jpeg'))] if 'image' in body else [
+        ('images', (f'form{i}.jpg', image, 'image/jpeg')) for i, image in enumerate(body['images'])
+    ]
+    return client.request(method, path, files=files)
+
+
+@pytest.mark.parametrize('method, path, body', CASES, ids=[f"{m} {p} {i}" for i, (m, p, _) in enumerate(CASES)])
+def test_same_status_and_body(client, asgi_client, method, path, body):
+    flask = flask_request(client, method, path, body)
+    starlette = asgi_request(asgi_client, method, path, body)
+
+    assert starlette.status_code == flask.status_code
+    assert starlette.content == flask.data
+
+
+@pytest.mark.parametrize('path', STATS)
+def test_same_stats_shape(client, asgi_client, path):
+    flask = client.get(path)
+    starlette = asgi_client.get(path)
+
+    assert starlette.status_code == flask.status_code
+    assert sorted(starlette.json()) == sorted(json.loads(flask.data))
+
+
+def test_same_metrics_format(client, asgi_client):
+    flask = client.get('/metrics')
+    starlette = asgi_client.get('/metrics')
+
+    assert starlette.status_code == flask.status_code == 200
+    assert starlette.headers['content-type'] == flask.headers['Content-Type']
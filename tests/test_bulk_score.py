@@ -0,0 +1,64 @@
+# bulk_score.py: ordered, bounded streaming of NDJSON surveys through the pipeline
+import io
+import time
+
+import pytest
+
+import bulk_score
+from bulk_score import iter_results, read_chunks
+
+SURVEY = '{"age": 42, "smoker": true, "exercise": "rarely", "diet": "high sugar"}'
+
+
+def ndjson(count):
+    """Valid surveys with an invalid line every fifth line and a blank one in between"""
+    lines = ['{oops' if n % 5 == 4 else SURVEY for n in range(count)]
+    lines.insert(3, '')
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+def surveys(count):
+    return io.StringIO((SURVEY + '\n') * count)
+
+
+def slow_first_chunk(chunk):
+    if chunk[0][0] == 1:
+        time.sleep(0.5)
+    return [{"status": "ok", "line": line_number} for line_number, _ in chunk]
+
+
+def failing_chunk(chunk):
+    if chunk[0][0] == 4:
+        raise RuntimeError("worker crashed")
+    return [{"status": "ok", "line": line_number} for line_number, _ in chunk]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_results_come_out_in_input_order(workers):
+    records = [record for chunk in iter_results(read_chunks(ndjson(20), 3), workers) for record in chunk]
+
+    assert [record['line'] for record in records] == [n for n in range(1, 22) if n != 4]
+    errors = [record for record in records if record['status'] != 'ok']
+    assert [record['line'] for record in errors] == [6, 11, 16, 21]
+    assert all(record['error'].startswith(f"Invalid JSON on line {record['line']}") for record in errors)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_a_failed_chunk_becomes_error_lines(monkeypatch, workers):
+    monkeypatch.setattr(bulk_score, 'score_chunk', failing_chunk)
+
+    records = [record for chunk in iter_results(read_chunks(surveys(9), 3), workers) for record in chunk]
+
+    assert [record['line'] for record in records] == list(range(1, 10))
+    assert [record['status'] for record in records] == ['ok'] * 3 + ['error'] * 3 + ['ok'] * 3
+    assert records[3]['error'] == "Scoring error: worker crashed"
+
+
+def test_waiting_on_a_slow_chunk_does_not_spin(monkeypatch):
+    monkeypatch.setattr(bulk_score, 'score_chunk', slow_first_chunk)
+    started = time.process_time()
+
+    records = [record for chunk in iter_results(read_chunks(surveys(8), 1), 2) for record in chunk]
+
+    assert [record['line'] for record in records] == list(range(1, 9))
+    assert time.process_time() - started < 0.25
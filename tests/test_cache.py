@@ -0,0 +1,80 @@
+# LRUCache byte/entry bounds and the OCR result cache's disk tier
+import os
+
+from utils.cache import LRUCache, OCRResultCache
+
+
+def byte_cache(max_bytes):
+    return LRUCache(max_bytes=max_bytes, sizeof=lambda key, value: len(value))
+
+
+def test_lru_evicts_least_recently_used_to_stay_within_the_byte_budget():
+    cache = byte_cache(10)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'xxxx')
+    cache.get('a')  # 'b' is now the oldest
+
+    cache.put('c', 'xxxx')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'xxxx' and cache.get('c') == 'xxxx'
+    assert cache.stats()['bytes'] == 8
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_replacing_a_key_recounts_its_bytes():
+    cache = byte_cache(10)
+    cache.put('a', 'xxxxxx')
+    cache.put('a', 'xx')
+    cache.put('b', 'xxxxxxxx')
+
+    assert len(cache) == 2
+    assert cache.stats()['bytes'] == 10
+
+
+def test_lru_skips_entries_larger_than_the_budget():
+    cache = byte_cache(4)
+    cache.put('a', 'xx')
+
+    cache.put('big', 'xxxxx')
+
+    assert cache.get('big') is None
+    assert cache.get('a') == 'xx'
+
+
+def test_lru_entry_bound():
+    cache = LRUCache(max_entries=2)
+    for key in 'abc':
+        cache.put(key, key)
+
+    assert [cache.get(key) for key in 'abc'] == [None, 'b', 'c']
+
+
+def test_disk_tier_serves_entries_another_cache_wrote_and_promotes_them(tmp_path):
+    writer = OCRResultCache(1024, str(tmp_path))
+    key = OCRResultCache.make_key(b'scan', ('parse_image', 'eng'))
+    writer.put(key, "Age: 42")
+
+    reader = OCRResultCache(1024, str(tmp_path))
+    assert reader.get(key) == "Age: 42"
+    assert reader.get(key) == "Age: 42"
+
+    stats = reader.stats()
+    assert stats['disk_hits'] == 1  # The second lookup was a memory hit
+    assert stats['hits'] == 2 and stats['misses'] == 0
+    assert [name for _, _, names in os.walk(tmp_path) for name in names] == [f"{key}.txt"]
+
+
+def test_disk_tier_miss(tmp_path):
+    cache = OCRResultCache(1024, str(tmp_path))
+
+    assert cache.get(OCRResultCache.make_key(b'scan', ())) is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_keys_depend_on_bytes_and_settings():
+    key = OCRResultCache.make_key(b'scan', ('eng',))
+
+    assert key == OCRResultCache.make_key(b'scan', ('eng',))
+    assert key != OCRResultCache.make_key(b'scan', ('deu',))
+    assert key != OCRResultCache.make_key(b'scan2', ('eng',))
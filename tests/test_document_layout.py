@@ -0,0 +1,74 @@
+# Page splitting and form region detection
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from models.document_layout import detect_form_regions, split_pages
+
+FORM = ["Age: 42", "Smoker: yes", "Exercise: rarely", "Diet: high sugar"]
+
+
+def page(*origins, size=(1100, 850)):
+    """White BGR page with one four-line form at each (x, y) origin"""
+    image = np.full(size + (3,), 255, dtype=np.uint8)
+    for x, y in origins:
+        for i, line in enumerate(FORM):
+            cv2.putText(image, line, (x, y + i * 40), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+    return image
+
+
+def contains(region, point):
+    x, y, w, h = region
+    return x <= point[0] < x + w and y <= point[1] < y + h
+
+
+def test_forms_separated_by_whitespace_are_found_in_reading_order():
+    image = page((60, 620), (60, 100))
+
+    regions = detect_form_regions(image)
+
+    assert len(regions) == 2
+    assert contains(regions[0], (70, 100)) and not contains(regions[0], (70, 620))
+    assert contains(regions[1], (70, 620)) and not contains(regions[1], (70, 100))
+
+
+def test_a_single_form_is_the_whole_page():
+    image = page((60, 100))
+
+    assert detect_form_regions(image) == [(0, 0, 850, 1100)]
+
+
+def test_a_blank_page_is_the_whole_page():
+    assert detect_form_regions(page()) == [(0, 0, 850, 1100)]
+
+
+def test_multi_page_tiffs_are_split_into_bgr_pages():
+    frames = [Image.new('RGB', (40, 30), color) for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255))]
+    buffer = io.BytesIO()
+    frames[0].save(buffer, format='TIFF', save_all=True, append_images=frames[1:])
+
+    pages = list(split_pages(buffer.getvalue()))
+
+    assert [index for index, _ in pages] == [0, 1, 2]
+    assert all(image.shape == (30, 40, 3) for _, image in pages)
+    assert pages[0][1][0, 0].tolist() == [0, 0, 255]  # Red, in BGR order
+
+
+def test_split_pages_reads_paths(tmp_path):
+    path = tmp_path / 'form.png'
+    cv2.imwrite(str(path), page((60, 100)))
+
+    pages = list(split_pages(str(path)))
+
+    assert len(pages) == 1
+    assert pages[0][1].shape == (1100, 850, 3)
+
+
+def test_undecodable_bytes_yield_one_error():
+    pages = list(split_pages(b'not an image'))
+
+    assert len(pages) == 1
+    assert pages[0][0] == 0
+    assert isinstance(pages[0][1], ValueError)
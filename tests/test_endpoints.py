@@ -1 +1,95 @@
 # Test cases
+SURVEY = {"age": 42, "smoker": True, "exercise": "rarely", "diet": "high sugar"}
+
+
+def test_analyze_batch_reports_bad_records_by_index(client):
+    response = client.post('/analyze-batch', json=[SURVEY, {"age": 30}, "not a survey"])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['summary'] == {"total": 3, "succeeded": 1, "failed": 2}
+    assert body['results'][0]['index'] == 0
+    assert body['results'][0]['risk_classification']['risk_level'] == 'moderate'
+    assert [error['index'] for error in body['errors']] == [1, 2]
+
+
+def test_analyze_batch_ndjson_keeps_going_after_an_invalid_line(client):
+    lines = '{"age": 42, "smoker": true, "exercise": "rarely", "diet": "high sugar"}\n{oops\n'
+    response = client.post('/analyze-batch', data=lines, content_type='application/x-ndjson')
+
+    body = response.get_json()
+    assert body['summary'] == {"total": 2, "succeeded": 1, "failed": 1}
+    assert body['errors'][0]['index'] == 1
+    assert body['errors'][0]['error'].startswith("Invalid JSON on line 2")
+
+
+def test_analyze_complete_times_every_stage(client, uncached_pipeline):
+    response = client.post('/analyze-complete?timings=1', json=SURVEY)
+
+    assert response.status_code == 200
+    timings = response.get_json()['timings']
+    for stage in ('extract_factors', 'classify_risk', 'generate_recommendations'):
+        assert stage in timings
+
+
+def admission_controller(text_limit, rate_limiter=None):
+    from utils.admission import OCR, TEXT, AdmissionController, ConcurrencyBudget
+    return AdmissionController(
+        budgets={
+            OCR: ConcurrencyBudget(OCR, 1, 0, 0.1),
+            TEXT: ConcurrencyBudget(TEXT, text_limit, 0, 0.1)
+        },
+        max_upload_bytes=1024 * 1024,
+        rate_limiter=rate_limiter
+    )
+
+
+def test_admission_rejects_with_503_when_the_budget_is_full(wsgi, client, monkeypatch):
+    monkeypatch.setattr(wsgi, 'admission', admission_controller(text_limit=0))
+
+    response = client.post('/classify-risk', json={"factors": ["smoking"]})
+
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'busy'
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_admission_rate_limits_with_429(wsgi, client, monkeypatch):
+    from utils.admission import TokenBuckets
+    monkeypatch.setattr(wsgi, 'admission', admission_controller(text_limit=8, rate_limiter=TokenBuckets(0.5, 1)))
+
+    first = client.post('/classify-risk', json={"factors": ["smoking"]})
+    second = client.post('/classify-risk', json={"factors": ["smoking"]})
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert second.get_json()['status'] == 'rate_limited'
+    assert int(second.headers['Retry-After']) >= 1
+
+
+def test_admission_never_limits_gets(wsgi, client, monkeypatch):
+    monkeypatch.setattr(wsgi, 'admission', admission_controller(text_limit=0))
+
+    assert client.get('/').status_code == 200
+
+
+def test_results_are_stored_and_found_by_subject(wsgi, client, monkeypatch, tmp_path):
+    from utils.result_store import ResultStore
+    monkeypatch.setattr(wsgi, 'result_store', ResultStore(str(tmp_path / 'results.db')))
+
+    analysis = client.post('/analyze-complete?subject=p-17', json=SURVEY).get_json()
+    client.post('/analyze-complete?subject=p-18', json=SURVEY)
+    stored = client.get(f"/results/{analysis['result_id']}")
+    found = client.get('/results?subject=p-17').get_json()
+
+    assert stored.status_code == 200
+    assert stored.get_json()['answers'] == analysis['parsing']['answers']
+    assert stored.get_json()['risk_level'] == 'moderate'
+    assert stored.get_json()['recommendations'] == analysis['recommendations']['recommendations']
+    assert [result['id'] for result in found['results']] == [analysis['result_id']]
+    assert client.get('/results/unknown').status_code == 404
+    assert client.get('/results?limit=0').status_code == 400
+
+
+def test_results_404_without_a_store(client):
+    assert client.get('/results/anything').status_code == 404
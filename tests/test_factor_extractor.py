@@ -0,0 +1,81 @@
+# FactorExtractor: the compiled rule table, one rule at a time
+import json
+
+import pytest
+
+from models.factor_extractor import FactorExtractor
+
+BASE = {"age": 35, "smoker": False, "exercise": "daily", "diet": "balanced"}
+
+# (answers on top of BASE, factor expected or None)
+CASES = [
+    # 'true': only the boolean True counts
+    ({"smoker": True}, "smoking"),
+    ({"smoker": "yes"}, None),
+    ({"smoker": 1}, None),
+    # 'contains': any term anywhere in the answer, any case
+    ({"diet": "high sugar"}, "poor diet"),
+    ({"diet": "Mostly FAST FOOD"}, "poor diet"),
+    ({"diet": "processed and junk"}, "poor diet"),
+    ({"diet": "high protein"}, None),
+    ({"diet": ""}, None),
+    ({"sleep": "less than 6 hours"}, "poor sleep"),
+    ({"sleep": "<6"}, "poor sleep"),
+    ({"sleep": "Insomnia"}, "poor sleep"),
+    ({"sleep": "6-8 hours"}, None),
+    # 'exact': the whole answer must be a term, any case
+    ({"exercise": "rarely"}, "low exercise"),
+    ({"exercise": "NEVER"}, "low exercise"),
+    ({"exercise": "seldom"}, "low exercise"),
+    ({"exercise": "very rarely"}, None),
+    ({"alcohol": "heavy"}, "excessive alcohol"),
+    ({"alcohol": "daily"}, "excessive alcohol"),
+    ({"alcohol": "occasional"}, None),
+    ({"stress": "chronic"}, "high stress"),
+    ({"stress": "highly manageable"}, None),
+    ({"family_history": "Positive"}, "family history"),
+    ({"family_history": "no"}, None),
+]
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return FactorExtractor()
+
+
+@pytest.mark.parametrize('answers, factor', CASES)
+def test_each_rule_matches_only_its_terms(extractor, answers, factor):
+    result = extractor.extract_factors(dict(BASE, **answers))
+
+    assert result['factors'] == ([factor] if factor else [])
+
+
+def test_missing_optional_fields_match_nothing(extractor):
+    assert extractor.extract_factors(BASE) == {"factors": [], "confidence": 0.95}
+
+
+def test_factors_follow_rule_order_and_average_confidence(extractor):
+    answers = {"age": 50, "smoker": True, "exercise": "never", "diet": "junk", "stress": "high"}
+
+    result = extractor.extract_factors(answers)
+
+    assert result['factors'] == ["smoking", "poor diet", "low exercise", "high stress"]
+    assert result['confidence'] == round((0.95 + 0.9 + 0.85 + 0.85) / 4, 2)
+
+
+def test_rules_file_replaces_the_config_table(tmp_path, monkeypatch):
+    from config import Config
+    rules = [{"factor": "shift work", "field": "job", "match": "contains", "terms": ["night"], "confidence": 0.8}]
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules))
+    monkeypatch.setattr(Config, 'FACTOR_RULES_FILE', str(path))
+
+    extractor = FactorExtractor()
+
+    assert extractor.extract_factors({"job": "Night nurse", "smoker": True})['factors'] == ["shift work"]
+    assert extractor.risk_factors == {"shift work": ["job"]}
+
+
+def test_unknown_match_type_is_rejected():
+    with pytest.raises(ValueError, match="Unknown factor rule match type"):
+        FactorExtractor([{"factor": "smoking", "field": "smoker", "match": "regex", "confidence": 0.9}])
@@ -0,0 +1,53 @@
+# open_upload: small uploads stay in memory, large ones are spooled to disk and removed
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from utils.helpers import open_upload
+
+THRESHOLD = 16
+
+
+def upload(data, filename='scan.jpg'):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+@pytest.mark.parametrize('size', [0, 1, THRESHOLD])
+def test_uploads_up_to_the_threshold_stay_in_memory(tmp_path, size):
+    data = bytes(range(size))
+
+    with open_upload(upload(data), str(tmp_path), THRESHOLD) as image:
+        assert image == data
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_larger_uploads_are_spooled_whole_and_removed(tmp_path):
+    data = bytes(range(256)) * 4
+
+    with open_upload(upload(data, filename='../../scan 1.jpg'), str(tmp_path), THRESHOLD) as path:
+        assert isinstance(path, str)
+        assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(path)]
+        assert path.endswith('_scan_1.jpg')
+        with open(path, 'rb') as f:
+            assert f.read() == data
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spooled_upload_is_removed_when_processing_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        with open_upload(upload(b'x' * (THRESHOLD + 1)), str(tmp_path), THRESHOLD):
+            raise RuntimeError("OCR failed")
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_concurrent_spools_of_one_filename_do_not_collide(tmp_path):
+    with open_upload(upload(b'a' * 32), str(tmp_path), THRESHOLD) as first:
+        with open_upload(upload(b'b' * 32), str(tmp_path), THRESHOLD) as second:
+            assert first != second
+            with open(first, 'rb') as f:
+                assert f.read() == b'a' * 32
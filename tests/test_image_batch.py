@@ -0,0 +1,130 @@
+# ImageBatchParser: dedupe, OCR cache hits and per-scan errors, and the /parse-image-batch summary
+import io
+import os
+
+import pytest
+
+from models.image_batch import ImageBatchParser
+from models.ocr_processor import OCRProcessor
+from utils.cache import OCRResultCache
+
+FORM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'survey_form.jpg')
+
+
+@pytest.fixture(scope='module')
+def scans():
+    """Two different encodings of the sample form; trailing bytes don't change the decode"""
+    with open(FORM, 'rb') as f:
+        data = f.read()
+    return data, data + b'\0'
+
+
+class CountingParse:
+    """Stands in for parse_image, one canned result per distinct image"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, image):
+        self.calls.append(image)
+        return {"answers": {"size": len(image)}, "missing_fields": [], "confidence": 0.9}
+
+
+def counting_processor(monkeypatch):
+    processor = OCRProcessor(ocr_backend=object(), ocr_cache=OCRResultCache(1 << 20))
+    monkeypatch.setattr(processor, 'parse_image', CountingParse())
+    return processor
+
+
+def test_duplicates_are_parsed_once(scans, monkeypatch):
+    first, second = scans
+    processor = counting_processor(monkeypatch)
+
+    results = ImageBatchParser(processor, workers=1).parse_images([first, second, first, first])
+
+    assert processor.parse_image.calls == [first, second]
+    assert results[0] == {"answers": {"size": len(first)}, "missing_fields": [], "confidence": 0.9}
+    assert results[2] == dict(results[0], duplicate_of=0)
+    assert results[3] == dict(results[0], duplicate_of=0)
+    assert 'duplicate_of' not in results[1]
+
+
+def test_cached_scans_are_not_parsed_again(scans, monkeypatch):
+    first, second = scans
+    processor = counting_processor(monkeypatch)
+    parser = ImageBatchParser(processor, workers=1)
+    parser.parse_images([first])
+
+    results = parser.parse_images([first, second, first])
+
+    assert processor.parse_image.calls == [first, second]
+    parsed = {"answers": {"size": len(first)}, "missing_fields": [], "confidence": 0.9}
+    assert results[0] == dict(parsed, cached=True)
+    assert 'cached' not in results[1]
+    # A duplicate of a cache hit points at it rather than counting as a hit itself
+    assert results[2] == dict(parsed, duplicate_of=0)
+
+
+def test_errors_are_not_cached(scans, monkeypatch):
+    first, _ = scans
+    processor = counting_processor(monkeypatch)
+    monkeypatch.setattr(processor, 'parse_image', lambda image: {"error": "OCR processing error: boom"})
+    parser = ImageBatchParser(processor, workers=1)
+
+    parser.parse_images([first])
+
+    assert 'cached' not in parser.parse_images([first])[0]
+
+
+def test_a_scan_failing_in_its_worker_fails_only_that_index(scans, monkeypatch):
+    # The first scan's worker can't attach its shared memory block and raises
+    share = ImageBatchParser._share
+    shared = []
+
+    def share_first_under_a_wrong_name(self, data):
+        block, (name, shape, dtype) = share(self, data)
+        shared.append(name)
+        if len(shared) == 1:
+            name = f"{name}-missing"
+        return block, (name, shape, dtype)
+
+    monkeypatch.setattr(ImageBatchParser, '_share', share_first_under_a_wrong_name)
+    processor = OCRProcessor(ocr_backend=object(), ocr_cache=None)
+    parser = ImageBatchParser(processor, workers=2)
+    try:
+        results = parser.parse_images(list(scans))
+    finally:
+        parser.close()
+
+    assert results[0]['error'].startswith("OCR processing error:")
+    assert f"{shared[0]}-missing" in results[0]['error']
+    # The other scan still ran in the pool: its result, not the first one's error
+    assert f"{shared[0]}-missing" not in str(results[1])
+
+
+def test_endpoint_summary_counts(client, wsgi, scans, monkeypatch):
+    first, second = scans
+    processor = wsgi.ocr_processor
+    monkeypatch.setattr(processor, 'ocr_cache', OCRResultCache(1 << 20))
+    monkeypatch.setattr(processor, 'parse_image', CountingParse())
+    monkeypatch.setattr(processor.batch_parser, 'workers', 1)
+    processor.parse_image_batch([first])
+
+    images = [('a.jpg', first), ('notes.txt', b'text'), ('b.jpg', second), ('c.jpg', first)]
+    response = client.post('/parse-image-batch', content_type='multipart/form-data', data={
+        'images': [(io.BytesIO(data), filename) for filename, data in images]
+    })
+
+    body = response.get_json()
+    results = body['results']
+    assert [(result['index'], result['filename']) for result in results] == [
+        (0, 'a.jpg'), (1, 'notes.txt'), (2, 'b.jpg'), (3, 'c.jpg')
+    ]
+    assert results[0]['cached'] is True
+    assert results[1]['error'] == "Invalid image format"
+    # Index within the request, past the invalid upload
+    assert results[3]['duplicate_of'] == 0
+    assert body['summary'] == {
+        "total": 4, "unique": 3, "duplicates": 1, "cached": 1, "succeeded": 3, "failed": 1
+    }
+    assert processor.parse_image.calls == [first, second]
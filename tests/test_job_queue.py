@@ -0,0 +1,79 @@
+# JobQueue: result expiry, the queue bound and job state shared through SQLite
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils import job_queue
+from utils.job_queue import JobQueue, QueueFullError
+
+
+def wait_for(queue, job_id, status='done', timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job is not None and job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached {status}")
+
+
+def test_finished_jobs_expire_after_the_ttl():
+    queue = JobQueue(workers=1, max_queued=4, result_ttl=0.1)
+
+    job_id = queue.submit(lambda: {"risk_level": "low"})
+
+    assert wait_for(queue, job_id)['result'] == {"risk_level": "low"}
+    time.sleep(0.2)
+    assert queue.get(job_id) is None
+    assert queue.stats()['tracked_jobs'] == 0
+
+
+def test_failed_jobs_report_the_error():
+    queue = JobQueue(workers=1, max_queued=4, result_ttl=60)
+
+    job_id = queue.submit(lambda: 1 / 0)
+
+    assert wait_for(queue, job_id, status='failed')['error'] == "division by zero"
+
+
+def test_submit_fails_once_the_queue_is_full():
+    release = threading.Event()
+    queue = JobQueue(workers=1, max_queued=1, result_ttl=60)
+    try:
+        running = queue.submit(release.wait)
+        wait_for(queue, running, status='running')
+        queue.submit(release.wait)  # Waits in the queue
+
+        with pytest.raises(QueueFullError):
+            queue.submit(release.wait)
+        assert queue.stats()['tracked_jobs'] == 2
+    finally:
+        release.set()
+
+
+def test_any_queue_sharing_the_file_answers_polls(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    running, polling = JobQueue(1, 4, 60, path=path), JobQueue(1, 4, 60, path=path)
+
+    job_id = running.submit(lambda: {"risk_level": "high"})
+    wait_for(running, job_id)
+
+    assert polling.get(job_id)['result'] == {"risk_level": "high"}
+    assert polling.get('unknown') is None
+
+
+def test_expired_rows_from_other_processes_are_swept(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, '_SWEEP_INTERVAL', 0)
+    path = str(tmp_path / 'jobs.db')
+    running = JobQueue(1, 4, result_ttl=0.1, path=path)
+    job_id = running.submit(lambda: None)
+    wait_for(running, job_id)
+    time.sleep(0.2)
+
+    # A queue that never ran the job still clears its row
+    JobQueue(1, 4, result_ttl=0.1, path=path).get('unknown')
+
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM jobs").fetchone() == (0,)
@@ -0,0 +1,60 @@
+# FastJSONProvider: the same response bytes as Flask's default provider, streamed or not
+import datetime
+import decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils import json_provider
+from utils.json_provider import FastJSONProvider
+
+PAYLOADS = {
+    "survey": {"status": "ok", "score": 60, "confidence": 0.9, "factors": ["smoking", "poor diet"], "nested": {"b": 1, "a": None}},
+    "non_ascii": {"diet": "café au lait", "note": "naïve — ok", "emoji": "\U0001F600"},
+    "big_int": {"id": 2 ** 70, "list": [1, 2, 3]},
+    "stdlib_types": {"date": datetime.date(2026, 10, 17), "amount": decimal.Decimal('1.50')},
+    "batch": {"results": [{"index": i, "risk_level": "low", "name": "José"} for i in range(50)], "summary": {"total": 50}},
+    "list": [{"b": 2, "a": 1}, "x"],
+    "empty": {"results": [], "errors": []},
+}
+
+
+# Providers only hold a weak reference to their app
+app = Flask(__name__)
+
+
+@pytest.fixture(scope='module')
+def providers():
+    return FastJSONProvider(app), DefaultJSONProvider(app)
+
+
+@pytest.mark.parametrize('payload', PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_response_bytes_match_the_default_provider(providers, payload):
+    fast, default = providers
+
+    assert fast.response(payload).data == default.response(payload).data
+
+
+@pytest.mark.parametrize('payload', PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_streamed_bytes_match_the_response(providers, payload, monkeypatch):
+    monkeypatch.setattr(json_provider, 'STREAM_CHUNK_BYTES', 64)  # Several chunks for the batch
+    fast, _ = providers
+
+    chunks = list(fast.iter_encode(payload))
+
+    assert b''.join(chunks) == fast.response(payload).data
+    if payload is PAYLOADS['batch']:
+        assert len(chunks) > 1
+
+
+def test_non_ascii_text_is_escaped(providers):
+    fast, _ = providers
+
+    assert fast.response({"diet": "café"}).data == b'{"diet":"caf\\u00e9"}\n'
+
+
+def test_request_bodies_decode_as_utf8(providers):
+    fast, _ = providers
+
+    assert fast.loads('{"diet": "café"}'.encode('utf-8')) == {"diet": "café"}
@@ -0,0 +1,38 @@
+# The OCR stack stays unloaded until an image request (or warm_start) needs it
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# numpy is left out: batch scoring and population stats use it for text requests too
+HEAVY = ['cv2', 'PIL.Image', 'pytesseract', 'tesserocr', 'models.document_layout', 'models.preprocessing']
+
+SCRIPT = """
+import json, sys
+import app
+
+loaded = {"import": [m for m in HEAVY + ['numpy'] if m in sys.modules]}
+client = app.app.test_client()
+client.post('/analyze-complete', json={"age": 42, "smoker": True, "exercise": "rarely", "diet": "high sugar"})
+client.post('/analyze-batch', json=[{"age": 30, "smoker": False, "exercise": "daily", "diet": "balanced"}])
+loaded["text requests"] = [m for m in HEAVY if m in sys.modules]
+app.warm_start()
+loaded["warm_start"] = [m for m in HEAVY if m in sys.modules]
+print(json.dumps(loaded))
+"""
+
+
+def test_importing_the_app_and_scoring_json_loads_no_ocr_modules():
+    run = subprocess.run(
+        [sys.executable, '-c', f"HEAVY = {HEAVY!r}\n{SCRIPT}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+        env=dict(os.environ, POPULATION_STATS_FILE='')
+    )
+    loaded = json.loads(run.stdout.strip().splitlines()[-1])
+
+    assert loaded["import"] == []
+    assert loaded["text requests"] == []
+    assert {'cv2', 'PIL.Image'} <= set(loaded["warm_start"])
@@ -0,0 +1,70 @@
+# OCR backends: the worker pool's engine fallback, its warning and recovery from a broken pool
+import importlib.util
+import logging
+import os
+import sys
+
+import pytest
+
+from models import ocr_backends
+from models.ocr_backends import PooledOCRBackend
+
+
+def _crash(image, psm):
+    os._exit(1)
+
+
+def _echo(image, psm):
+    return (image, psm)
+
+
+class FakePytesseract:
+    def __init__(self):
+        self.calls = []
+
+    def image_to_string(self, image, config=''):
+        self.calls.append(config)
+        return "Age: 42"
+
+
+_find_spec = importlib.util.find_spec
+
+
+@pytest.fixture
+def no_tesserocr(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'tesserocr', None)  # Importing it raises ImportError
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name, *args: None if name == 'tesserocr' else _find_spec(name, *args))
+
+
+def test_workers_use_pytesseract_without_tesserocr(no_tesserocr, monkeypatch):
+    fake = FakePytesseract()
+    monkeypatch.setattr(ocr_backends, 'load_pytesseract', lambda: fake)
+    monkeypatch.setattr(ocr_backends, '_tess_api', None)
+
+    ocr_backends._init_worker('eng')
+
+    assert ocr_backends._tess_api is None
+    assert ocr_backends._worker_image_to_string('image', psm=7) == "Age: 42"
+    assert fake.calls == ['--psm 7']
+
+
+def test_pool_warns_without_tesserocr(no_tesserocr, caplog):
+    with caplog.at_level(logging.WARNING):
+        backend = PooledOCRBackend(workers=1, max_pending=0, timeout=5)
+    backend.close()
+
+    assert "tesserocr is not installed" in caplog.text
+
+
+def test_pool_restarts_after_a_worker_dies(caplog):
+    backend = PooledOCRBackend(workers=1, max_pending=1, timeout=30)
+    try:
+        with caplog.at_level(logging.WARNING):
+            # The dead worker breaks the pool; this image falls back to subprocess OCR
+            assert backend._run(_crash, lambda image, psm: "fallback", 'scan', None) == "fallback"
+
+        assert "OCR worker pool is broken" in caplog.text
+        # Later images run on a fresh pool
+        assert backend._run(_echo, pytest.fail, 'scan', 7) == ('scan', 7)
+    finally:
+        backend.close()
@@ -0,0 +1,47 @@
+# OCR processor: template region readout
+import numpy as np
+
+from models.ocr_processor import OCRProcessor
+
+
+class FakeOCRBackend:
+    """Returns canned lines for the stacked crops and canned text per single crop"""
+
+    name = 'fake'
+
+    def __init__(self, lines, single=None):
+        self.lines = lines
+        self.single = single or {}
+        self.single_calls = 0
+
+    def image_to_lines(self, image, psm=None):
+        return self.lines
+
+    def image_to_string(self, image, psm=None):
+        self.single_calls += 1
+        return self.single.get(image.shape[0], '')
+
+
+def crop(height):
+    return np.full((height, 100), 255, dtype=np.uint8)
+
+
+def test_region_lines_follow_crop_positions():
+    # 40px crops plus 8px padding: smoker [0, 48), age [48, 96), diet [96, 144)
+    crops = {'smoker': crop(40), 'age': crop(40), 'diet': crop(40)}
+    backend = FakeOCRBackend([(20, 'yes'), (100, 'high'), (130, 'sugar')], single={40: ''})
+    processor = OCRProcessor(ocr_backend=backend, ocr_cache=None)
+
+    texts = processor._read_regions(crops)
+
+    # The wrapped diet answer stays in diet; the empty age crop doesn't take a line
+    assert texts == {'smoker': 'yes', 'age': '', 'diet': 'high sugar'}
+    assert backend.single_calls == 1
+
+
+def test_region_without_a_stacked_line_is_read_alone():
+    crops = {'smoker': crop(40), 'age': crop(30)}
+    backend = FakeOCRBackend([(20, 'no')], single={30: '42'})
+    processor = OCRProcessor(ocr_backend=backend, ocr_cache=None)
+
+    assert processor._read_regions(crops) == {'smoker': 'no', 'age': '42'}
@@ -0,0 +1,84 @@
+# Analysis pipeline: steps 2-4 on parsed surveys, single and batched
+import pytest
+
+from models.factor_extractor import FactorExtractor
+from models.ocr_processor import OCRProcessor
+from models.pipeline import AnalysisPipeline
+from models.population_stats import PopulationStats
+from models.recommender import Recommender
+from models.risk_classifier import RiskClassifier
+
+SURVEYS = [
+    {"age": 42, "smoker": True, "exercise": "rarely", "diet": "high sugar"},
+    {"age": 25, "smoker": False, "exercise": "daily", "diet": "balanced"},
+    {"age": 67, "smoker": True, "exercise": "rarely", "diet": "high sugar", "alcohol": "heavy"},
+]
+
+
+def build_pipeline(cache_size=0, population_stats=None):
+    return AnalysisPipeline(
+        OCRProcessor(), FactorExtractor(), RiskClassifier(), Recommender(),
+        cache_size=cache_size, population_stats=population_stats
+    )
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return build_pipeline()
+
+
+def test_scores_a_parsed_survey(pipeline):
+    result = pipeline.analyze_parsed(pipeline.ocr_processor.parse_text(SURVEYS[0]))
+
+    assert result['status'] == 'ok'
+    assert result['factors']['factors'] == ['smoking', 'poor diet', 'low exercise']
+    assert result['risk_classification'] == {
+        "risk_level": "moderate",
+        "score": 60,
+        "rationale": ["smoking", "high sugar diet", "low activity"]
+    }
+    assert result['recommendations']['risk_level'] == 'moderate'
+
+
+def test_cached_results_match_uncached(pipeline):
+    cached = build_pipeline(cache_size=16)
+    for survey in SURVEYS * 2:
+        parsed = pipeline.ocr_processor.parse_text(survey)
+        assert cached.analyze_parsed(parsed) == pipeline.analyze_parsed(parsed)
+
+
+def test_cache_is_dropped_when_config_weights_change(monkeypatch):
+    from config import Config
+    cached = build_pipeline(cache_size=16)
+    parsed = cached.ocr_processor.parse_text(SURVEYS[0])
+    assert cached.analyze_parsed(parsed)['risk_classification']['score'] == 60
+
+    monkeypatch.setitem(Config.RISK_WEIGHTS, 'smoking', 40)
+
+    assert cached.analyze_parsed(parsed)['risk_classification']['score'] == 75
+    assert cached.analyze_parsed(parsed)['risk_classification']['risk_level'] == 'high'
+
+
+def test_batch_matches_single_surveys_and_isolates_bad_records(pipeline):
+    batch = pipeline.analyze_batch(SURVEYS + [{"age": 30}, ValueError("Invalid JSON on line 5")])
+
+    assert batch['summary'] == {"total": 5, "succeeded": 3, "failed": 2}
+    for result, survey in zip(batch['results'], SURVEYS):
+        expected = pipeline.analyze_parsed(pipeline.ocr_processor.parse_text(survey))
+        assert {k: v for k, v in result.items() if k != 'index'} == expected
+    assert [error['index'] for error in batch['errors']] == [3, 4]
+    assert batch['errors'][0]['status'] == 'incomplete_profile'
+    assert batch['errors'][1] == {"index": 4, "status": "error", "error": "Invalid JSON on line 5"}
+
+
+def test_population_stats_count_single_and_batch_surveys():
+    stats = PopulationStats(path=None)
+    counted = build_pipeline(population_stats=stats)
+
+    counted.analyze_parsed(counted.ocr_processor.parse_text(SURVEYS[0]))
+    counted.analyze_batch(SURVEYS)
+
+    summary = stats.query()
+    assert summary['total'] == 4
+    assert summary['risk_levels'] == {"low": 1, "moderate": 2, "high": 1}
+    assert summary['age_bands']['40-49']['total'] == 2
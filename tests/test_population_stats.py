@@ -0,0 +1,45 @@
+# PopulationStats queries and /stats filters
+from models.population_stats import PopulationStats
+from models.records import RiskLevel
+
+ROWS = [
+    (0b0000001, RiskLevel.MODERATE, 42),
+    (0b0000011, RiskLevel.HIGH, 67),
+    (0b0000000, RiskLevel.LOW, 25),
+    (0b0000001, RiskLevel.HIGH, 45),
+]
+
+
+def stats_with_rows():
+    stats = PopulationStats(path=None)
+    stats.record_many(ROWS)
+    return stats
+
+
+def test_repeated_filter_labels_count_once():
+    stats = stats_with_rows()
+
+    once = stats.query(age_bands=['40-49'], risk_levels=['high'])
+    repeated = stats.query(age_bands=['40-49', '40-49'], risk_levels=['high', 'high'])
+
+    assert once['total'] == 1
+    assert repeated == once
+
+
+def test_stats_endpoint_ignores_repeated_labels(wsgi, client, monkeypatch):
+    monkeypatch.setattr(wsgi, 'population_stats', stats_with_rows())
+
+    body = client.get('/stats?risk_level=high,high&risk_level=high').get_json()
+
+    assert body['total'] == 2
+    assert body['filters']['risk_levels'] == ['high']
+    assert body['risk_levels'] == {"high": 2}
+
+
+def test_unknown_filter_labels_are_rejected(wsgi, client, monkeypatch):
+    monkeypatch.setattr(wsgi, 'population_stats', stats_with_rows())
+
+    response = client.get('/stats?risk_level=extreme')
+
+    assert response.status_code == 400
+    assert "Unknown risk level 'extreme'" in response.get_json()['error']
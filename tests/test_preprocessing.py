@@ -0,0 +1,48 @@
+# AdaptivePreprocessor: black-on-white output cropped to the ink, never aliasing its buffers
+import cv2
+import numpy as np
+
+from models.preprocessing import AdaptivePreprocessor
+
+
+def blank(value=255, size=(400, 300)):
+    return np.full(size, value, dtype=np.uint8)
+
+
+def form(size=(400, 300)):
+    image = blank(size=size)
+    cv2.putText(image, "Age: 42", (60, 200), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return image
+
+
+def test_blank_page_result_survives_the_next_call():
+    preprocess = AdaptivePreprocessor()
+
+    first = preprocess(blank())
+    kept = first.copy()
+    preprocess(form())  # Same shape, so it thresholds into the same buffer
+
+    assert np.array_equal(first, kept)
+    assert first.shape == (400, 300)
+    assert (first == 255).all()
+
+
+def test_cropped_result_survives_the_next_call():
+    preprocess = AdaptivePreprocessor()
+
+    first = preprocess(form())
+    kept = first.copy()
+    preprocess(255 - form())
+
+    assert np.array_equal(first, kept)
+
+
+def test_output_is_black_text_on_white_cropped_to_the_ink():
+    preprocess = AdaptivePreprocessor(crop_margin=4)
+
+    normal = preprocess(form())
+    inverted = preprocess(255 - form())
+
+    assert normal.shape[0] < 100 and normal.shape[1] < 200
+    assert (normal == 255).mean() > 0.5
+    assert np.array_equal(normal, inverted)
@@ -0,0 +1,98 @@
+# Recommender: the precomputed index gives the legacy per-call output
+import itertools
+import json
+
+import pytest
+
+from models.recommender import DEFAULT_RECOMMENDATIONS, Recommender
+from models.records import RiskLevel, factor_codes
+
+FACTORS = list(DEFAULT_RECOMMENDATIONS)
+
+
+def legacy_recommendations(db, risk_level, factors):
+    """The per-call algorithm the index replaced"""
+    recommendations = []
+    for factor in factors:
+        if factor in db:
+            recommendations.extend(db[factor])
+    if risk_level == "high":
+        recommendations.insert(0, "Consult a healthcare provider immediately")
+        recommendations.append("Consider comprehensive health screening")
+    elif risk_level == "moderate":
+        recommendations.append("Schedule a routine health checkup")
+        recommendations.append("Monitor your health metrics regularly")
+    else:
+        recommendations.append("Maintain current healthy lifestyle")
+        recommendations.append("Continue regular health monitoring")
+    return list(dict.fromkeys(recommendations))[:10]
+
+
+def factor_lists():
+    """Every factor set in code order, plus orders, repeats and labels outside the index"""
+    for size in range(len(FACTORS) + 1):
+        yield from (list(factors) for factors in itertools.combinations(FACTORS, size))
+    yield ["family history", "smoking"]
+    yield ["smoking", "smoking"]
+    yield ["shift work", "poor sleep"]
+
+
+@pytest.fixture(scope='module')
+def recommender():
+    return Recommender(recommendations_file='')
+
+
+@pytest.mark.parametrize('risk_level', ['low', 'moderate', 'high', 'unknown'])
+def test_index_matches_legacy_output(recommender, risk_level):
+    for factors in factor_lists():
+        result = recommender.generate_recommendations(risk_level, factors)
+
+        assert result['risk_level'] == risk_level and result['factors'] == factors
+        assert list(result['recommendations']) == legacy_recommendations(DEFAULT_RECOMMENDATIONS, risk_level, factors)
+
+
+def test_typed_path_matches_the_dict_path(recommender):
+    for factors in factor_lists():
+        for level in RiskLevel:
+            typed = recommender.generate(level, factor_codes(factors))
+            assert typed.recommendations == recommender.generate_recommendations(level.label, factors)['recommendations']
+
+
+def test_recommendations_file_rebuilds_the_index(tmp_path, monkeypatch):
+    from config import Config
+    path = tmp_path / 'recommendations.json'
+    path.write_text(json.dumps({"factors": {"smoking": ["Stop smoking"]}}))
+    monkeypatch.setattr(Config, 'RECOMMENDATIONS_FILE', str(path))
+
+    recommender = Recommender()
+
+    assert recommender.version == 1
+    assert list(recommender.generate_recommendations('moderate', ['smoking', 'poor diet'])['recommendations']) == [
+        "Stop smoking", "Schedule a routine health checkup", "Monitor your health metrics regularly"
+    ]
+
+    path.write_text(json.dumps({
+        "factors": {"smoking": ["Rauchen aufgeben"]},
+        "risk_levels": {"moderate": {"last": ["Vorsorge planen"]}}
+    }))
+    recommender.load(str(path))
+
+    assert recommender.version == 2
+    assert list(recommender.generate_recommendations('moderate', ['smoking'])['recommendations']) == [
+        "Rauchen aufgeben", "Vorsorge planen"
+    ]
+    # Levels the file leaves out keep the default advice
+    assert list(recommender.generate_recommendations('low', ['smoking'])['recommendations']) == [
+        "Rauchen aufgeben", "Maintain current healthy lifestyle", "Continue regular health monitoring"
+    ]
+
+
+def test_assigning_the_db_rebuilds_the_index():
+    recommender = Recommender(recommendations_file='')
+
+    recommender.recommendations_db = {"smoking": ["Stop smoking"]}
+
+    assert recommender.version == 2
+    assert list(recommender.generate_recommendations('high', ['smoking'])['recommendations']) == [
+        "Consult a healthcare provider immediately", "Stop smoking", "Consider comprehensive health screening"
+    ]
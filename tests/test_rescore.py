@@ -0,0 +1,73 @@
+# rescore.py: re-scoring stored factor sets under a new scoring model
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from models.scoring_model import ScoringModel
+from rescore import rescore_chunk
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STORED = [
+    {"id": "a", "factors": ["smoking", "poor diet"], "risk_level": "moderate"},  # 45 under the default weights
+    {"id": "b", "factors": ["poor sleep"], "risk_level": "low"},
+    {"id": "c", "mask": 127, "risk_level": "high"},
+    {"status": "error", "error": "bad record"},
+]
+
+
+def lines(records):
+    return [(number, json.dumps(record)) for number, record in enumerate(records, start=1)]
+
+
+def test_reports_only_records_whose_level_changed():
+    model = ScoringModel({"smoking": 15}, (40, 70), version="v2")
+
+    changed, skipped = rescore_chunk(lines(STORED), model)
+
+    assert changed == [{
+        "line": 1, "id": "a", "mask": changed[0]['mask'],
+        "previous_level": "moderate", "risk_level": "low", "score": 35
+    }]
+    assert skipped == 1
+
+
+def test_previous_model_replaces_stored_levels():
+    previous = ScoringModel({}, (40, 70))
+    model = ScoringModel({}, (20, 70))
+
+    changed, _ = rescore_chunk(lines([{"id": "b", "factors": ["smoking"], "risk_level": "high"}]), model, previous)
+
+    assert [(record['previous_level'], record['risk_level']) for record in changed] == [("low", "moderate")]
+
+
+def test_cli_writes_changed_records(tmp_path):
+    source = tmp_path / 'results.ndjson'
+    source.write_text('\n'.join(json.dumps(record) for record in STORED) + '\n')
+    model = tmp_path / 'v2.json'
+    model.write_text(json.dumps({"version": "v2", "weights": {"smoking": 15}}))
+    output = tmp_path / 'changed.ndjson'
+
+    run = subprocess.run(
+        [sys.executable, 'rescore.py', str(source), '--model', str(model), '-o', str(output)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    assert [json.loads(line)['id'] for line in output.read_text().splitlines()] == ["a"]
+    assert "4 records under model v2: 1 changed level, 1 skipped" in run.stderr
+
+
+def test_cli_stops_early_when_no_factor_set_changes_level(tmp_path):
+    source = tmp_path / 'results.ndjson'
+    source.write_text(json.dumps(STORED[0]) + '\n')
+    model = tmp_path / 'v1.json'
+    model.write_text(json.dumps({"version": "v1"}))
+
+    run = subprocess.run(
+        [sys.executable, 'rescore.py', str(source), '--model', str(model), '--previous-model', str(model)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+    assert run.stdout == ''
+    assert "changes no risk level" in run.stderr
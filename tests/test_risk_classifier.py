@@ -0,0 +1,69 @@
+# RiskClassifier: the vectorized batch path scores exactly like classify_risk
+import pytest
+
+from models.risk_classifier import RiskClassifier
+from models.scoring_model import ScoringModel
+
+ALL_FACTORS = [
+    "smoking", "poor diet", "low exercise", "excessive alcohol",
+    "poor sleep", "high stress", "family history"
+]
+
+FACTOR_LISTS = [
+    [],
+    ["smoking"],
+    ["smoking", "smoking", "poor diet"],
+    ["poor sleep", "unknown factor", "high stress"],
+    ["not a factor"],
+    ALL_FACTORS,
+    ALL_FACTORS * 2,
+]
+
+MODELS = {
+    "config": ScoringModel.from_config(),
+    "fractional": ScoringModel({"smoking": 12.5, "poor_diet": 7.25, "high_stress": 0.1}, (20.5, 40)),
+}
+
+
+@pytest.mark.parametrize('model', MODELS.values(), ids=MODELS.keys())
+@pytest.mark.parametrize('factors', FACTOR_LISTS)
+def test_batch_matches_scalar(model, factors):
+    classifier = RiskClassifier(model=model)
+
+    batch = classifier.classify_batch([factors]).to_list()
+
+    assert batch == [classifier.classify_risk(factors)]
+
+
+@pytest.mark.parametrize('model', MODELS.values(), ids=MODELS.keys())
+def test_batch_rows_are_independent(model):
+    classifier = RiskClassifier(model=model)
+
+    batch = classifier.classify_batch(FACTOR_LISTS).to_list()
+
+    assert batch == [classifier.classify_risk(factors) for factors in FACTOR_LISTS]
+
+
+def test_edits_to_config_weights_and_thresholds_take_effect(monkeypatch):
+    from config import Config
+    classifier = RiskClassifier(model_file='')
+    assert classifier.classify_risk(["smoking"])['score'] == 25
+
+    monkeypatch.setitem(Config.RISK_WEIGHTS, 'smoking', 50)
+    assert classifier.classify_risk(["smoking"]) == {
+        "risk_level": "moderate", "score": 50, "rationale": ["smoking"]
+    }
+
+    monkeypatch.setattr(Config, 'RISK_THRESHOLDS', (60, 90))
+    assert classifier.classify_risk(["smoking"])['risk_level'] == "low"
+    assert classifier.classify_batch([["smoking"]]).to_list() == [classifier.classify_risk(["smoking"])]
+
+
+def test_an_assigned_model_stops_following_config(monkeypatch):
+    from config import Config
+    classifier = RiskClassifier(model_file='')
+    classifier.risk_weights = {"smoking": 5}
+
+    monkeypatch.setitem(Config.RISK_WEIGHTS, 'smoking', 50)
+
+    assert classifier.classify_risk(["smoking"])['score'] == 5
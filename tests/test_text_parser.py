@@ -0,0 +1,34 @@
+# OCR text parser
+import pytest
+
+from models.text_parser import SurveyTextParser
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return SurveyTextParser()
+
+
+def test_question_style_line_without_separator(parser):
+    answers, _ = parser.parse("Do you smoke? No")
+
+    assert answers == {'smoker': False}
+
+
+def test_short_label_needs_separator_for_fuzzy_match(parser):
+    answers, _ = parser.parse("Page 3")
+
+    assert answers == {}
+
+
+def test_exact_short_label_without_separator(parser):
+    answers, _ = parser.parse("Age 42")
+
+    assert answers == {'age': 42}
+
+
+def test_ocr_noise_in_labels_and_values(parser):
+    answers, confidence = parser.parse("Sm0ker: yes\nExerclse: rarely\nDiet: fast food")
+
+    assert answers == {'smoker': True, 'exercise': 'rarely', 'diet': 'fast food'}
+    assert confidence['diet'] == 0.5
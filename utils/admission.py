@@ -0,0 +1,279 @@
+# Admission control: concurrency budgets per route class, in-flight upload bytes, per-client rate limits
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+# Route classes: image uploads (OCR) and everything else that does work (text scoring)
+OCR = 'ocr'
+TEXT = 'text'
+
+
+class AdmissionRejected(RuntimeError):
+    """Request turned away before doing any work; answered with status_code and Retry-After"""
+
+    def __init__(self, message, retry_after, status_code=503, status='busy'):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.status_code = status_code
+        self.status = status
+
+    def to_dict(self):
+        return {"status": self.status, "error": str(self)}
+
+
+class ConcurrencyBudget:
+    """At most ``limit`` requests of a class run at once and ``max_queued``
+    more may wait up to ``timeout`` seconds for a slot. Once the queue is
+    full, requests are rejected immediately instead of piling up.
+    """
+
+    def __init__(self, name, limit, max_queued, timeout):
+        self.name = name
+        self.limit = limit
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.running = 0
+        self.queued = 0
+        self.rejected = 0
+        self._hold_seconds = 0.0  # Moving average of how long a slot is held
+        self._cond = threading.Condition()
+
+    def reserve(self):
+        """Take a slot, or a place in the queue; True if the slot was free"""
+        with self._cond:
+            if self.running < self.limit:
+                self.running += 1
+                return True
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"Too many {self.name} requests in progress, try again later",
+                    self.retry_after()
+                )
+            self.queued += 1
+            return False
+
+    def wait(self):
+        """Trade a queue place for a slot, blocking up to ``timeout`` seconds"""
+        with self._cond:
+            try:
+                if not self._cond.wait_for(lambda: self.running < self.limit, timeout=self.timeout):
+                    self.rejected += 1
+                    raise AdmissionRejected(
+                        f"Timed out waiting for a {self.name} slot, try again later",
+                        self.retry_after()
+                    )
+                self.running += 1
+            finally:
+                self.queued -= 1
+
+    def acquire(self):
+        """Take a slot, waiting as long as it takes; for work that is already queued elsewhere"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.running < self.limit)
+            self.running += 1
+
+    def cancel(self):
+        """Give up a queue place without running"""
+        with self._cond:
+            self.queued -= 1
+
+    def release(self, held_seconds):
+        with self._cond:
+            self.running -= 1
+            self._hold_seconds += 0.2 * (held_seconds - self._hold_seconds)
+            self._cond.notify()
+
+    def retry_after(self):
+        """Seconds until the current queue has likely drained"""
+        return self._hold_seconds * (self.queued + 1) / max(self.limit, 1)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self.running,
+                "queued": self.queued,
+                "limit": self.limit,
+                "max_queued": self.max_queued,
+                "rejected": self.rejected
+            }
+
+
+class TokenBuckets:
+    """Per-client token buckets refilled at ``rate`` tokens/s up to ``burst``.
+
+    Only the ``max_clients`` most recently seen clients are tracked; a client
+    that falls out starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._buckets = OrderedDict()  # client -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, client, cost):
+        """Spend ``cost`` tokens or raise AdmissionRejected with a 429"""
+        cost = min(cost, self.burst)  # Otherwise a costly request could never pass
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                admitted = True
+            else:
+                admitted = False
+                self.rejected += 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+        if not admitted:
+            raise AdmissionRejected(
+                "Rate limit exceeded, slow down",
+                (cost - tokens) / self.rate,
+                status_code=429,
+                status='rate_limited'
+            )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._buckets),
+                "rate": self.rate,
+                "burst": self.burst,
+                "rejected": self.rejected
+            }
+
+
+class AdmissionTicket:
+    """One admitted request's hold on its budget and upload bytes; release() exactly once"""
+
+    def __init__(self, controller, budget, upload_bytes, started):
+        self._controller = controller
+        self._budget = budget
+        self._upload_bytes = upload_bytes
+        self.started = started
+        self._start = time.perf_counter()
+        self._released = False
+
+    def wait(self):
+        """Block until the request may run (no-op if it got a slot straight away)"""
+        if not self.started:
+            try:
+                self._budget.wait()
+            except AdmissionRejected:
+                self.started = None  # Queue place already given back
+                raise
+            self.started = True
+            self._start = time.perf_counter()
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        if self.started:
+            self._budget.release(time.perf_counter() - self._start)
+        elif self.started is not None:
+            self._budget.cancel()
+        self._controller._release_upload(self._upload_bytes)
+
+
+class AdmissionController:
+    """Decides, before a request reads its body, whether it may run.
+
+    OCR and text requests draw on separate concurrency budgets, so a burst
+    of uploads can't take the slots text scoring needs. Uploads also
+    reserve their Content-Length against ``max_upload_bytes`` in flight,
+    and every client spends tokens (uploads cost ``ocr_cost``) from its
+    bucket.
+    """
+
+    def __init__(self, budgets, max_upload_bytes, rate_limiter=None, ocr_cost=1, enabled=True):
+        self.budgets = budgets
+        self.max_upload_bytes = max_upload_bytes
+        self.rate_limiter = rate_limiter
+        self.ocr_cost = ocr_cost
+        self.enabled = enabled
+        self.upload_bytes = 0
+        self.upload_rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        rate_limiter = None
+        if Config.RATE_LIMIT_PER_SEC > 0:
+            rate_limiter = TokenBuckets(Config.RATE_LIMIT_PER_SEC, Config.RATE_LIMIT_BURST)
+        return cls(
+            budgets={
+                OCR: ConcurrencyBudget(OCR, Config.OCR_CONCURRENCY, Config.OCR_MAX_QUEUED, Config.ADMISSION_TIMEOUT),
+                TEXT: ConcurrencyBudget(TEXT, Config.TEXT_CONCURRENCY, Config.TEXT_MAX_QUEUED, Config.ADMISSION_TIMEOUT)
+            },
+            max_upload_bytes=Config.MAX_INFLIGHT_UPLOAD_BYTES,
+            rate_limiter=rate_limiter,
+            ocr_cost=Config.RATE_LIMIT_OCR_COST,
+            enabled=Config.ADMISSION_ENABLED
+        )
+
+    @staticmethod
+    def route_class(method, mimetype):
+        """OCR for uploads, text for other POSTs, None (not admission controlled) otherwise"""
+        if method != 'POST':
+            return None
+        return OCR if mimetype == 'multipart/form-data' else TEXT
+
+    def admit(self, route_class, client, content_length=None):
+        """Ticket for a request, or raise AdmissionRejected. Never blocks;
+        call ticket.wait() before doing the work."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.take(client, self.ocr_cost if route_class == OCR else 1)
+
+        upload_bytes = 0
+        if route_class == OCR:
+            # Without a Content-Length, assume the largest body the app accepts
+            upload_bytes = content_length if content_length is not None else Config.MAX_CONTENT_LENGTH
+            self._reserve_upload(upload_bytes)
+
+        budget = self.budgets[route_class]
+        try:
+            started = budget.reserve()
+        except AdmissionRejected:
+            self._release_upload(upload_bytes)
+            raise
+        return AdmissionTicket(self, budget, upload_bytes, started)
+
+    def stats(self):
+        with self._lock:
+            upload = {
+                "in_flight_bytes": self.upload_bytes,
+                "max_bytes": self.max_upload_bytes,
+                "rejected": self.upload_rejected
+            }
+        return {
+            "enabled": self.enabled,
+            "budgets": {name: budget.stats() for name, budget in self.budgets.items()},
+            "uploads": upload,
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter is not None else None
+        }
+
+    def _reserve_upload(self, size):
+        with self._lock:
+            # A single upload larger than the limit is still let through on its own
+            if self.upload_bytes and self.upload_bytes + size > self.max_upload_bytes:
+                self.upload_rejected += 1
+                raise AdmissionRejected(
+                    "Too much upload data in flight, try again later",
+                    self.budgets[OCR].retry_after()
+                )
+            self.upload_bytes += size
+
+    def _release_upload(self, size):
+        if size:
+            with self._lock:
+                self.upload_bytes -= size
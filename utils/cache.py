@@ -0,0 +1,150 @@
+# Caching helpers
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by a byte budget and/or an entry count.
+
+    ``sizeof`` estimates the bytes an entry costs; entries larger than the
+    whole budget are not cached at all.
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None, sizeof=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof or (lambda key, value: 1)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(key, value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._entries and (
+                (self.max_bytes is not None and self._bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class OCRResultCache:
+    """Content-addressed cache of OCR text keyed by image bytes + OCR settings.
+
+    A memory LRU tier sits in front of an optional directory of text files.
+    Disk hits are promoted into memory.
+    """
+
+    def __init__(self, max_bytes, cache_dir=None):
+        self.memory = LRUCache(
+            max_bytes=max_bytes,
+            sizeof=lambda key, text: len(key) + len(text.encode('utf-8'))
+        )
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, settings):
+        """sha256 over the raw image bytes and the settings that shape OCR output"""
+        digest = hashlib.sha256(image_bytes)
+        digest.update(repr(settings).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        text = self.memory.get(key)
+        if text is not None or not self.cache_dir:
+            return text
+
+        try:
+            with open(self._disk_path(key), encoding='utf-8') as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"Failed to read OCR cache entry {key}: {str(e)}")
+            return None
+
+        self.disk_hits += 1
+        self.memory.put(key, text)
+        return text
+
+    def put(self, key, text):
+        self.memory.put(key, text)
+        if not self.cache_dir:
+            return
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Thread idents repeat across processes sharing cache_dir, so the pid goes in too
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to write OCR cache entry {key}: {str(e)}")
+
+    def stats(self):
+        stats = self.memory.stats()
+        # A disk hit was first counted as a memory miss
+        stats["hits"] += self.disk_hits
+        stats["misses"] -= self.disk_hits
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["disk_hits"] = self.disk_hits
+        stats["cache_dir"] = self.cache_dir
+        return stats
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
@@ -1,6 +1,10 @@
 # Helper functions
 import os
+import shutil
+import uuid
 import logging
+from contextlib import contextmanager
+from werkzeug.utils import secure_filename
 
 def cleanup_uploads(filepath):
     """Clean up uploaded files"""
@@ -10,6 +14,27 @@ def cleanup_uploads(filepath):
     except Exception as e:
         logging.warning(f"Failed to cleanup file {filepath}: {str(e)}")
 
+@contextmanager
+def open_upload(file, upload_folder, spool_threshold):
+    """Yield an upload as in-memory bytes, or as a unique temp file path when
+    it is larger than spool_threshold bytes (the file is removed afterwards)"""
+    data = file.stream.read(spool_threshold + 1)
+    if len(data) <= spool_threshold:
+        yield data
+        return
+    
+    # Unique name so concurrent uploads with the same filename never collide
+    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename or 'upload')}"
+    filepath = os.path.join(upload_folder, filename)
+    with open(filepath, 'wb') as f:
+        f.write(data)
+        shutil.copyfileobj(file.stream, f)
+    
+    try:
+        yield filepath
+    finally:
+        cleanup_uploads(filepath)
+
 def setup_logging():
     """Setup logging configuration"""
     logging.basicConfig(
@@ -0,0 +1,183 @@
+# In-process background job queue, with job state optionally shared through SQLite
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    job TEXT NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+"""
+
+# Seconds between deletes of expired rows from the shared file
+_SWEEP_INTERVAL = 5
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue has no room for another job"""
+
+
+class JobQueue:
+    """Bounded in-process job queue served by a fixed pool of worker threads.
+
+    Finished jobs are kept for ``result_ttl`` seconds so clients can poll
+    them, then evicted. With a ``path``, job state is also written to a
+    SQLite file, so any process sharing it (e.g. every gunicorn worker)
+    can answer a poll for a job another one is running. With a ``budget``
+    (an admission ConcurrencyBudget), each job holds one of its slots while
+    it runs, so background work counts against the same limit as requests.
+    """
+
+    def __init__(self, workers, max_queued, result_ttl, path=None, budget=None):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.path = path or None
+        self.budget = budget
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # One SQLite connection per thread
+        self._threads = []
+        self._next_sweep = 0.0
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and return its job id"""
+        self._start_workers()
+        self._evict_expired()
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time()
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self._save(job)  # Before a worker can pick it up and update it
+
+        try:
+            self._queue.put_nowait((job_id, fn, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+            if self.path is not None:
+                self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            raise QueueFullError("Job queue is full, try again later")
+
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job, or None if unknown or expired"""
+        self._evict_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "tracked_jobs": len(self._jobs),
+                "workers": self.workers
+            }
+
+    def _start_workers(self):
+        # Threads start on first use so importing the app stays cheap
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job_id, fn, args = self._queue.get()
+            if self.budget is not None:
+                self.budget.acquire()
+            start = time.perf_counter()
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                result = fn(*args)
+                self._update(job_id, status="done", result=result, finished_at=time.time())
+            except Exception as e:
+                self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            finally:
+                if self.budget is not None:
+                    self.budget.release(time.perf_counter() - start)
+                self._queue.task_done()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job = dict(job)
+        self._save(job)
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.get('finished_at', float('inf')) < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+            # Rows other processes wrote expire too, so sweep the file whether or not we had any
+            sweep = self.path is not None and time.monotonic() >= self._next_sweep
+            if sweep:
+                self._next_sweep = time.monotonic() + _SWEEP_INTERVAL
+        if sweep:
+            self._execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+
+    def _save(self, job):
+        if self.path is not None:
+            self._execute(
+                "INSERT OR REPLACE INTO jobs (job_id, job, finished_at) VALUES (?, ?, ?)",
+                (job['job_id'], json.dumps(job, default=str), job.get('finished_at'))
+            )
+
+    def _load(self, job_id):
+        """A job another process is running, from the shared file"""
+        if self.path is None:
+            return None
+        row = self._execute(
+            "SELECT job FROM jobs WHERE job_id = ? AND (finished_at IS NULL OR finished_at >= ?)",
+            (job_id, time.time() - self.result_ttl)
+        )
+        return json.loads(row[0]) if row else None
+
+    def _execute(self, sql, params):
+        """Run one statement (committed); its first row. Errors are logged, not raised."""
+        try:
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = _connect(self.path)
+            with connection:
+                return connection.execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Job store {self.path} failed: {str(e)}")
+            return None
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=5)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
@@ -0,0 +1,98 @@
+# JSON encoding/decoding for the Flask app: orjson when installed, stdlib json otherwise
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    _ORJSON_OPTIONS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+except ImportError:
+    orjson = None
+
+# The separators DefaultJSONProvider.response uses outside debug mode
+_COMPACT = {'separators': (',', ':')}
+
+# Bytes buffered per chunk when streaming a response body
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib.
+
+    Output is byte for byte the default provider's (sorted keys, compact
+    separators in responses, non-ASCII text as \\u escapes). orjson only
+    writes UTF-8, so bodies with non-ASCII text, and values orjson can't
+    encode natively (dates, Decimal, UUID, dataclasses, ints beyond 64
+    bits), go through the default provider's rules.
+    """
+
+    backend = 'orjson' if orjson is not None else 'json'
+
+    def dumps_bytes(self, obj):
+        """Compact, key-sorted JSON bytes, as used in responses"""
+        if orjson is not None:
+            try:
+                encoded = orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS)
+            except TypeError:
+                # e.g. integers beyond 64 bits; the stdlib handles them
+                pass
+            else:
+                # Non-ASCII text needs the stdlib's \u escapes to match jsonify
+                if encoded.isascii():
+                    return encoded
+        return super().dumps(obj, **_COMPACT).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # Only the compact form is routed to orjson; other formatting keeps the stdlib's output
+        if orjson is None or kwargs != _COMPACT:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+    def iter_encode(self, obj):
+        """Yield the response encoding of obj (trailing newline included) in chunks.
+
+        A top-level dict's list values are encoded item by item, so a large
+        batch result is never held as one string. The bytes are identical to
+        ``response(obj)``.
+        """
+        if not isinstance(obj, dict):
+            yield self.dumps_bytes(obj) + b'\n'
+            return
+
+        buffer = bytearray(b'{')
+        for position, key in enumerate(sorted(obj)):
+            if position:
+                buffer += b','
+            buffer += self.dumps_bytes(str(key)) + b':'
+            value = obj[key]
+            if not isinstance(value, list):
+                buffer += self.dumps_bytes(value)
+                continue
+
+            buffer += b'['
+            for index, item in enumerate(value):
+                if index:
+                    buffer += b','
+                buffer += self.dumps_bytes(item)
+                if len(buffer) >= STREAM_CHUNK_BYTES:
+                    yield bytes(buffer)
+                    buffer.clear()
+            buffer += b']'
+
+        buffer += b'}\n'
+        yield bytes(buffer)
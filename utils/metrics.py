@@ -0,0 +1,119 @@
+# Per-stage latency metrics
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from config import Config
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request stage timings, only collected when a request asks for them
+_request_timings = ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Metrics:
+    """Stage and request latency histograms with Prometheus text rendering.
+
+    When ``enabled`` is False every hook returns after a single attribute
+    check, so instrumented code pays close to nothing.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def timed(self, stage):
+        """Decorator recording each call's duration under ``stage``"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe_stage(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe_stage(self, stage, seconds):
+        self._histogram(self.stages, stage).observe(seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def observe_request(self, endpoint, seconds):
+        if self.enabled:
+            self._histogram(self.requests, endpoint).observe(seconds)
+
+    def start_request_timings(self):
+        """Collect this request's stage timings; returns the dict they land in"""
+        timings = {}
+        _request_timings.set(timings)
+        return timings
+
+    def stop_request_timings(self):
+        _request_timings.set(None)
+
+    def render_prometheus(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = []
+        self._render(lines, 'hrp_stage_seconds', 'Time spent in each pipeline stage', 'stage', self.stages)
+        self._render(lines, 'hrp_request_seconds', 'End-to-end request latency per endpoint', 'endpoint', self.requests)
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, histograms, name):
+        histogram = histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = histograms.setdefault(name, Histogram())
+        return histogram
+
+    @staticmethod
+    def _render(lines, metric, help_text, label, histograms):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, histogram in sorted(histograms.items()):
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {total}')
+            lines.append(f'{metric}_count{{{label}="{name}"}} {count}')
+
+
+metrics = Metrics(enabled=Config.METRICS_ENABLED)
+timed = metrics.timed
@@ -0,0 +1,199 @@
+# Persistent result store: SQLite in WAL mode, written by a batching background thread
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import Config
+
+# Columns of a stored result, in table order
+COLUMNS = (
+    'id', 'subject', 'created_at', 'answers', 'factors', 'factor_mask',
+    'risk_level', 'score', 'recommendation_ids', 'scoring_model'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    subject TEXT,
+    created_at REAL NOT NULL,
+    answers TEXT NOT NULL,
+    factors TEXT NOT NULL,
+    factor_mask INTEGER NOT NULL,
+    risk_level TEXT NOT NULL,
+    score NUMERIC NOT NULL,
+    recommendation_ids TEXT NOT NULL,
+    scoring_model TEXT
+);
+CREATE INDEX IF NOT EXISTS results_subject_time ON results (subject, created_at);
+CREATE INDEX IF NOT EXISTS results_time ON results (created_at);
+"""
+
+_INSERT = f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+class ResultStore:
+    """Analysis results kept in a local SQLite database.
+
+    ``add`` only queues the row and returns its id. A writer thread commits
+    queued rows in transactions of up to ``batch_size`` rows gathered over
+    at most ``flush_interval`` seconds, so requests never wait on the disk.
+    Reads first wait for rows already queued, so a result can be fetched
+    as soon as its id has been returned.
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval=0.05, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()  # One read connection per thread
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls):
+        """Store configured by RESULT_STORE_FILE, or None when it isn't set"""
+        if not Config.RESULT_STORE_FILE:
+            return None
+        return cls(
+            Config.RESULT_STORE_FILE,
+            Config.RESULT_STORE_BATCH_SIZE,
+            Config.RESULT_STORE_FLUSH_INTERVAL,
+            Config.RESULT_STORE_MAX_PENDING
+        )
+
+    def add(self, subject, answers, factors, factor_mask, risk_level, score, recommendation_ids, scoring_model=None):
+        """Queue a result for writing; its id, or None if the write queue is full"""
+        self._start_writer()
+        result_id = uuid.uuid4().hex
+        row = (
+            result_id, subject, time.time(), json.dumps(answers, default=str), json.dumps(list(factors)),
+            factor_mask, risk_level, score, json.dumps(list(recommendation_ids)), scoring_model
+        )
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return result_id
+
+    def get(self, result_id):
+        """Stored result as a dict, or None"""
+        self.flush(Config.RESULT_STORE_BUSY_TIMEOUT)
+        row = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM results WHERE id = ?", (result_id,)
+        ).fetchone()
+        return _row_dict(row) if row else None
+
+    def find(self, subject=None, since=None, until=None, limit=100):
+        """Results newest first, filtered by subject and/or a created_at range (epoch seconds)"""
+        clauses = []
+        params = []
+        if subject is not None:
+            clauses.append("subject = ?")
+            params.append(subject)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+
+        self.flush(Config.RESULT_STORE_BUSY_TIMEOUT)
+        rows = self._connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM results {where} ORDER BY created_at DESC LIMIT ?", params
+        ).fetchall()
+        return [_row_dict(row) for row in rows]
+
+    def flush(self, timeout=None):
+        """Wait until every row queued so far has been committed (or failed)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed
+            }
+
+    def _start_writer(self):
+        # Started on first use, so it runs in the worker process after a gunicorn fork
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._write_loop, name="result-store-writer", daemon=True)
+            self._thread.start()
+
+    def _write_loop(self):
+        connection = None
+        while True:
+            batch = [self._queue.get()]
+            # Gather more rows for up to flush_interval, unless a reader is waiting
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not isinstance(batch[-1], threading.Event):
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if isinstance(item, tuple)]
+            if rows:
+                try:
+                    if connection is None:
+                        connection = _connect(self.path)
+                    with connection:
+                        connection.executemany(_INSERT, rows)
+                    with self._lock:
+                        self.written += len(rows)
+                except sqlite3.Error as e:
+                    with self._lock:
+                        self.failed += len(rows)
+                    logging.warning(f"Failed to store {len(rows)} results in {self.path}: {str(e)}")
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = _connect(self.path)
+        return connection
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=Config.RESULT_STORE_BUSY_TIMEOUT)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode, NORMAL only fsyncs at checkpoints; a crash can lose the last commits, never corrupt
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _row_dict(row):
+    result = dict(zip(COLUMNS, row))
+    result['answers'] = json.loads(result['answers'])
+    result['factors'] = json.loads(result['factors'])
+    result['recommendation_ids'] = json.loads(result['recommendation_ids'])
+    return result
@@ -1,7 +1,9 @@
 # Input validation
 from config import Config
+from utils.metrics import timed
 import os
 
+@timed('validate_input')
 def validate_input(data):
     """Validate text input data"""
     if not isinstance(data, dict):